@@ -0,0 +1,39 @@
+import time
+from langchain_core.runnables import RunnableLambda
+
+
+class FakeGraphStoreClient:
+    """Offline stand-in for GraphStoreClient (no Neo4j). `latency_ms` simulates the round trip."""
+
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency = latency_ms / 1000
+        self.driver = None
+
+    def _wait(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def get_graph_context(self, file_names: list, filters=None) -> str:
+        self._wait()
+        return "GRAPH METADATA:\n" + "\n".join(f"Document '{name}' (offline benchmark)." for name in file_names)
+
+    def get_related_chunks_by_id(self, chunk_ids: list):
+        self._wait()
+        return []
+
+    def get_chunks_linked_to_entity(self, keyword, filters=None):
+        self._wait()
+        return []
+
+    def search_chunks_by_entities(self, query_text: str, k: int = 20, filters=None, timeout: float = None, **kwargs):
+        self._wait()
+        return []
+
+
+def fake_answer_chain(latency_ms: float = 0.0, answer: str = "Offline benchmark answer."):
+    """Runnable with the answer chain's interface ({"context", "question"} -> str) and a fixed latency."""
+    def _answer(inputs):
+        if latency_ms:
+            time.sleep(latency_ms / 1000)
+        return answer
+    return RunnableLambda(_answer)
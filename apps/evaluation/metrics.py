@@ -0,0 +1,50 @@
+import math
+import numpy as np
+
+
+def recall_at_k(ranked_ids, relevant_ids, k: int) -> float:
+    relevant = set(relevant_ids)
+    if not relevant:
+        return 0.0
+    return len(relevant & set(ranked_ids[:k])) / len(relevant)
+
+
+def reciprocal_rank(ranked_ids, relevant_ids) -> float:
+    relevant = set(relevant_ids)
+    for rank, doc_id in enumerate(ranked_ids, start=1):
+        if doc_id in relevant:
+            return 1.0 / rank
+    return 0.0
+
+
+def ndcg_at_k(ranked_ids, relevant_ids, k: int) -> float:
+    # Binary relevance
+    relevant = set(relevant_ids)
+    dcg = sum(1.0 / math.log2(rank + 1) for rank, doc_id in enumerate(ranked_ids[:k], start=1) if doc_id in relevant)
+    ideal = sum(1.0 / math.log2(rank + 1) for rank in range(1, min(len(relevant), k) + 1))
+    return dcg / ideal if ideal else 0.0
+
+
+def latency_summary(values_seconds) -> dict:
+    if not values_seconds:
+        return {"count": 0, "mean_ms": None, "p50_ms": None, "p95_ms": None, "p99_ms": None}
+    values = np.asarray(values_seconds, dtype=np.float64) * 1000
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        "count": int(values.size),
+        "mean_ms": round(float(values.mean()), 2),
+        "p50_ms": round(float(p50), 2),
+        "p95_ms": round(float(p95), 2),
+        "p99_ms": round(float(p99), 2),
+    }
+
+
+def retrieval_summary(runs, ks=(1, 3, 5, 10)) -> dict:
+    """runs: [{"ranked_ids": [...], "relevant_ids": [...]}] -> mean recall@k, MRR and nDCG@k."""
+    if not runs:
+        return {}
+    summary = {"queries": len(runs), "mrr": round(float(np.mean([reciprocal_rank(r["ranked_ids"], r["relevant_ids"]) for r in runs])), 4)}
+    for k in ks:
+        summary[f"recall@{k}"] = round(float(np.mean([recall_at_k(r["ranked_ids"], r["relevant_ids"], k) for r in runs])), 4)
+        summary[f"ndcg@{k}"] = round(float(np.mean([ndcg_at_k(r["ranked_ids"], r["relevant_ids"], k) for r in runs])), 4)
+    return summary
@@ -0,0 +1,183 @@
+"""
+Offline retrieval-quality and latency benchmark for HybridSearcher.search_and_rerank.
+
+    python -m apps.evaluation.scripts.calculate_recall \\
+        --ground-truth data/evaluation/ground_truth.jsonl \\
+        --mixes bm25+vector,bm25,vector --initial-k 10,20 --final-k 5 \\
+        --concurrency 1,4,8 --output data/evaluation/report.json
+
+Runs against the local Chroma store and BM25 index with Neo4j and the LLM replaced by fakes
+(simulated latencies via --graph-latency-ms / --llm-latency-ms). For every configuration it reports
+recall@k, MRR, nDCG@k and p50/p95/p99 latency per stage (bm25, vector, graph, rerank, prompt, llm),
+then throughput under concurrent load. With --baseline, exits with status 1 when p95 latency or
+recall regress beyond the allowed margins.
+"""
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+import django
+
+
+def load_ground_truth(path, limit=None):
+    with open(path, encoding="utf-8") as f:
+        items = [json.loads(line) for line in f if line.strip()]
+    return items[:limit] if limit else items
+
+
+def chunk_id(doc):
+    return doc.metadata.get("id") or getattr(doc, "id", None)
+
+
+def answer_question(searcher, chain, item, config):
+    from apps.rag_engine.logic.answer_chain import build_context
+    from apps.rag_engine.logic.telemetry import collect_timings, span
+
+    with collect_timings() as timings:
+        start = time.perf_counter()
+        docs = searcher.search_and_rerank(
+            item["question"],
+            initial_k=config["initial_k"],
+            final_k=config["final_k"],
+            retrievers=config["retrievers"],
+            rerank=config["rerank"]
+        )
+        if chain is not None and docs:
+            with span("prompt"):
+                context, _ = build_context(docs, item["question"])
+            with span("llm"):
+                chain.invoke({"context": context, "question": item["question"]})
+        timings["total"] = time.perf_counter() - start
+    return docs, timings
+
+
+def run_quality(searcher, chain, questions, config):
+    from apps.evaluation.metrics import latency_summary, retrieval_summary
+
+    runs, stage_times = [], defaultdict(list)
+    for item in questions:
+        docs, timings = answer_question(searcher, chain, item, config)
+        runs.append({"ranked_ids": [chunk_id(d) for d in docs], "relevant_ids": item["relevant_ids"]})
+        for stage, seconds in timings.items():
+            stage_times[stage].append(seconds)
+
+    ks = sorted({k for k in (1, 3, 5, 10) if k <= config["final_k"]} | {config["final_k"]})
+    return {
+        "retrieval": retrieval_summary(runs, ks=ks),
+        "latency": {stage: latency_summary(values) for stage, values in sorted(stage_times.items())},
+    }
+
+
+def run_load(searcher, chain, questions, config, concurrency):
+    from apps.evaluation.metrics import latency_summary
+
+    totals = []
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for _, timings in executor.map(lambda item: answer_question(searcher, chain, item, config), questions):
+            totals.append(timings["total"])
+    wall = time.perf_counter() - start
+    return {
+        "concurrency": concurrency,
+        "queries": len(questions),
+        "wall_seconds": round(wall, 3),
+        "throughput_qps": round(len(questions) / wall, 2) if wall else None,
+        "latency": latency_summary(totals),
+    }
+
+
+def config_key(config):
+    return f"{'+'.join(config['retrievers'])}|ik={config['initial_k']}|fk={config['final_k']}|rerank={config['rerank']}"
+
+
+def compare_with_baseline(report, baseline, max_latency_regression, max_recall_drop):
+    failures = []
+    baseline_configs = {c["key"]: c for c in baseline.get("configs", [])}
+    for config in report["configs"]:
+        previous = baseline_configs.get(config["key"])
+        if not previous:
+            continue
+        old_p95 = previous["latency"].get("total", {}).get("p95_ms")
+        new_p95 = config["latency"].get("total", {}).get("p95_ms")
+        if old_p95 and new_p95 and new_p95 > old_p95 * (1 + max_latency_regression):
+            failures.append(f"{config['key']}: p95 {old_p95}ms -> {new_p95}ms")
+        for metric, old_value in previous["retrieval"].items():
+            new_value = config["retrieval"].get(metric)
+            if metric.startswith(("recall@", "mrr", "ndcg@")) and new_value is not None and new_value < old_value - max_recall_drop:
+                failures.append(f"{config['key']}: {metric} {old_value} -> {new_value}")
+    return failures
+
+
+def print_report(report):
+    for config in report["configs"]:
+        print(f"\n=== {config['key']}")
+        print("  " + "  ".join(f"{k}={v}" for k, v in config["retrieval"].items()))
+        for stage, stats in config["latency"].items():
+            print(f"  {stage:<8} p50={stats['p50_ms']}ms p95={stats['p95_ms']}ms p99={stats['p99_ms']}ms (n={stats['count']})")
+        for load in config.get("load", []):
+            print(f"  load c={load['concurrency']:<3} {load['throughput_qps']} q/s  p95={load['latency']['p95_ms']}ms")
+
+
+def int_list(value):
+    return [int(v) for v in value.split(",") if v]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ground-truth", default=os.path.join("data", "evaluation", "ground_truth.jsonl"))
+    parser.add_argument("--limit", type=int, default=None, help="Only use the first N questions")
+    parser.add_argument("--mixes", default="bm25+vector", help="Comma-separated retriever mixes, e.g. bm25+vector,bm25,vector")
+    parser.add_argument("--initial-k", type=int_list, default=[20])
+    parser.add_argument("--final-k", type=int_list, default=[5])
+    parser.add_argument("--no-rerank", action="store_true")
+    parser.add_argument("--graph-latency-ms", type=float, default=5.0, help="Simulated Neo4j round trip")
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0, help="Simulated LLM call (0 disables the LLM stage)")
+    parser.add_argument("--concurrency", type=int_list, default=[], help="Concurrency levels for the throughput test, e.g. 1,4,8")
+    parser.add_argument("--output", default=None, help="Write the JSON report here")
+    parser.add_argument("--baseline", default=None, help="Previous JSON report to compare against")
+    parser.add_argument("--max-latency-regression", type=float, default=0.25, help="Allowed relative p95 increase")
+    parser.add_argument("--max-recall-drop", type=float, default=0.02, help="Allowed absolute drop of recall/MRR/nDCG")
+    args = parser.parse_args()
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+    os.environ.setdefault("RAG_ENGINE_PRELOAD", "False")
+    django.setup()
+    from apps.evaluation.fakes import FakeGraphStoreClient, fake_answer_chain
+    from apps.rag_engine.logic.hybrid_search import HybridSearcher
+
+    questions = load_ground_truth(args.ground_truth, args.limit)
+    searcher = HybridSearcher(
+        reranker=False if args.no_rerank else None,
+        graph_client=FakeGraphStoreClient(latency_ms=args.graph_latency_ms)
+    )
+    chain = fake_answer_chain(args.llm_latency_ms) if args.llm_latency_ms else None
+
+    report = {"ground_truth": args.ground_truth, "questions": len(questions), "configs": []}
+    for mix, initial_k, final_k in itertools.product(args.mixes.split(","), args.initial_k, args.final_k):
+        config = {"retrievers": mix.split("+"), "initial_k": initial_k, "final_k": final_k, "rerank": not args.no_rerank}
+        result = {"key": config_key(config), **config, **run_quality(searcher, chain, questions, config)}
+        result["load"] = [run_load(searcher, chain, questions, config, c) for c in args.concurrency]
+        report["configs"].append(result)
+
+    print_report(report)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            failures = compare_with_baseline(report, json.load(f), args.max_latency_regression, args.max_recall_drop)
+        if failures:
+            print("\n❌ Performance regression vs baseline:\n  " + "\n  ".join(failures))
+            sys.exit(1)
+        print("\n✅ No regression vs baseline.")
+
+
+if __name__ == "__main__":
+    main()
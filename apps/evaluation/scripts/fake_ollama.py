@@ -0,0 +1,125 @@
+"""
+Local stand-in for the Ollama HTTP API (/api/chat, /api/generate, /api/tags) to exercise the enrichment
+engine without a GPU:
+
+    python -m apps.evaluation.scripts.fake_ollama --port 11435 --slots 2 --latency-ms 400 --malformed-rate 0.1
+    OLLAMA_BASE_URL=http://localhost:11435 python manage.py ingest_pdf data/sample.pdf
+
+--slots models OLLAMA_NUM_PARALLEL: requests beyond it queue, so latency grows with concurrency the way a
+saturated server's does. Replies are deterministic JSON in the shape the enrichment prompts ask for
+(single chunk or batched <chunk id="N"> blocks); --malformed-rate and --error-rate inject broken JSON and
+HTTP 500s. GET /stats returns the request counters.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from apps.rag_engine.llm.stub import BATCH_CHUNK_PATTERN, stub_reply
+
+
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+    server_version = "FakeOllama/0.1"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send_json(self, status: int, payload, content_type="application/json"):
+        body = payload if isinstance(payload, bytes) else json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.startswith("/api/tags"):
+            self._send_json(200, {"models": [{"name": self.server.model}]})
+        elif self.path.startswith("/stats"):
+            with self.server.stats_lock:
+                self._send_json(200, dict(self.server.stats))
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        if not self.path.startswith(("/api/chat", "/api/generate")):
+            self._send_json(404, {"error": "not found"})
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if "messages" in request:
+            prompt = "\n".join(m.get("content", "") for m in request["messages"] if isinstance(m.get("content"), str))
+        else:
+            prompt = request.get("prompt", "")
+
+        with self.server.slots:
+            self.server.count("requests")
+            chunks = max(1, len(BATCH_CHUNK_PATTERN.findall(prompt)))
+            time.sleep((self.server.latency + self.server.per_chunk * chunks) * random.uniform(0.9, 1.1))
+
+        if random.random() < self.server.error_rate:
+            self.server.count("errors")
+            self._send_json(500, {"error": "simulated server error"})
+            return
+        content = stub_reply(prompt)
+        if random.random() < self.server.malformed_rate:
+            self.server.count("malformed")
+            content = "Sure! Here is the JSON: " + content[: len(content) // 2]
+
+        if self.path.startswith("/api/chat"):
+            message = {"model": self.server.model, "message": {"role": "assistant", "content": content}, "done": True}
+        else:
+            message = {"model": self.server.model, "response": content, "done": True}
+        # Ollama streams newline-delimited JSON; a single final line is a valid stream for every client
+        self._send_json(200, (json.dumps(message) + "\n").encode("utf-8"), content_type="application/x-ndjson")
+
+
+class FakeOllamaServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, args):
+        super().__init__(address, FakeOllamaHandler)
+        self.model = args.model
+        self.slots = threading.BoundedSemaphore(args.slots)
+        self.latency = args.latency_ms / 1000
+        self.per_chunk = args.per_chunk_ms / 1000
+        self.malformed_rate = args.malformed_rate
+        self.error_rate = args.error_rate
+        self.verbose = args.verbose
+        self.stats = {"requests": 0, "errors": 0, "malformed": 0}
+        self.stats_lock = threading.Lock()
+
+    def count(self, key: str):
+        with self.stats_lock:
+            self.stats[key] += 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--model", default="mistral-nemo")
+    parser.add_argument("--slots", type=int, default=2, help="Requests processed in parallel (OLLAMA_NUM_PARALLEL)")
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="Base generation time per request")
+    parser.add_argument("--per-chunk-ms", type=float, default=100.0, help="Extra generation time per chunk in a batched prompt")
+    parser.add_argument("--malformed-rate", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    server = FakeOllamaServer((args.host, args.port), args)
+    print(f"Fake Ollama listening on http://{args.host}:{args.port} ({args.slots} slots, {args.latency_ms}ms/request)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
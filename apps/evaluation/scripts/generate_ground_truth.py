@@ -0,0 +1,82 @@
+"""
+Builds an offline question -> relevant chunk ground-truth set from the local Chroma collection.
+
+    python -m apps.evaluation.scripts.generate_ground_truth --samples 200 --output data/evaluation/ground_truth.jsonl
+
+Each line: {"question": ..., "relevant_ids": [chunk_id], "source": file_name}. Questions are synthesized
+without any LLM (a salient sentence, or its keywords with --mode keywords), so the set can be regenerated
+anywhere. Hand-labelled files in the same format can be used directly by calculate_recall.
+"""
+import argparse
+import json
+import os
+import random
+import re
+import django
+
+STOPWORDS = {
+    "the", "a", "an", "and", "or", "of", "to", "in", "on", "for", "by", "with", "is", "are", "be", "as", "at",
+    "that", "this", "it", "from", "which", "shall", "may", "le", "la", "les", "de", "des", "du", "et", "un",
+    "une", "en", "dans", "par", "pour", "sur", "est", "sont", "au", "aux", "qui", "que",
+}
+SENTENCE_SPLIT_PATTERN = re.compile(r"(?<=[.?!;])\s+")
+
+
+def raw_chunk_text(text: str) -> str:
+    # Enriched chunks are stored as "Context: ...\n\nContent: <raw chunk>"
+    marker = "Content: "
+    return text.split(marker, 1)[1] if marker in text else text
+
+
+def make_question(text: str, mode: str, rng: random.Random):
+    sentences = [s.strip() for s in SENTENCE_SPLIT_PATTERN.split(raw_chunk_text(text)) if 6 <= len(s.split()) <= 60]
+    if not sentences:
+        return None
+    sentence = max(sentences, key=lambda s: len(set(s.lower().split()) - STOPWORDS))
+    if mode == "sentence":
+        return sentence
+    keywords = [w for w in re.findall(r"\w+", sentence) if w.lower() not in STOPWORDS and len(w) > 3]
+    if len(keywords) < 3:
+        return sentence
+    rng.shuffle(keywords)
+    return " ".join(keywords[:8])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--samples", type=int, default=200)
+    parser.add_argument("--mode", choices=["sentence", "keywords"], default="keywords")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=os.path.join("data", "evaluation", "ground_truth.jsonl"))
+    args = parser.parse_args()
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+    os.environ.setdefault("RAG_ENGINE_PRELOAD", "False")
+    django.setup()
+    from apps.rag_engine.connectors.vector_store import VectorStoreClient
+
+    collection = VectorStoreClient().get_collection()
+    all_ids = collection.get(include=[])["ids"]
+    rng = random.Random(args.seed)
+    sampled_ids = rng.sample(all_ids, min(args.samples, len(all_ids)))
+    records = collection.get(ids=sampled_ids, include=["documents", "metadatas"])
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    written = 0
+    with open(args.output, "w", encoding="utf-8") as f:
+        for chunk_id, text, metadata in zip(records["ids"], records["documents"], records["metadatas"]):
+            question = make_question(text or "", args.mode, rng)
+            if not question:
+                continue
+            f.write(json.dumps({
+                "question": question,
+                "relevant_ids": [chunk_id],
+                "source": (metadata or {}).get("source"),
+            }, ensure_ascii=False) + "\n")
+            written += 1
+
+    print(f"Wrote {written} ground-truth questions to {args.output} (collection size: {len(all_ids)}).")
+
+
+if __name__ == "__main__":
+    main()
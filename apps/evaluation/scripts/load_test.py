@@ -0,0 +1,140 @@
+"""
+Load test of the sync (/api/v1/rag/ask/, DRF view on a worker thread) and async (/api/v1/rag/async/ask/,
+event loop) ask paths of a running server:
+
+    SEMANTIC_CACHE_ENABLED=False uvicorn config.asgi:application --port 8000 --lifespan off
+    python -m apps.evaluation.scripts.load_test --base-url http://localhost:8000 \\
+        --paths sync,async --concurrency 1,16,64,256 --requests 200 \\
+        --ground-truth data/evaluation/ground_truth.jsonl --output data/evaluation/load_report.json
+
+For every path and concurrency level, `--requests` questions are sent with at most `concurrency` in flight.
+Reports throughput, error count and p50/p95/p99 latency; with --stream the SSE variants of both paths are used
+and the time to the first answer token is reported as well. Disable the semantic cache on the server, or every repeated
+question after the first is a cache hit. To compare against the WSGI deployment instead of sync views under
+ASGI, run the sync path against `gunicorn config.wsgi -w 4 --threads 8`.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import sys
+import time
+
+PATHS = {
+    "sync": "/api/v1/rag/ask/",
+    "async": "/api/v1/rag/async/ask/",
+}
+STREAM_PATHS = {
+    "sync": "/api/v1/rag/ask/stream/",
+    "async": "/api/v1/rag/async/ask/stream/",
+}
+
+
+def load_questions(args):
+    if args.ground_truth:
+        with open(args.ground_truth, encoding="utf-8") as f:
+            return [json.loads(line)["question"] for line in f if line.strip()]
+    return args.question or ["Quelles sont les obligations de l'employeur en matière de sécurité ?"]
+
+
+async def ask(client, url, question, stream):
+    """-> (latency seconds, time to first token or None, ok)."""
+    start = time.perf_counter()
+    first_token = None
+    try:
+        if not stream:
+            response = await client.post(url, json={"question": question})
+            return time.perf_counter() - start, None, response.status_code == 200
+        async with client.stream("POST", url, json={"question": question}, headers={"Accept": "text/event-stream"}) as response:
+            ok = response.status_code == 200
+            async for line in response.aiter_lines():
+                if first_token is None and line.startswith("event: token"):
+                    first_token = time.perf_counter() - start
+                if line.startswith("event: error"):
+                    ok = False
+        return time.perf_counter() - start, first_token, ok
+    except Exception as e:
+        print(f"  request failed: {e}", file=sys.stderr)
+        return time.perf_counter() - start, None, False
+
+
+async def run_level(url, questions, concurrency, total, stream, timeout):
+    import httpx
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    semaphore = asyncio.Semaphore(concurrency)
+    cycle = itertools.cycle(questions)
+
+    async with httpx.AsyncClient(timeout=timeout, limits=limits) as client:
+        async def one(question):
+            async with semaphore:
+                return await ask(client, url, question, stream)
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*[one(next(cycle)) for _ in range(total)])
+        elapsed = time.perf_counter() - start
+    return results, elapsed
+
+
+def summarize(results, elapsed):
+    from apps.evaluation.metrics import latency_summary
+
+    ok = [r for r in results if r[2]]
+    return {
+        "requests": len(results),
+        "errors": len(results) - len(ok),
+        "elapsed_s": round(elapsed, 2),
+        "throughput_rps": round(len(ok) / elapsed, 2) if elapsed else None,
+        "latency": latency_summary([r[0] for r in ok]),
+        "first_token": latency_summary([r[1] for r in ok if r[1] is not None]),
+    }
+
+
+def print_table(report):
+    header = f"{'path':<6} {'conc':>5} {'rps':>8} {'errors':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'ttft p95':>9}"
+    print(header)
+    print("-" * len(header))
+    for row in report:
+        latency, ttft = row["latency"], row["first_token"]
+        print(
+            f"{row['path']:<6} {row['concurrency']:>5} {row['throughput_rps'] or 0:>8.2f} {row['errors']:>6} "
+            f"{latency['p50_ms'] or 0:>9.1f} {latency['p95_ms'] or 0:>9.1f} {latency['p99_ms'] or 0:>9.1f} "
+            f"{ttft['p95_ms'] or 0:>9.1f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--paths", default="sync,async", help="Comma-separated: sync, async")
+    parser.add_argument("--concurrency", default="1,16,64", help="Comma-separated in-flight request levels")
+    parser.add_argument("--requests", type=int, default=100, help="Requests per path and concurrency level")
+    parser.add_argument("--stream", action="store_true", help="Use the SSE endpoints and measure time to first token")
+    parser.add_argument("--ground-truth", help="JSON lines with a 'question' field (e.g. the recall benchmark's file)")
+    parser.add_argument("--question", action="append", help="Question to send (repeatable), when no --ground-truth")
+    parser.add_argument("--timeout", type=float, default=300.0, help="Per-request timeout in seconds")
+    parser.add_argument("--output", help="Write the JSON report here")
+    args = parser.parse_args()
+
+    questions = load_questions(args)
+    routes = STREAM_PATHS if args.stream else PATHS
+
+    report = []
+    for path, concurrency in itertools.product(args.paths.split(","), [int(c) for c in args.concurrency.split(",")]):
+        url = args.base_url.rstrip("/") + routes[path]
+        print(f"▶ {path} x{concurrency}: {args.requests} requests to {url}")
+        results, elapsed = asyncio.run(run_level(url, questions, concurrency, args.requests, args.stream, args.timeout))
+        report.append({"path": path, "concurrency": concurrency, "stream": args.stream, **summarize(results, elapsed)})
+
+    print()
+    print_table(report)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
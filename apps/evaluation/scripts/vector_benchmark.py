@@ -0,0 +1,193 @@
+"""
+Memory / build time / recall trade-off of the vector index configurations:
+
+    python -m apps.evaluation.scripts.vector_benchmark --source chroma \\
+        --hnsw 16:100:10,16:100:64,32:200:128 --quantized float16:0,int8:0,int8:256,int8:128 \\
+        --ground-truth data/evaluation/ground_truth.jsonl --k 20 --output data/evaluation/vector_report.json
+
+Vectors come from the configured Chroma collection (--source chroma) or are random unit vectors
+(--synthetic N --dim D). Queries are the ground-truth questions embedded with the EmbeddingService, or corpus
+vectors with noise (--queries). The reference is an exact float32 scan; every configuration is built from scratch
+in a temporary directory and reports build time, memory, recall@k against that reference and p50/p95 latency:
+- HNSW "M:construction_ef:search_ef": a Chroma collection like VectorStoreClient's (memory = hnswlib's
+  per-element size, plus the size of the persisted index files),
+- quantized "dtype:dimensions" (0 = all dimensions): the QuantizedVectorIndex of VECTOR_STORAGE="quantized"
+  (memory = the in-RAM codes; the float32 vectors used for re-scoring stay memory-mapped on disk).
+"""
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+import django
+
+
+def load_chroma_vectors(batch_size=1000):
+    import numpy as np
+    from apps.rag_engine.connectors.vector_store import VectorStoreClient
+
+    collection = VectorStoreClient().get_collection()
+    ids, vectors, offset = [], [], 0
+    while True:
+        batch = collection.get(include=["embeddings"], limit=batch_size, offset=offset)
+        if not batch["ids"]:
+            break
+        ids.extend(batch["ids"])
+        vectors.extend(batch["embeddings"])
+        offset += len(batch["ids"])
+    return ids, np.asarray(vectors, dtype=np.float32)
+
+
+def synthetic_vectors(n, dim, seed=0):
+    import numpy as np
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((n, dim)).astype(np.float32)
+    return [str(i) for i in range(n)], vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def load_queries(args, corpus):
+    import numpy as np
+    if args.ground_truth:
+        from apps.rag_engine.connectors.embeddings import EmbeddingService
+        with open(args.ground_truth, encoding="utf-8") as f:
+            questions = [json.loads(line)["question"] for line in f if line.strip()]
+        return EmbeddingService().encode(questions[:args.queries])
+    rng = np.random.default_rng(1)
+    picked = corpus[rng.choice(len(corpus), size=min(args.queries, len(corpus)), replace=False)]
+    noisy = picked + rng.standard_normal(picked.shape).astype(np.float32) * args.noise / np.sqrt(corpus.shape[1])
+    return noisy / np.linalg.norm(noisy, axis=1, keepdims=True)
+
+
+def recall(retrieved, expected) -> float:
+    return len(set(retrieved) & set(expected)) / len(expected) if expected else 0.0
+
+
+def directory_bytes(path) -> int:
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+
+def bench_hnsw(ids, corpus, queries, exact, k, spec, batch_size):
+    import chromadb
+    from chromadb.config import Settings
+    from apps.evaluation.metrics import latency_summary
+    from apps.rag_engine.connectors.vector_store import hnsw_metadata
+
+    m, construction_ef, search_ef = (int(x) for x in spec.split(":"))
+    workdir = tempfile.mkdtemp(prefix="vector_benchmark_")
+    try:
+        client = chromadb.PersistentClient(path=workdir, settings=Settings(anonymized_telemetry=False))
+        collection = client.create_collection("benchmark", metadata=hnsw_metadata(
+            {"space": "l2", "M": m, "construction_ef": construction_ef, "search_ef": search_ef}
+        ))
+        start = time.perf_counter()
+        for i in range(0, len(ids), batch_size):
+            collection.add(ids=ids[i:i + batch_size], embeddings=corpus[i:i + batch_size].tolist())
+        build = time.perf_counter() - start
+
+        latencies, recalls = [], []
+        for query, expected in zip(queries, exact):
+            start = time.perf_counter()
+            found = collection.query(query_embeddings=[query.tolist()], n_results=k, include=[])["ids"][0]
+            latencies.append(time.perf_counter() - start)
+            recalls.append(recall(found, expected))
+        # hnswlib level-0 element: vector + 2*M links + link count + label
+        ram = len(ids) * (corpus.shape[1] * 4 + 2 * m * 4 + 4 + 8)
+        return {
+            "index": "hnsw", "config": spec, "build_s": round(build, 2), "memory_bytes": ram,
+            "disk_bytes": directory_bytes(workdir), "recall": round(sum(recalls) / len(recalls), 4),
+            "latency": latency_summary(latencies),
+        }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def bench_quantized(ids, corpus, queries, exact, k, spec, rescore_factor, batch_size):
+    from apps.evaluation.metrics import latency_summary
+    from apps.rag_engine.connectors.quantized_index import QuantizedVectorIndex
+
+    dtype, dimensions = spec.split(":")
+    workdir = tempfile.mkdtemp(prefix="vector_benchmark_")
+    try:
+        index = QuantizedVectorIndex(workdir, corpus.shape[1], dimensions=int(dimensions) or None, dtype=dtype)
+        start = time.perf_counter()
+        index.rebuild((ids[i:i + batch_size], corpus[i:i + batch_size]) for i in range(0, len(ids), batch_size))
+        build = time.perf_counter() - start
+
+        latencies, recalls = [], []
+        for query, expected in zip(queries, exact):
+            start = time.perf_counter()
+            found = [doc_id for doc_id, _ in index.search(query, k, k * rescore_factor)]
+            latencies.append(time.perf_counter() - start)
+            recalls.append(recall(found, expected))
+        return {
+            "index": "quantized", "config": f"{spec} x{rescore_factor}", "build_s": round(build, 2),
+            "memory_bytes": index.memory_bytes, "disk_bytes": directory_bytes(workdir),
+            "recall": round(sum(recalls) / len(recalls), 4), "latency": latency_summary(latencies),
+        }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def print_table(rows, k):
+    header = f"{'index':<10} {'config':<18} {'build s':>8} {'RAM MiB':>8} {'disk MiB':>9} {f'recall@{k}':>10} {'p50 ms':>8} {'p95 ms':>8}"
+    print(header)
+    print("-" * len(header))
+    for row in rows:
+        print(
+            f"{row['index']:<10} {row['config']:<18} {row['build_s']:>8.2f} {row['memory_bytes'] / 2**20:>8.1f} "
+            f"{row['disk_bytes'] / 2**20:>9.1f} {row['recall']:>10.4f} {row['latency']['p50_ms'] or 0:>8.2f} "
+            f"{row['latency']['p95_ms'] or 0:>8.2f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", choices=["chroma", "synthetic"], default="chroma")
+    parser.add_argument("--synthetic", type=int, default=50000, help="Number of random vectors (--source synthetic)")
+    parser.add_argument("--dim", type=int, default=384, help="Dimension of the random vectors (--source synthetic)")
+    parser.add_argument("--ground-truth", help="JSON lines with a 'question' field, embedded as queries")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--noise", type=float, default=0.5, help="Noise added to corpus vectors used as queries")
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--hnsw", default="16:100:10,16:100:64,32:200:128", help="Comma-separated M:construction_ef:search_ef")
+    parser.add_argument("--quantized", default="float16:0,int8:0,int8:256,int8:128", help="Comma-separated dtype:dimensions")
+    parser.add_argument("--rescore-factor", type=int, default=4, help="Short list size = k x factor")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--output", help="Write the JSON report here")
+    args = parser.parse_args()
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+    os.environ.setdefault("RAG_ENGINE_PRELOAD", "False")
+    django.setup()
+    import numpy as np
+
+    ids, corpus = load_chroma_vectors(args.batch_size) if args.source == "chroma" else synthetic_vectors(args.synthetic, args.dim)
+    if not ids:
+        raise SystemExit("No vectors to benchmark: the collection is empty.")
+    queries = load_queries(args, corpus)
+    k = min(args.k, len(ids))
+    top = np.argsort(-(queries @ corpus.T), axis=1)[:, :k]
+    exact = [[ids[i] for i in row] for row in top]
+    print(f"▶ {len(ids)} vectors x {corpus.shape[1]} dims, {len(queries)} queries, recall@{k} against an exact float32 scan")
+
+    rows = []
+    for spec in filter(None, args.hnsw.split(",")):
+        print(f"  HNSW {spec}...")
+        rows.append(bench_hnsw(ids, corpus, queries, exact, k, spec, args.batch_size))
+    for spec in filter(None, args.quantized.split(",")):
+        print(f"  quantized {spec}...")
+        rows.append(bench_quantized(ids, corpus, queries, exact, k, spec, args.rescore_factor, args.batch_size))
+
+    print()
+    print_table(rows, k)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"vectors": len(ids), "dimensions": int(corpus.shape[1]), "queries": len(queries), "k": k,
+                       "results": rows}, f, indent=2)
+        print(f"\nReport written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,26 @@
+import logging
+import threading
 from django.apps import AppConfig
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
 
 class IngestionConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'apps.ingestion'  # ⚠️ Doit être 'apps.ingestion', pas juste 'ingestion'
\ No newline at end of file
+    name = 'apps.ingestion'  # ⚠️ Doit être 'apps.ingestion', pas juste 'ingestion'
+
+    def ready(self):
+        from apps.rag_engine.apps import RagEngineConfig
+        # Same web-worker guard as the model preload: `migrate`, `shell`, ... must not start ingestion jobs
+        if not getattr(settings, 'INGESTION_RESUME_ON_STARTUP', True) or not RagEngineConfig._should_preload():
+            return
+        # Queries are discouraged while apps are loading: the queue (which re-enqueues interrupted jobs) is built just after
+        threading.Thread(target=self._resume_jobs, name="ingestion-resume", daemon=True).start()
+
+    @staticmethod
+    def _resume_jobs():
+        from .services.job_queue import IngestionJobQueue
+        try:
+            IngestionJobQueue()
+        except Exception as e:
+            logger.error(f"Could not resume interrupted ingestion jobs: {e}", exc_info=True)
@@ -0,0 +1,296 @@
+import glob
+import json
+import os
+import queue
+import signal
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from django.utils import timezone
+from apps.ingestion.models import LegalDocument
+from apps.ingestion.services.job_queue import StageTracker, fail_document, finish_document
+from apps.ingestion.services.loader import DocumentLoader
+from apps.rag_engine.logic.telemetry import log_summary, request_context, submit_in_context
+
+
+def _ignore_sigint():
+    """Parse pool initializer: Ctrl+C reaches the whole process group, only the main process handles it."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+class ChunkRowStream:
+    """
+    Bounded hand-off of one document's chunk rows from the CPU stage to the IO stage, so a document is never held
+    whole in memory: the CPU thread blocks once `maxsize` rows wait for enrichment. Parsing errors are re-raised
+    on the IO side; when the IO side stops early (error, empty PDF), the CPU side stops parsing.
+    """
+    _DONE = object()
+
+    def __init__(self, maxsize: int):
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.closed = threading.Event()
+
+    def put(self, item) -> bool:
+        while not self.closed.is_set():
+            try:
+                self.queue.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def feed(self, rows):
+        """CPU side: never raises, errors are passed to the IO side."""
+        try:
+            for row in rows:
+                if not self.put(row):
+                    return
+        except Exception as e:
+            self.put(e)
+            return
+        finally:
+            rows.close()
+        self.put(self._DONE)
+
+    def close(self):
+        self.closed.set()
+
+    def __iter__(self):
+        try:
+            while True:
+                item = self.queue.get()
+                if item is self._DONE:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            self.close()
+
+
+class Command(BaseCommand):
+    help = (
+        'Ingests many PDFs in one process: models are loaded once, parsing/chunking (CPU) and '
+        'enrichment/indexing (LLM + databases) run in separate worker pools. Every document is tracked '
+        'in LegalDocument, so re-running the same command resumes an interrupted run.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='*', help='PDF files, directories or glob patterns ("-" reads paths from stdin)')
+        parser.add_argument('--manifest', help='File with one path per line, or JSON lines {"path": ..., "title": ..., "doc_type": ...}')
+        parser.add_argument('--doc-type', default='', help='Document type of inputs that don\'t set one in the manifest')
+        parser.add_argument('--cpu-workers', type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                            help='Documents parsed and chunked concurrently')
+        parser.add_argument('--parse-processes', type=int, default=os.cpu_count() or 1,
+                            help='Size of the process pool shared by all page parsing')
+        parser.add_argument('--io-workers', type=int, default=2, help='Documents enriched and indexed concurrently')
+        parser.add_argument('--prefetch', type=int, default=None,
+                            help='Max documents held in memory between the two stages (default: cpu + 2 x io workers)')
+        parser.add_argument('--retry-failed', action='store_true', help='Also re-run documents that failed in a previous run')
+        parser.add_argument('--limit', type=int, default=None, help='Only process the first N pending documents')
+
+    def handle(self, *args, **options):
+        inputs = self.collect_inputs(options)
+        if not inputs:
+            raise CommandError("No PDF found in the given paths / manifest.")
+
+        jobs, already_done, failed_before = self.register_documents(inputs, options['retry_failed'])
+        if options['limit']:
+            jobs = jobs[:options['limit']]
+        self.stdout.write(self.style.SUCCESS(
+            f"🚀 {len(inputs)} documents found: {already_done} already ingested, {len(jobs)} to process"
+            + (f", {failed_before} failed previously (use --retry-failed)." if failed_before else ".")
+        ))
+        if not jobs:
+            return
+
+        # Load every model / client once, before the workers race to build the singletons
+        self.stdout.write("Loading models...")
+        from apps.ingestion.services.enrichment import EnrichmentEngine
+        from apps.rag_engine.connectors.embeddings import EmbeddingService
+        EmbeddingService()
+        EnrichmentEngine()
+        DocumentLoader()
+
+        self.totals = {"done": 0, "skipped": 0, "failed": 0, "chunks": 0, "pages": 0}
+        self.totals_lock = threading.Lock()
+        self.total_jobs = len(jobs)
+        self.started = time.perf_counter()
+
+        cpu_workers, io_workers = max(1, options['cpu_workers']), max(1, options['io_workers'])
+        slots = threading.BoundedSemaphore(options['prefetch'] or cpu_workers + 2 * io_workers)
+        parse_pool = ProcessPoolExecutor(max_workers=max(1, options['parse_processes']), initializer=_ignore_sigint)
+        cpu_pool = ThreadPoolExecutor(max_workers=cpu_workers, thread_name_prefix="bulk-cpu")
+        io_pool = ThreadPoolExecutor(max_workers=io_workers, thread_name_prefix="bulk-io")
+        self.interrupted = threading.Event()
+        interrupted = False
+        try:
+            for job in jobs:
+                slots.acquire()
+                cpu_pool.submit(self.prepare, job, parse_pool, io_pool, slots)
+        except KeyboardInterrupt:
+            interrupted = True
+            self.interrupted.set()
+            self.stdout.write(self.style.WARNING(
+                "Interrupted: finishing the documents in flight. Re-run the same command to resume."
+            ))
+        finally:
+            # CPU stage first: it is the one submitting to the IO pool
+            cpu_pool.shutdown(wait=True, cancel_futures=interrupted)
+            io_pool.shutdown(wait=True)
+            parse_pool.shutdown(wait=True, cancel_futures=interrupted)
+        self.print_summary()
+
+    def collect_inputs(self, options):
+        """-> [(absolute path, title, doc_type)], titles unique. Directory inputs are titled by their relative path."""
+        entries = []
+        for entry in options['paths']:
+            if entry == '-':
+                entries.extend((line.strip(), None, None) for line in sys.stdin if line.strip())
+            elif os.path.isdir(entry):
+                for root, _, files in os.walk(entry):
+                    for name in sorted(files):
+                        if name.lower().endswith('.pdf'):
+                            path = os.path.join(root, name)
+                            entries.append((path, os.path.relpath(path, entry).replace(os.sep, '/'), None))
+            elif glob.has_magic(entry):
+                entries.extend((path, None, None) for path in sorted(glob.glob(entry, recursive=True)))
+            else:
+                entries.append((entry, None, None))
+
+        if options['manifest']:
+            with open(options['manifest'], encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line or line.startswith('#'):
+                        continue
+                    if line.startswith('{'):
+                        item = json.loads(line)
+                        entries.append((item['path'], item.get('title'), item.get('doc_type')))
+                    else:
+                        entries.append((line, None, None))
+
+        inputs, titles = [], set()
+        for path, title, doc_type in entries:
+            if not os.path.isfile(path) or not path.lower().endswith('.pdf'):
+                self.stdout.write(self.style.WARNING(f"Skipping {path}: not a PDF file"))
+                continue
+            title = title or os.path.basename(path)
+            if title in titles:
+                self.stdout.write(self.style.WARNING(f"Skipping {path}: duplicate document name '{title}'"))
+                continue
+            titles.add(title)
+            inputs.append((os.path.abspath(path), title, doc_type or options['doc_type']))
+        return inputs
+
+    def register_documents(self, inputs, retry_failed):
+        """Creates / reuses one LegalDocument per input -> ([(document_id, path, title, doc_type)] to run, completed, failed skipped)."""
+        existing = {}
+        titles = [title for _, title, _ in inputs]
+        for i in range(0, len(titles), 500):
+            for document in LegalDocument.objects.filter(title__in=titles[i:i + 500]).order_by('uploaded_at'):
+                existing[document.title] = document
+
+        jobs, already_done, failed_before = [], 0, 0
+        for path, title, doc_type in inputs:
+            document = existing.get(title)
+            if document is None:
+                document = LegalDocument.objects.create(title=title, file=path, doc_type=doc_type)
+            elif document.status == LegalDocument.Status.COMPLETED:
+                already_done += 1
+                continue
+            elif document.status == LegalDocument.Status.FAILED and not retry_failed:
+                failed_before += 1
+                continue
+            else:
+                LegalDocument.objects.filter(pk=document.pk).update(
+                    status=LegalDocument.Status.QUEUED, progress=0.0, processing_error="", file=path, doc_type=doc_type
+                )
+            jobs.append((document.pk, path, title, doc_type))
+        return jobs, already_done, failed_before
+
+    def prepare(self, job, parse_pool, io_pool, slots):
+        """CPU stage: fingerprint, page parsing and semantic chunking, streaming the chunk rows to the IO stage."""
+        document_id, path, title, doc_type = job
+        handed_off = False
+        close_old_connections()
+        try:
+            with request_context(str(document_id)) as timings:
+                LegalDocument.objects.filter(pk=document_id).update(started_at=timezone.now())
+                tracker = StageTracker(document_id)
+                loader = DocumentLoader(doc_type=doc_type)
+                tracker("parse")
+                if loader.is_unchanged(path, title):
+                    finish_document(document_id, loader, tracker, True)
+                    self.count(document_id, title, "skipped", loader.chunk_count, 0)
+                    return
+                stats = loader.new_stats(path)
+                tracker("chunk")
+                rows = loader.iter_chunk_rows(path, title, stats, executor=parse_pool)
+                stream = ChunkRowStream(2 * getattr(settings, 'INGESTION_CHUNK_BATCH_SIZE', 256))
+                submit_in_context(io_pool, self.index, job, loader, tracker, stats, stream, timings, slots)
+                handed_off = True
+                # From here on the IO stage owns the outcome of the document (including parsing errors)
+                stream.feed(rows)
+        except Exception as e:
+            self.job_failed(document_id, title, e)
+        finally:
+            if not handed_off:
+                slots.release()
+            close_old_connections()
+
+    def index(self, job, loader, tracker, stats, stream, timings, slots):
+        """IO stage: LLM enrichment and Neo4j / Chroma / BM25 writes, batch by batch as the CPU stage streams rows."""
+        document_id, path, title, _ = job
+        close_old_connections()
+        try:
+            success = loader.index_chunk_rows(title, stream, stats, tracker)
+            if not success:
+                self.stderr.write(f"❌ {title}: {loader.last_error}")
+            finish_document(document_id, loader, tracker, success)
+            self.count(document_id, title, "done" if success else "failed", loader.chunk_count, stats["page_count"])
+            log_summary("ingestion", timings, document_id=str(document_id), document=title, success=success)
+        except Exception as e:
+            self.job_failed(document_id, title, e)
+        finally:
+            stream.close()
+            slots.release()
+            close_old_connections()
+
+    def job_failed(self, document_id, title, error):
+        if isinstance(error, BrokenProcessPool) and self.interrupted.is_set():
+            # The run was stopped, not the document: left queued, the next run resumes it
+            LegalDocument.objects.filter(pk=document_id).update(status=LegalDocument.Status.QUEUED, progress=0.0)
+            self.stdout.write(self.style.WARNING(f"Interrupted: {title} left queued."))
+            return
+        self.stderr.write(f"❌ {title}: {error}")
+        fail_document(document_id, str(error))
+        self.count(document_id, title, "failed", 0, 0)
+
+    def count(self, document_id, title, outcome, chunks, pages):
+        with self.totals_lock:
+            self.totals[outcome] += 1
+            self.totals["chunks"] += chunks
+            self.totals["pages"] += pages
+            finished = self.totals["done"] + self.totals["skipped"] + self.totals["failed"]
+        rate = finished / ((time.perf_counter() - self.started) / 60 or 1e-9)
+        self.stdout.write(f"[{finished}/{self.total_jobs}] {outcome:<7} {title} ({chunks} chunks) - {rate:.1f} docs/min")
+
+    def print_summary(self):
+        elapsed = time.perf_counter() - self.started
+        minutes = elapsed / 60 or 1e-9
+        totals = self.totals
+        processed = totals["done"] + totals["skipped"] + totals["failed"]
+        self.stdout.write(self.style.SUCCESS(
+            f"\n✅ Bulk ingestion finished in {elapsed:.1f}s: {totals['done']} ingested, {totals['skipped']} unchanged, "
+            f"{totals['failed']} failed ({processed}/{self.total_jobs} documents)."
+        ))
+        self.stdout.write(
+            f"   Throughput: {processed / minutes:.1f} docs/min, {totals['chunks'] / minutes:.1f} chunks/min, "
+            f"{totals['pages'] / minutes:.1f} pages/min"
+        )
@@ -1,6 +1,7 @@
 import os
 from django.core.management.base import BaseCommand
 from apps.ingestion.services.loader import DocumentLoader
+from apps.rag_engine.logic.telemetry import log_summary, request_context
 
 class Command(BaseCommand):
     help = 'Ingests a PDF file into Neo4j and ChromaDB using the GraphRAG pipeline'
@@ -8,6 +9,7 @@ class Command(BaseCommand):
     def add_arguments(self, parser):
         # On définit l'argument qui acceptera le chemin du fichier
         parser.add_argument('file_path', type=str, help='Absolute path to the PDF file')
+        parser.add_argument('--doc-type', default='', help='Document type stored on every chunk (e.g. contract, judgment)')
 
     def handle(self, *args, **options):
         file_path = options['file_path']
@@ -21,10 +23,12 @@ class Command(BaseCommand):
         self.stdout.write(self.style.SUCCESS(f"🚀 Starting ingestion for {filename}..."))
 
         # 2. Appel de ton service Loader
-        loader = DocumentLoader()
+        loader = DocumentLoader(doc_type=options['doc_type'])
         
         # On appelle la fonction que tu as codée
-        success = loader.process_and_load(file_path, filename)
+        with request_context() as timings:
+            success = loader.process_and_load(file_path, filename)
+            log_summary("ingestion", timings, document=filename, success=success)
 
         # 3. Résultat
         if success:
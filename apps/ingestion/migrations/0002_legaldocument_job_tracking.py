@@ -0,0 +1,41 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ingestion', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='legaldocument',
+            name='status',
+            field=models.CharField(choices=[('queued', 'Queued'), ('parse', 'Parsing PDF'), ('chunk', 'Semantic chunking'), ('enrich', 'LLM enrichment'), ('index', 'Indexing (Neo4j & Chroma)'), ('completed', 'Completed'), ('failed', 'Failed')], default='queued', max_length=16),
+        ),
+        migrations.AddField(
+            model_name='legaldocument',
+            name='progress',
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.AddField(
+            model_name='legaldocument',
+            name='stage_timings',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='legaldocument',
+            name='chunk_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='legaldocument',
+            name='started_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='legaldocument',
+            name='finished_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
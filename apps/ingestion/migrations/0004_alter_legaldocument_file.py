@@ -0,0 +1,17 @@
+import apps.ingestion.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ingestion', '0003_legaldocument_fingerprint'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='legaldocument',
+            name='file',
+            field=models.FileField(max_length=500, upload_to=apps.ingestion.models.upload_to),
+        ),
+    ]
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ingestion', '0004_alter_legaldocument_file'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='legaldocument',
+            name='doc_type',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
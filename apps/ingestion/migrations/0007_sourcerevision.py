@@ -0,0 +1,20 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ingestion', '0006_legaldocument_lease_expires_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SourceRevision',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=255, unique=True)),
+                ('generation', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(db_index=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,24 @@
+from django.db import migrations
+
+
+def backfill_status(apps, schema_editor):
+    # 0002 added `status` with the 'queued' default on every existing row: documents ingested before
+    # job tracking would all be picked up again by the queue. Never-started rows get their real outcome back.
+    LegalDocument = apps.get_model('ingestion', 'LegalDocument')
+    legacy = LegalDocument.objects.filter(status='queued', started_at__isnull=True)
+    legacy.filter(is_processed=True).update(status='completed', progress=100.0)
+    legacy.filter(is_processed=False, processing_error__isnull=True).update(
+        processing_error="Not processed before job tracking was added: upload the document again."
+    )
+    legacy.filter(is_processed=False).update(status='failed')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ingestion', '0007_sourcerevision'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_status, migrations.RunPython.noop),
+    ]
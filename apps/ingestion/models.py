@@ -2,18 +2,40 @@ import os
 import uuid
 from django.db import models
 
+# Uploads land here; documents registered by `ingest_bulk` keep the absolute path of the archived file instead
+UPLOAD_DIR = 'raw_pdfs'
+
 def upload_to(instance, filename):
     ext = filename.split('.')[-1]
     filename = f"{uuid.uuid4()}.{ext}"
-    return os.path.join('raw_pdfs', filename)
+    return os.path.join(UPLOAD_DIR, filename)
 
 class LegalDocument(models.Model):
+    class Status(models.TextChoices):
+        QUEUED = 'queued', 'Queued'
+        PARSING = 'parse', 'Parsing PDF'
+        CHUNKING = 'chunk', 'Semantic chunking'
+        ENRICHING = 'enrich', 'LLM enrichment'
+        INDEXING = 'index', 'Indexing (Neo4j & Chroma)'
+        COMPLETED = 'completed', 'Completed'
+        FAILED = 'failed', 'Failed'
+
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     title = models.CharField(max_length=255, blank=True)
-    file = models.FileField(upload_to=upload_to)
+    doc_type = models.CharField(max_length=64, blank=True, default="")
+    file = models.FileField(upload_to=upload_to, max_length=500)
     uploaded_at = models.DateTimeField(auto_now_add=True)
     is_processed = models.BooleanField(default=False)
     processing_error = models.TextField(blank=True, null=True)
+    status = models.CharField(max_length=16, choices=Status.choices, default=Status.QUEUED)
+    progress = models.FloatField(default=0.0)
+    stage_timings = models.JSONField(default=dict, blank=True)
+    chunk_count = models.PositiveIntegerField(default=0)
+    fingerprint = models.CharField(max_length=64, blank=True, db_index=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+    # Claim of the worker process running the job, renewed while it runs: an expired lease means the job was interrupted
+    lease_expires_at = models.DateTimeField(blank=True, null=True, db_index=True)
 
     def __str__(self):
         return self.title or str(self.id)
@@ -21,4 +43,17 @@ class LegalDocument(models.Model):
     def save(self, *args, **kwargs):
         if not self.title and self.file:
             self.title = self.file.name
-        super().save(*args, **kwargs)
\ No newline at end of file
+        super().save(*args, **kwargs)
+
+
+class SourceRevision(models.Model):
+    """
+    Generation counter of an indexed document (by source name), bumped whenever its chunks change.
+    Processes caching answers poll it to drop the ones built on a document re-ingested elsewhere.
+    """
+    source = models.CharField(max_length=255, unique=True)
+    generation = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"{self.source} (v{self.generation})"
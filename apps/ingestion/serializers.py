@@ -4,5 +4,15 @@ from .models import LegalDocument
 class LegalDocumentSerializer(serializers.ModelSerializer):
     class Meta:
         model = LegalDocument
-        fields = ['id', 'title', 'file', 'uploaded_at', 'is_processed', 'processing_error']
-        read_only_fields = ['id', 'uploaded_at', 'is_processed', 'processing_error']
\ No newline at end of file
+        fields = ['id', 'title', 'doc_type', 'file', 'uploaded_at', 'is_processed', 'processing_error',
+                  'status', 'progress', 'stage_timings', 'chunk_count', 'fingerprint', 'started_at', 'finished_at']
+        read_only_fields = ['id', 'uploaded_at', 'is_processed', 'processing_error',
+                            'status', 'progress', 'stage_timings', 'chunk_count', 'fingerprint', 'started_at', 'finished_at']
+
+class IngestionStatusSerializer(serializers.ModelSerializer):
+    job_id = serializers.UUIDField(source='id', read_only=True)
+
+    class Meta:
+        model = LegalDocument
+        fields = ['job_id', 'title', 'doc_type', 'status', 'progress', 'stage_timings', 'chunk_count', 'fingerprint',
+                  'is_processed', 'processing_error', 'uploaded_at', 'started_at', 'finished_at']
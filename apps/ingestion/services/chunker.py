@@ -1,33 +1,14 @@
-import time
 import logging
-import torch
-import json
 import re
-import os
-import concurrent.futures
-from functools import partial
+import numpy as np
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_experimental.text_splitter import SemanticChunker
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import StrOutputParser
-from langchain_community.chat_models import ChatOllama
-from tqdm import tqdm
+from apps.rag_engine.connectors.embeddings import EmbeddingService
+from apps.ingestion.services.enrichment import EnrichmentEngine
 
 logger = logging.getLogger(__name__)
 
-def get_device_config():
-    device = "cuda" if torch.cuda.is_available() else "cpu"
-    model_kwargs = {"device": device, "trust_remote_code": True}
-    encode_kwargs = {"device": device, "batch_size": 32}
-
-    if device == "cuda" and torch.cuda.is_bf16_supported():
-        logger.info("GPU Acceleration: Bfloat16 enabled (RTX 4060 Optimized).")
-        model_kwargs["model_kwargs"] = {"torch_dtype": torch.bfloat16}
-    else:
-        logger.info(f"GPU Acceleration: Standard Precision on {device}.")
-    return model_kwargs, encode_kwargs
-
+SENTENCE_SPLIT_PATTERN = re.compile(r"(?<=[.?!])\s+")
+SENTENCE_END_PATTERN = re.compile(r"[.?!:;][\"')\]]*\s*$")
 
 def split_text_into_chunks_recursive(text, chunk_size=1200, chunk_overlap=200):
     logger.warning("Fallback: Using Recursive Character Splitter.")
@@ -35,114 +16,106 @@ def split_text_into_chunks_recursive(text, chunk_size=1200, chunk_overlap=200):
     return text_splitter.split_text(text)
 
 def split_text_semantically(text, threshold=95):
-    if len(text) < 1000: return [text]
-    model_kwargs, encode_kwargs = get_device_config()
-    embeddings = HuggingFaceEmbeddings(
-        model_name="all-MiniLM-L6-v2",
-        model_kwargs=model_kwargs,
-        encode_kwargs=encode_kwargs
-    )
-    text_splitter = SemanticChunker(
-        embeddings, 
-        breakpoint_threshold_type="percentile", 
-        breakpoint_threshold_amount=threshold
-    )
-    docs = text_splitter.create_documents([text])
-    chunks = [d.page_content for d in docs]
-    
-    if len(text) > 5000 and len(chunks) < 3:
-        return split_text_into_chunks_recursive(text)
-    
-    logger.info(f"Semantic Splitter success: {len(chunks)} chunks.")
+    chunks, _ = split_text_semantically_with_embeddings(text, threshold=threshold)
     return chunks
 
+def _semantic_spans(sentences, threshold=95, buffer_size=1):
+    """Percentile breakpoints over sentence windows -> ([(first, last)] sentence spans, [normalized mean vector])."""
+    combined = [
+        " ".join(sentences[max(0, i - buffer_size): i + buffer_size + 1])
+        for i in range(len(sentences))
+    ]
+    # Sentence windows are only embedded to find breakpoints: not worth a place in the embedding cache
+    vectors = EmbeddingService().encode(combined, persist=False)
+    distances = 1.0 - np.sum(vectors[:-1] * vectors[1:], axis=1)
+    breakpoint_distance = np.percentile(distances, threshold)
+    breakpoints = [int(i) for i in np.where(distances > breakpoint_distance)[0]]
+
+    spans, span_vectors = [], []
+    start = 0
+    for end in breakpoints + [len(sentences) - 1]:
+        if end < start:
+            continue
+        spans.append((start, end))
+        pooled = vectors[start:end + 1].mean(axis=0)
+        span_vectors.append(pooled / (np.linalg.norm(pooled) or 1.0))
+        start = end + 1
+    return spans, span_vectors
+
+
+def split_text_semantically_with_embeddings(text, threshold=95, buffer_size=1):
+    """
+    Percentile-breakpoint semantic splitting (same algorithm as langchain's SemanticChunker) on the shared
+    EmbeddingService. Every sentence window is encoded in one batched pass and the chunk vectors are the
+    mean of their sentence vectors, so they can be reused for indexing. Returns (chunks, vectors or None).
+    """
+    if len(text) < 1000: return [text], None
+    sentences = [s for s in SENTENCE_SPLIT_PATTERN.split(text) if s.strip()]
+    if len(sentences) < 3:
+        return split_text_into_chunks_recursive(text), None
+
+    spans, chunk_vectors = _semantic_spans(sentences, threshold, buffer_size)
+    chunks = [" ".join(sentences[start:end + 1]) for start, end in spans]
 
-
-def _process_single_chunk_graph(chunk_data):
-    chunk, chain, doc_summary = chunk_data
-    if len(chunk) < 40:
-        return {"text_content": chunk, "entities": []}
-
-
-    response_json_str = chain.invoke({
-        "doc_context": doc_summary,
-        "chunk_content": chunk
-    })
-    
-    json_match = re.search(r"\{.*\}", response_json_str, re.DOTALL)
-    if json_match:
-        data = json.loads(json_match.group(0))
-        
-        context = data.get("context", "General context.")
-        entities = data.get("entities", [])
-        
-        clean_entities = []
-        if isinstance(entities, list):
-            for ent in entities:
-                if isinstance(ent, dict) and "name" in ent:
-                    clean_entities.append(ent)
-        enriched_text = f"Context: {context}\n\nContent: {chunk}"
-        
-        return {
-            "text_content": enriched_text,
-            "entities": clean_entities
-        }
-    
-    return {"text_content": chunk, "entities": []}
-
-def enrich_and_extract_graph(chunks, full_document_text):
-    if not chunks: return []
-
-    ollama_url = os.getenv("OLLAMA_BASE_URL", "http://host.docker.internal:11434")
-    llm = ChatOllama(
-        model="mistral-nemo",
-        temperature=0,
-        base_url=ollama_url,
-        format="json"
-    )
-
-    prompt = ChatPromptTemplate.from_template(
-        """
-        You are an expert at Knowledge Graph Extraction. Analyze this document chunk.
-        
-        <global_document_context>
-        {doc_context}
-        </global_document_context>
-
-        <chunk_to_analyze>
-        {chunk_content}
-        </chunk_to_analyze>
-
-        TASK:
-        1. Summarize the role of this chunk within the document in 1 short sentence.
-        2. Extract key entities: Financial Concepts (Asset, Liability, etc.), Persons, or Laws.
-
-        Return ONLY a JSON object:
-        {{
-            "context": "Short summary here",
-            "entities": [
-                {{"name": "EntityName", "type": "TYPE"}}
-            ]
-        }}
-        """
-    )
-    
-    chain = prompt | llm | StrOutputParser()
-    doc_summary = full_document_text[:1500] + "..."
-    work_items = [(chunk, chain, doc_summary) for chunk in chunks]
-    max_workers = 2 if torch.cuda.is_available() else 4
-    
-    print(f"Starting Contextual Enrichment & Graph Extraction (Workers: {max_workers})...")
-    
-    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-        results = list(tqdm(
-            executor.map(_process_single_chunk_graph, work_items),
-            total=len(chunks),
-            desc="Analyzing Chunks",
-            unit="chunk"
-        ))
-
-    return results
+    if len(text) > 5000 and len(chunks) < 3:
+        return split_text_into_chunks_recursive(text), None
+
+    logger.info(f"Semantic Splitter success: {len(chunks)} chunks ({len(sentences)} sentences embedded in one pass).")
+    return chunks, np.vstack(chunk_vectors)
+
+
+def iter_semantic_chunks(pages, threshold=95, buffer_size=1, window_sentences=400, max_carry_chars=2000):
+    """
+    Streaming variant for very large documents: pages [(page_number, text)] are consumed lazily and split
+    window by window (window_sentences at a time), so chunks come out while later pages are still being
+    parsed and memory is bounded by the window. The last chunk of a window may continue on the next pages,
+    so it is carried over and re-split with them. Yields (chunk, vector or None, page_start, page_end).
+    """
+    window = []  # [(sentence, page the sentence starts on)]
+    carry, carry_page = "", None
+    emitted = 0
+
+    def split(final):
+        sentences = [sentence for sentence, _ in window]
+        if len(sentences) < 3:
+            return [(0, len(sentences) - 1, None)] if final else []
+        spans, vectors = _semantic_spans(sentences, threshold, buffer_size)
+        if not final and len(spans) > 1:
+            spans = spans[:-1]
+        return [(start, end, vector) for (start, end), vector in zip(spans, vectors)]
+
+    def emit(spans):
+        for start, end, vector in spans:
+            yield " ".join(sentence for sentence, _ in window[start:end + 1]), vector, window[start][1], window[end][1]
+
+    for page_number, text in pages:
+        if carry:
+            text = f"{carry} {text}"
+        sentences = [s for s in SENTENCE_SPLIT_PATTERN.split(text) if s.strip()]
+        first_page = carry_page if carry else page_number
+        carry, carry_page = "", None
+        # A sentence running over the page break is completed with the next page's text
+        if sentences and not SENTENCE_END_PATTERN.search(sentences[-1]) and len(sentences[-1]) <= max_carry_chars:
+            carry, carry_page = sentences.pop(), (first_page if not sentences else page_number)
+        window.extend((sentence, first_page if i == 0 else page_number) for i, sentence in enumerate(sentences))
+
+        if len(window) >= window_sentences:
+            spans = split(final=False)
+            yield from emit(spans)
+            emitted += len(spans)
+            window = window[spans[-1][1] + 1:]
+
+    if carry:
+        window.append((carry, carry_page))
+    if window:
+        spans = split(final=True)
+        yield from emit(spans)
+        emitted += len(spans)
+    logger.info(f"Streaming semantic splitter: {emitted} chunks.")
+
+
+def enrich_and_extract_graph(chunks, full_document_text, progress_callback=None):
+    return EnrichmentEngine().enrich(chunks, full_document_text, progress_callback=progress_callback)
 
 
 def process_document(text, filename=None, **kwargs):
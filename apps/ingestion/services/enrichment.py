@@ -0,0 +1,388 @@
+import hashlib
+import json
+import logging
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from django.conf import settings
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.output_parsers import StrOutputParser
+from tqdm import tqdm
+from apps.rag_engine.llm.gateway import get_llm
+from apps.rag_engine.logic.telemetry import span, submit_in_context
+
+logger = logging.getLogger(__name__)
+
+# Bump when the prompts or the expected JSON shape change: cached results of older prompts are ignored
+PROMPT_VERSION = "v1"
+MIN_CHUNK_LENGTH = 40
+
+SINGLE_CHUNK_PROMPT = ChatPromptTemplate.from_template(
+    """
+    You are an expert at Knowledge Graph Extraction. Analyze this document chunk.
+
+    <global_document_context>
+    {doc_context}
+    </global_document_context>
+
+    <chunk_to_analyze>
+    {chunk_content}
+    </chunk_to_analyze>
+
+    TASK:
+    1. Summarize the role of this chunk within the document in 1 short sentence.
+    2. Extract key entities: Financial Concepts (Asset, Liability, etc.), Persons, or Laws.
+
+    Return ONLY a JSON object:
+    {{
+        "context": "Short summary here",
+        "entities": [
+            {{"name": "EntityName", "type": "TYPE"}}
+        ]
+    }}
+    """
+)
+
+BATCH_PROMPT = ChatPromptTemplate.from_template(
+    """
+    You are an expert at Knowledge Graph Extraction. Analyze each of the document chunks below.
+
+    <global_document_context>
+    {doc_context}
+    </global_document_context>
+
+    {chunks}
+
+    TASK, for EVERY chunk:
+    1. Summarize the role of the chunk within the document in 1 short sentence.
+    2. Extract key entities: Financial Concepts (Asset, Liability, etc.), Persons, or Laws.
+
+    Return ONLY a JSON object with one entry per chunk, using the chunk ids above:
+    {{
+        "chunks": [
+            {{"id": 0, "context": "Short summary here", "entities": [{{"name": "EntityName", "type": "TYPE"}}]}}
+        ]
+    }}
+    """
+)
+
+TRAILING_COMMA_PATTERN = re.compile(r",\s*([}\]])")
+CODE_FENCE_PATTERN = re.compile(r"```(?:json)?", re.IGNORECASE)
+
+
+def chunk_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _close_truncated(text: str) -> str:
+    # Appends the brackets a reply cut off mid-object (e.g. num_predict reached) is missing
+    stack, in_string, escaped = [], False, False
+    for char in text:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            stack.append("}" if char == "{" else "]")
+        elif char in "}]" and stack:
+            stack.pop()
+    if in_string:
+        text += '"'
+    return TRAILING_COMMA_PATTERN.sub(r"\1", text.rstrip().rstrip(",")) + "".join(reversed(stack))
+
+
+def parse_json_reply(text: str):
+    """Best-effort parse of an LLM JSON reply: strips code fences and prose, trailing commas, closes truncated objects."""
+    if not text:
+        return None
+    cleaned = CODE_FENCE_PATTERN.sub("", text).strip()
+    start = cleaned.find("{")
+    if start == -1:
+        return None
+    end = cleaned.rfind("}")
+    candidates = []
+    if end > start:
+        candidates.append(cleaned[start:end + 1])
+        candidates.append(TRAILING_COMMA_PATTERN.sub(r"\1", cleaned[start:end + 1]))
+    for candidate in candidates:
+        data = _loads_dict(candidate)
+        if data is not None:
+            return data
+    # Truncated reply: drop the dangling member after the last comma until the closed-up prefix parses
+    tail = cleaned[start:]
+    for _ in range(20):
+        data = _loads_dict(_close_truncated(tail))
+        if data is not None:
+            return data
+        cut = tail.rfind(",")
+        if cut <= 0:
+            return None
+        tail = tail[:cut]
+    return None
+
+
+def _loads_dict(text: str):
+    try:
+        data = json.loads(text)
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def clean_entities(entities):
+    if not isinstance(entities, list):
+        return []
+    return [ent for ent in entities if isinstance(ent, dict) and ent.get("name")]
+
+
+class EnrichmentCache:
+    """SQLite store of enrichment replies keyed by (model, prompt version, chunk hash)."""
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        with self.lock, self.conn:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS enrichments (
+                    model TEXT NOT NULL,
+                    prompt_version TEXT NOT NULL,
+                    chunk_hash TEXT NOT NULL,
+                    result TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (model, prompt_version, chunk_hash)
+                ) WITHOUT ROWID
+            """)
+
+    def get_many(self, model: str, hashes: list) -> dict:
+        found = {}
+        with self.lock:
+            for i in range(0, len(hashes), 500):
+                batch = hashes[i:i + 500]
+                rows = self.conn.execute(
+                    f"SELECT chunk_hash, result FROM enrichments WHERE model = ? AND prompt_version = ? "
+                    f"AND chunk_hash IN ({','.join('?' * len(batch))})",
+                    [model, PROMPT_VERSION, *batch]
+                ).fetchall()
+                found.update((h, json.loads(result)) for h, result in rows)
+        return found
+
+    def put(self, model: str, digest: str, result: dict):
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO enrichments (model, prompt_version, chunk_hash, result, created_at) VALUES (?, ?, ?, ?, ?)",
+                (model, PROMPT_VERSION, digest, json.dumps(result, ensure_ascii=False), time.time())
+            )
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Caps in-flight LLM calls and adapts the cap to the server: while call latency stays close to the best
+    latency seen (the server still has free slots) the limit grows additively, once requests start queueing
+    server-side (latency > tolerance x best) or failing it shrinks multiplicatively.
+    """
+
+    def __init__(self, initial: int, minimum: int, maximum: int, tolerance: float = 1.5, smoothing: float = 0.3):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = float(min(max(initial, self.minimum), self.maximum))
+        self.tolerance = tolerance
+        self.smoothing = smoothing
+        self.in_flight = 0
+        self.best_latency = None
+        self.avg_latency = None
+        self.cond = threading.Condition()
+
+    @contextmanager
+    def slot(self):
+        with self.cond:
+            while self.in_flight >= int(self.limit):
+                self.cond.wait()
+            self.in_flight += 1
+        start = time.perf_counter()
+        ok = False
+        try:
+            yield
+            ok = True
+        finally:
+            latency = time.perf_counter() - start
+            with self.cond:
+                self.in_flight -= 1
+                self._adjust(latency, ok)
+                self.cond.notify_all()
+
+    def _adjust(self, latency: float, ok: bool):
+        if not ok:
+            self.limit = max(self.minimum, self.limit * 0.5)
+            return
+        # The reference latency drifts up slowly so one unusually fast reply doesn't pin the limit down forever
+        self.best_latency = latency if self.best_latency is None else min(latency, self.best_latency * 1.02)
+        self.avg_latency = latency if self.avg_latency is None else (1 - self.smoothing) * self.avg_latency + self.smoothing * latency
+        if self.avg_latency <= self.best_latency * self.tolerance:
+            self.limit = min(self.maximum, self.limit + 1 / self.limit)
+        else:
+            self.limit = max(self.minimum, self.limit * 0.9)
+
+
+class EnrichmentEngine:
+    """
+    Contextual enrichment + entity extraction of chunks with the "enrichment" LLM (the local Ollama model by default).
+    One engine per process: the concurrency limit learnt on one document carries over to the next.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(EnrichmentEngine, cls).__new__(cls)
+            llm = get_llm("enrichment")
+            # Cache entries are keyed by model: switching provider/model doesn't reuse another model's output
+            cls._instance.model = llm.model_name
+            cls._instance.provider = llm.provider
+            cls._instance.batch_size = max(1, getattr(settings, 'ENRICHMENT_BATCH_SIZE', 1))
+            cls._instance.max_retries = getattr(settings, 'ENRICHMENT_MAX_RETRIES', 3)
+            cls._instance.backoff = getattr(settings, 'ENRICHMENT_RETRY_BACKOFF_SECONDS', 1.0)
+            cls._instance.context_chars = getattr(settings, 'ENRICHMENT_CONTEXT_CHARS', 1500)
+            max_concurrency = getattr(settings, 'ENRICHMENT_MAX_CONCURRENCY', 8)
+            cls._instance.limiter = AdaptiveConcurrencyLimiter(
+                initial=getattr(settings, 'ENRICHMENT_INITIAL_CONCURRENCY', 2),
+                minimum=getattr(settings, 'ENRICHMENT_MIN_CONCURRENCY', 1),
+                maximum=max_concurrency,
+                tolerance=getattr(settings, 'ENRICHMENT_LATENCY_TOLERANCE', 1.5),
+            )
+            cls._instance.executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="enrichment")
+
+            cls._instance.single_chain = SINGLE_CHUNK_PROMPT | llm | StrOutputParser()
+            cls._instance.batch_chain = BATCH_PROMPT | llm | StrOutputParser()
+
+            cache_path = getattr(settings, 'ENRICHMENT_CACHE_PATH', None)
+            cls._instance.cache = EnrichmentCache(cache_path) if cache_path else None
+            logger.info(f"Enrichment engine ready: {cls._instance.provider} ({cls._instance.model}) "
+                        f"(batch size {cls._instance.batch_size}, up to {max_concurrency} concurrent calls).")
+
+        return cls._instance
+
+    def enrich(self, chunks, full_document_text, progress_callback=None):
+        if not chunks:
+            return []
+
+        doc_summary = full_document_text[:self.context_chars] + "..."
+        results = [None] * len(chunks)
+        hashes = [chunk_hash(chunk) for chunk in chunks]
+        cached = self.cache.get_many(self.model, list(set(hashes))) if self.cache else {}
+
+        pending = []
+        for i, chunk in enumerate(chunks):
+            if len(chunk) < MIN_CHUNK_LENGTH:
+                results[i] = {"text_content": chunk, "entities": [], "enriched": True}
+            elif hashes[i] in cached:
+                results[i] = self._to_result(chunk, cached[hashes[i]])
+            else:
+                pending.append(i)
+
+        done = len(chunks) - len(pending)
+        logger.info(f"Enrichment: {len(pending)} chunks to analyze, {done} served from cache or skipped.")
+        if progress_callback and done:
+            progress_callback(done, len(chunks))
+
+        batches = [pending[j:j + self.batch_size] for j in range(0, len(pending), self.batch_size)]
+        futures = [
+            submit_in_context(self.executor, self._enrich_batch, [(i, chunks[i]) for i in batch], doc_summary)
+            for batch in batches
+        ]
+        with tqdm(total=len(pending), desc="Analyzing Chunks", unit="chunk") as bar:
+            for future in as_completed(futures):
+                for i, data in future.result():
+                    results[i] = self._to_result(chunks[i], data)
+                    if data is not None and self.cache:
+                        self.cache.put(self.model, hashes[i], data)
+                    done += 1
+                    bar.update(1)
+                    if progress_callback:
+                        progress_callback(done, len(chunks))
+
+        logger.info(f"Enrichment finished (concurrency limit now {int(self.limiter.limit)}).")
+        return results
+
+    def _enrich_batch(self, items, doc_summary):
+        """items: [(position, chunk)] -> [(position, {"context", "entities"} or None)]"""
+        if len(items) == 1:
+            i, chunk = items[0]
+            return [(i, self._call(self.single_chain, {"doc_context": doc_summary, "chunk_content": chunk}, self._parse_single))]
+
+        chunks_block = "\n\n".join(f'<chunk id="{n}">\n{chunk}\n</chunk>' for n, (_, chunk) in enumerate(items))
+        parsed = self._call(self.batch_chain, {"doc_context": doc_summary, "chunks": chunks_block}, self._parse_batch) or {}
+        output = []
+        for n, (i, chunk) in enumerate(items):
+            if n in parsed:
+                output.append((i, parsed[n]))
+            else:
+                # Chunks the model skipped in the batched reply are retried on their own
+                output.append((i, self._call(self.single_chain, {"doc_context": doc_summary, "chunk_content": chunk}, self._parse_single)))
+        return output
+
+    def _call(self, chain, inputs, parse):
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                time.sleep(self.backoff * (2 ** (attempt - 1)) * (1 + random.random()))
+            try:
+                with self.limiter.slot(), span("enrich_llm_call", pipeline="ingestion"):
+                    reply = chain.invoke(inputs)
+            except Exception as e:
+                last_error = e
+                logger.warning(f"Enrichment call failed (attempt {attempt + 1}/{self.max_retries + 1}): {e}")
+                continue
+            data = parse(reply)
+            if data is not None:
+                return data
+            last_error = ValueError(f"unparseable reply: {reply[:200]!r}")
+            logger.warning(f"Malformed enrichment reply (attempt {attempt + 1}/{self.max_retries + 1}).")
+        logger.error(f"Giving up on enrichment after {self.max_retries + 1} attempts: {last_error}")
+        return None
+
+    @staticmethod
+    def _parse_single(reply):
+        data = parse_json_reply(reply)
+        # A reply salvaged without its entity list is retried rather than cached as entity-less
+        if data is None or not isinstance(data.get("entities"), list):
+            return None
+        return {"context": data.get("context") or "General context.", "entities": clean_entities(data.get("entities"))}
+
+    @staticmethod
+    def _parse_batch(reply):
+        data = parse_json_reply(reply)
+        if data is None or not isinstance(data.get("chunks"), list):
+            return None
+        parsed = {}
+        for entry in data["chunks"]:
+            if not isinstance(entry, dict) or not isinstance(entry.get("entities"), list):
+                continue
+            try:
+                n = int(entry.get("id"))
+            except (TypeError, ValueError):
+                continue
+            parsed[n] = {"context": entry.get("context") or "General context.", "entities": clean_entities(entry.get("entities"))}
+        return parsed
+
+    @staticmethod
+    def _to_result(chunk, data):
+        if data is None:
+            # Unrecoverable reply (LLM down, malformed output): index the raw chunk rather than failing the whole
+            # document, flagged so the next ingestion of the document enriches it again
+            return {"text_content": chunk, "entities": [], "enriched": False}
+        return {
+            "text_content": f"Context: {data['context']}\n\nContent: {chunk}",
+            "entities": data["entities"],
+            "enriched": True
+        }
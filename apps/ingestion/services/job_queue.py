@@ -0,0 +1,205 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Q
+from django.utils import timezone
+from apps.ingestion.models import LegalDocument, UPLOAD_DIR
+from apps.rag_engine.logic.telemetry import log_summary, request_context
+
+logger = logging.getLogger(__name__)
+
+# Share of the overall progress bar given to each pipeline stage
+STAGE_WEIGHTS = {"parse": 0.10, "chunk": 0.15, "enrich": 0.60, "index": 0.15}
+STAGE_ORDER = list(STAGE_WEIGHTS)
+ACTIVE_STATUSES = [LegalDocument.Status.QUEUED] + STAGE_ORDER
+
+
+class StageTracker:
+    """Progress callback handed to DocumentLoader: persists the current stage, progress and per-stage timings."""
+
+    def __init__(self, document_id, min_interval: float = 0.5):
+        self.document_id = document_id
+        self.min_interval = min_interval
+        self.timings = {}
+        self.stage = None
+        self.stage_started = None
+        self.last_flush = 0.0
+
+    def __call__(self, stage, fraction=None):
+        now = time.perf_counter()
+        if stage != self.stage:
+            self._close_stage(now)
+            self.stage, self.stage_started = stage, now
+            self._flush(stage, fraction or 0.0, now)
+        elif now - self.last_flush >= self.min_interval:
+            self._flush(stage, fraction or 0.0, now)
+
+    def finish(self):
+        self._close_stage(time.perf_counter())
+        return self.timings
+
+    def _close_stage(self, now):
+        if self.stage is not None:
+            self.timings[self.stage] = round(now - self.stage_started, 3)
+
+    def _flush(self, stage, fraction, now):
+        done = sum(STAGE_WEIGHTS[s] for s in STAGE_ORDER[:STAGE_ORDER.index(stage)])
+        progress = round(100 * (done + STAGE_WEIGHTS[stage] * min(fraction, 1.0)), 1)
+        LegalDocument.objects.filter(pk=self.document_id).update(
+            status=stage, progress=progress, stage_timings=self.timings
+        )
+        self.last_flush = now
+
+
+def finish_document(document_id, loader, tracker, success):
+    fields = {
+        "status": LegalDocument.Status.COMPLETED if success else LegalDocument.Status.FAILED,
+        "is_processed": success,
+        "processing_error": "" if success else (loader.last_error or "Unknown ingestion error"),
+        "stage_timings": tracker.finish(),
+        "chunk_count": loader.chunk_count,
+        "fingerprint": loader.fingerprint or "",
+        "finished_at": timezone.now(),
+        "lease_expires_at": None,
+    }
+    if success:
+        fields["progress"] = 100.0
+        if loader.enrichment_failures:
+            fields["processing_error"] = (f"{loader.enrichment_failures} chunks indexed without LLM enrichment "
+                                          f"(no context, no entities): re-ingest the document to retry them.")
+    LegalDocument.objects.filter(pk=document_id).update(**fields)
+
+
+def fail_document(document_id, error: str):
+    LegalDocument.objects.filter(pk=document_id).update(
+        status=LegalDocument.Status.FAILED, processing_error=error, finished_at=timezone.now(), lease_expires_at=None
+    )
+
+
+def lease_available():
+    return Q(lease_expires_at__isnull=True) | Q(lease_expires_at__lt=timezone.now())
+
+
+class IngestionJobQueue:
+    """
+    Local background queue for the ingestion pipeline. The LegalDocument table is the
+    source of truth: jobs still queued or interrupted mid-pipeline are re-enqueued at startup.
+    Every web worker has its own queue, so a job is claimed in the database before it runs: a lease
+    (`lease_expires_at`) renewed every INGESTION_LEASE_SECONDS / 3 while it runs; only jobs whose lease
+    expired (their worker died) are taken over, by the next heartbeat of any live worker.
+    """
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __new__(cls):
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = super(IngestionJobQueue, cls).__new__(cls)
+                workers = getattr(settings, 'INGESTION_WORKERS', 1)
+                cls._instance.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ingestion")
+                cls._instance.lease_seconds = getattr(settings, 'INGESTION_LEASE_SECONDS', 120)
+                cls._instance.in_flight = set()
+                cls._instance.running = set()
+                cls._instance.in_flight_lock = threading.Lock()
+                threading.Thread(target=cls._instance._renew_leases, name="ingestion-lease", daemon=True).start()
+                cls._instance.requeue_pending()
+        return cls._instance
+
+    def enqueue(self, document: LegalDocument):
+        LegalDocument.objects.filter(pk=document.pk).update(
+            status=LegalDocument.Status.QUEUED, progress=0.0, processing_error=""
+        )
+        self._submit(document.pk)
+        logger.info(f"Ingestion job queued for: {document.title} ({document.pk})")
+        return document.pk
+
+    def requeue_pending(self):
+        # Bulk-ingested documents (files outside UPLOAD_DIR) are resumed by `ingest_bulk`, never by the web queue
+        pending = list(LegalDocument.objects.filter(
+            lease_available(), status__in=ACTIVE_STATUSES, is_processed=False, file__startswith=UPLOAD_DIR
+        ).values_list("pk", flat=True))
+        for document_id in pending:
+            self._submit(document_id)
+        if pending:
+            logger.info(f"Re-enqueued {len(pending)} interrupted ingestion jobs.")
+
+    def _submit(self, document_id):
+        with self.in_flight_lock:
+            if document_id in self.in_flight:
+                return
+            self.in_flight.add(document_id)
+        self.executor.submit(self._run, document_id)
+
+    def _claim(self, document_id) -> bool:
+        # Conditional UPDATE: when several workers hold the same job, exactly one of them gets the row
+        close_old_connections()
+        now = timezone.now()
+        claimed = LegalDocument.objects.filter(
+            lease_available(), pk=document_id, status__in=ACTIVE_STATUSES, is_processed=False
+        ).update(lease_expires_at=now + timedelta(seconds=self.lease_seconds), started_at=now)
+        with self.in_flight_lock:
+            if claimed:
+                self.running.add(document_id)
+            else:
+                self.in_flight.discard(document_id)
+        return claimed == 1
+
+    def _renew_leases(self):
+        """Heartbeat: renews the leases of the running jobs and takes over the jobs whose lease expired."""
+        while True:
+            time.sleep(self.lease_seconds / 3)
+            with self.in_flight_lock:
+                running = list(self.running)
+            try:
+                if running:
+                    LegalDocument.objects.filter(pk__in=running, lease_expires_at__isnull=False).update(
+                        lease_expires_at=timezone.now() + timedelta(seconds=self.lease_seconds)
+                    )
+            except Exception as e:
+                logger.error(f"Could not renew the lease of {len(running)} ingestion jobs: {e}")
+                close_old_connections()
+            try:
+                self.requeue_pending()
+            except Exception as e:
+                logger.error(f"Could not re-enqueue interrupted ingestion jobs: {e}")
+                close_old_connections()
+
+    def _run(self, document_id):
+        try:
+            claimed = self._claim(document_id)
+        except Exception as e:
+            logger.error(f"Could not claim ingestion job {document_id}: {e}")
+            with self.in_flight_lock:
+                self.in_flight.discard(document_id)
+            claimed = False
+        if not claimed:
+            logger.info(f"Ingestion job {document_id} not claimed (running in another worker), skipping it.")
+            close_old_connections()
+            return
+        # The job id doubles as the request id of every span / log line emitted by this ingestion
+        with request_context(str(document_id)) as timings:
+            self._process(document_id)
+            log_summary("ingestion", timings, document_id=str(document_id))
+
+    def _process(self, document_id):
+        from apps.ingestion.services.loader import DocumentLoader
+
+        close_old_connections()
+        try:
+            document = LegalDocument.objects.get(pk=document_id)
+            tracker = StageTracker(document_id)
+            loader = DocumentLoader(doc_type=document.doc_type)
+            success = loader.process_and_load(document.file.path, document.title, on_progress=tracker)
+            finish_document(document_id, loader, tracker, success)
+        except Exception as e:
+            logger.error(f"Ingestion job {document_id} crashed: {e}", exc_info=True)
+            fail_document(document_id, str(e))
+        finally:
+            with self.in_flight_lock:
+                self.in_flight.discard(document_id)
+                self.running.discard(document_id)
+            close_old_connections()
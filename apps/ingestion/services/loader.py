@@ -1,99 +1,334 @@
 import os
-import uuid
+import re
+import hashlib
 import logging
+import time
 from datetime import datetime
-from langchain_community.document_loaders import PDFMinerLoader
-from apps.ingestion.services.chunker import process_document
+from django.conf import settings
+from apps.ingestion.services.chunker import iter_semantic_chunks, enrich_and_extract_graph
+from apps.ingestion.services.pdf_parser import count_pages, iter_pdf_pages
 from apps.rag_engine.connectors.vector_store import VectorStoreClient
 from apps.rag_engine.connectors.graph_store import GraphStoreClient
+from apps.rag_engine.connectors.lexical_store import LexicalStoreClient
+from apps.rag_engine.logic.filters import entity_flag
+from apps.rag_engine.logic.semantic_cache import SemanticAnswerCache
+from apps.rag_engine.logic.telemetry import record, span
 
 logger = logging.getLogger(__name__)
 
+
+def file_fingerprint(file_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def content_chunk_id(source: str, chunk_text: str) -> str:
+    # Content-addressed: the same raw chunk text from the same source always maps to the same id
+    normalized = re.sub(r"\s+", " ", chunk_text).strip().lower()
+    digest = hashlib.sha256(f"{source}\x00{normalized}".encode("utf-8")).hexdigest()
+    return f"{source}_{digest[:16]}"
+
+
 class DocumentLoader:
-    def __init__(self):
+    def __init__(self, doc_type: str = ""):
+        self.doc_type = doc_type or ""
+        self.uploaded_at = None
         self.vector_client = VectorStoreClient()
         self.graph_client = GraphStoreClient()
+        self.lexical_client = LexicalStoreClient()
+        self.last_error = None
+        self.chunk_count = 0
+        self.fingerprint = None
+        self.skipped = False
+        self.enrichment_failures = 0
 
-    def process_and_load(self, file_path: str, original_filename: str):
+    def process_and_load(self, file_path: str, original_filename: str, on_progress=None, delete_file=True):
+        # on_progress(stage, fraction=None) is called as the pipeline moves through parse -> chunk -> enrich -> index
+        # delete_file: uploads are temporary copies, bulk ingestion reads archives in place
+        report = on_progress or (lambda stage, fraction=None: None)
         try:
             logger.info(f"Starting ingestion for: {original_filename}")
-            loader = PDFMinerLoader(file_path)
-            pages = loader.load()
-            full_text = "\n\n".join([p.page_content for p in pages])
+            report("parse")
+            if self.is_unchanged(file_path, original_filename):
+                return True
+            stats = self.new_stats(file_path)
+            logger.info(f"Streaming {stats['page_count']} pages of {original_filename} into the semantic chunker...")
+            report("chunk")
+            rows = self.iter_chunk_rows(file_path, original_filename, stats)
+            return self.index_chunk_rows(original_filename, rows, stats, report)
 
-            print(f"[DEBUG EXTRACTION] Taille totale du texte extrait : {len(full_text)}")
-            if len(full_text) > 200:
-                print(f"[DEBUG EXTRACTION] Aperçu (début) : \n---\n{full_text[:200]}\n---")
-            else:
-                print(f"[DEBUG EXTRACTION] TEXTE TROP COURT OU VIDE : '{full_text}'")
+        except Exception as e:
+            logger.error(f"Error processing file {original_filename}: {e}", exc_info=True)
+            self.last_error = str(e)
+            return False
+        finally:
+            if delete_file and os.path.exists(file_path):
+                os.remove(file_path)
+                logger.info("Temporary file cleaned up.")
+
+    def is_unchanged(self, file_path: str, original_filename: str) -> bool:
+        self.fingerprint = file_fingerprint(file_path)
+        try:
+            stored = self.graph_client.get_document_fingerprint(original_filename)
+        except Exception as e:
+            # Graph unavailable (e.g. circuit breaker open): re-ingest rather than fail on the skip check
+            logger.warning(f"Could not read the stored fingerprint of {original_filename}, treating it as changed: {e}")
+            return False
+        if stored == self.fingerprint:
+            self.skipped = True
+            self.chunk_count = len(self._existing_chunk_ids(original_filename))
+            logger.info(f"{original_filename} is unchanged (fingerprint {self.fingerprint[:12]}), skipping ingestion.")
+            return True
+        return False
+
+    @staticmethod
+    def new_stats(file_path: str) -> dict:
+        return {"page_count": count_pages(file_path), "pages": 0, "chars": 0, "head": "", "parse_seconds": 0.0}
+
+    def iter_chunk_rows(self, file_path: str, original_filename: str, stats: dict, executor=None):
+        """Parse + chunk stage (CPU bound): yields deduplicated chunk rows while later pages are still being parsed."""
+        pages = iter_pdf_pages(
+            file_path,
+            workers=getattr(settings, 'PDF_PARSE_WORKERS', None),
+            pages_per_task=getattr(settings, 'PDF_PAGES_PER_TASK', 8),
+            page_count=stats["page_count"],
+            executor=executor
+        )
+        chunk_stream = iter_semantic_chunks(
+            self._track_pages(pages, stats),
+            window_sentences=getattr(settings, 'CHUNKER_WINDOW_SENTENCES', 400)
+        )
+        seen_ids = set()
+        split_seconds = 0.0
+        try:
+            while True:
+                started, parse_before = time.perf_counter(), stats["parse_seconds"]
+                item = next(chunk_stream, None)
+                split_seconds += (time.perf_counter() - started) - (stats["parse_seconds"] - parse_before)
+                if item is None:
+                    break
+                chunk, vector, page_start, page_end = item
+                chunk_id = content_chunk_id(original_filename, chunk)
+                if chunk_id in seen_ids:
+                    continue
+                seen_ids.add(chunk_id)
+                yield {"id": chunk_id, "chunk": chunk, "vector": vector, "index": len(seen_ids) - 1,
+                       "page_start": page_start, "page_end": page_end}
+            logger.info(f"Extracted Text Length: {stats['chars']} characters from {stats['pages']} pages.")
+        finally:
+            chunk_stream.close()
+            record("pdf_parse", stats["parse_seconds"], pipeline="ingestion")
+            record("semantic_split", split_seconds, pipeline="ingestion")
+
+    def index_chunk_rows(self, original_filename: str, rows, stats: dict, report) -> bool:
+        """Enrich + index stage (LLM / database bound), batch by batch as rows arrive. Removes stale chunks at the end."""
+        existing_ids, retry_ids = self._existing_chunks(original_filename)
+        self.uploaded_at = time.time()
+        batch_size = getattr(settings, 'INGESTION_CHUNK_BATCH_SIZE', 256)
+        progress = lambda *_: report("enrich", stats["pages"] / max(stats["page_count"], 1))
+
+        rows = iter(rows)
+        seen_ids, batch = set(), []
+        enriched_count = 0
+        document_created = False
+        while True:
+            row = next(rows, None)
+            if row is not None:
+                seen_ids.add(row["id"])
+                batch.append(row)
+                if len(batch) < batch_size:
+                    continue
+            if batch:
+                if not document_created:
+                    if not stats["head"].strip() or stats["chars"] < 100:
+                        break
+                    self.graph_client.create_document_node(
+                        file_name=original_filename,
+                        upload_date=datetime.now().isoformat(),
+                        metadata={"page_count": stats["page_count"]},
+                        doc_type=self.doc_type,
+                        uploaded_at=self.uploaded_at
+                    )
+                    document_created = True
+                enriched_count += self._index_batch(original_filename, batch, existing_ids - retry_ids, stats["head"], progress,
+                                                    retry_ids=retry_ids)
+                batch = []
+            if row is None:
+                break
 
-            logger.info(f"Extracted Text Length: {len(full_text)} characters.")
+        if not document_created:
+            if hasattr(rows, "close"):
+                rows.close()
+            logger.warning(f"PDF seems empty, scanned (image only), or encrypted: {original_filename}")
+            self.last_error = "PDF seems empty, scanned (image only), or encrypted."
+            return False
+
+        report("index")
+        stale_ids = sorted(existing_ids - seen_ids)
+        logger.info(f"Chunk diff for {original_filename}: {enriched_count} new, {len(seen_ids) - enriched_count} unchanged, {len(stale_ids)} stale.")
+        with span("neo4j_write", pipeline="ingestion"):
+            self.graph_client.delete_chunks(stale_ids)
+        with span("chroma_write", pipeline="ingestion"):
+            self.vector_client.delete(stale_ids)
+        with span("bm25_write", pipeline="ingestion"):
+            self.lexical_client.delete(stale_ids)
+
+        if self.enrichment_failures:
+            # No fingerprint: re-ingesting the same file must not be skipped, it re-enriches the flagged chunks
+            logger.warning(f"{original_filename}: {self.enrichment_failures} chunks indexed without enrichment, "
+                           f"re-ingest the document to retry them.")
+        else:
+            self.graph_client.set_document_fingerprint(original_filename, self.fingerprint)
+        self.chunk_count = len(seen_ids)
+        if enriched_count or stale_ids:
+            SemanticAnswerCache().invalidate_sources([original_filename])
+        logger.info(f"Successfully ingested {original_filename} ({len(seen_ids)} chunks, {enriched_count} newly enriched + Entities)")
+        return True
 
-            if not full_text.strip() or len(full_text) < 100:
-                logger.warning(f"PDF seems empty, scanned (image only), or encrypted: {original_filename}")
-                return False
+    def _track_pages(self, pages, stats, head_chars=4000):
+        # Keeps only what the rest of the pipeline needs from the page stream: counters and the document head
+        iterator = iter(pages)
+        while True:
+            started = time.perf_counter()
+            page = next(iterator, None)
+            stats["parse_seconds"] += time.perf_counter() - started
+            if page is None:
+                return
+            page_number, text = page
+            stats["pages"] += 1
+            stats["chars"] += len(text)
+            if len(stats["head"]) < head_chars:
+                stats["head"] = (stats["head"] + "\n\n" + text)[:head_chars] if stats["head"] else text[:head_chars]
+            yield page_number, text
 
-            self.graph_client.create_document_node(
-                file_name=original_filename,
-                upload_date=datetime.now().isoformat(),
-                metadata={"page_count": len(pages)}
+    def _index_batch(self, file_name: str, batch: list, existing_ids: set, doc_head: str, progress, retry_ids=frozenset()):
+        """
+        Enriches the new chunks of a batch and writes them to Neo4j, Chroma and BM25. Returns the number enriched.
+        retry_ids: stored chunks whose enrichment failed last time, enriched and written again.
+        """
+        new_rows = [row for row in batch if row["id"] not in existing_ids]
+        kept_rows = [row for row in batch if row["id"] in existing_ids]
+        redo_ids = [row["id"] for row in new_rows if row["id"] in retry_ids]
+
+        with span("enrich", pipeline="ingestion"):
+            chunks_data = enrich_and_extract_graph(
+                [row["chunk"] for row in new_rows],
+                doc_head,
+                progress_callback=progress
             )
 
-            logger.info("Sending text to Semantic Chunker & Graph Extractor...")
-            chunks_data = process_document(full_text, filename=original_filename)
-            logger.info(f"Obtained {len(chunks_data)} enriched items. Saving to Neo4j & Chroma...")
-            ids = []
-            metadatas = []
-            documents_for_chroma = []
-            print(f"DEBUG: Entering loop for {len(chunks_data)} chunks...")
-
-            for i, item in enumerate(chunks_data):
-                if isinstance(item, dict):
-                    chunk_text = item.get("text_content", "")
-                    entities = item.get("entities", [])
-                else:
-                    chunk_text = str(item)
-                    entities = []
-
-                chunk_id = f"{original_filename}_{uuid.uuid4().hex[:8]}"
-                ids.append(chunk_id)
-                metadatas.append({
-                    "source": original_filename,
-                    "chunk_index": i,
-                    "type": "enriched_chunk"
+        ids = []
+        metadatas = []
+        documents_for_chroma = []
+        chunk_rows = []
+        entity_rows = []
+        pooled_vectors = {}
+        for row, item in zip(new_rows, chunks_data):
+            if isinstance(item, dict):
+                chunk_text = item.get("text_content", "")
+                entities = item.get("entities", [])
+                enriched = item.get("enriched", True)
+            else:
+                chunk_text = str(item)
+                entities = []
+                enriched = True
+
+            ids.append(row["id"])
+            metadata = self._chunk_metadata(file_name, row, entities)
+            if not enriched:
+                metadata["enrichment_failed"] = True
+                self.enrichment_failures += 1
+            metadatas.append(metadata)
+            documents_for_chroma.append(chunk_text)
+            chunk_rows.append({"id": row["id"], "text": chunk_text, "index": row["index"],
+                               "page_start": row["page_start"], "page_end": row["page_end"]})
+            if row["vector"] is not None:
+                pooled_vectors[row["id"]] = row["vector"]
+
+            for ent in entities:
+                # ent like {'name': 'Article 12', 'type': 'LAW'}
+                entity_rows.append({
+                    "chunk_id": row["id"],
+                    "name": ent.get('name'),
+                    "type": ent.get('type', 'Entity')
                 })
-                documents_for_chroma.append(chunk_text)
-                self.graph_client.add_chunk_node(
-                    file_name=original_filename,
-                    chunk_text=chunk_text,
-                    chunk_id=chunk_id,
-                    chunk_index=i
-                )
 
-                if entities:
-                    for ent in entities:
-                        # ent like {'name': 'Article 12', 'type': 'LAW'}
-                        self.graph_client.create_entity_and_relate(
-                            chunk_id=chunk_id,
-                            entity_name=ent.get('name'),
-                            entity_type=ent.get('type', 'Entity')
-                        )
+        # Unchanged chunks keep their enrichment, only their position in the document may move
+        kept_ids = [row["id"] for row in kept_rows]
+        kept_metadatas = [self._chunk_metadata(file_name, row) for row in kept_rows]
+
+        with span("neo4j_write", pipeline="ingestion"):
+            self.graph_client.update_chunk_indexes([
+                {"id": row["id"], "index": row["index"], "page_start": row["page_start"], "page_end": row["page_end"]}
+                for row in kept_rows
+            ])
+            self.graph_client.write_document_graph(
+                file_name=file_name,
+                chunk_rows=chunk_rows,
+                entity_rows=entity_rows
+            )
+
+        with span("embed", pipeline="ingestion"):
+            embeddings = self._chunk_embeddings(ids, documents_for_chroma, pooled_vectors) if documents_for_chroma else []
+
+        with span("chroma_write", pipeline="ingestion"):
+            self.vector_client.delete(redo_ids)
+            if kept_ids:
+                self.vector_client.get_collection().update(ids=kept_ids, metadatas=kept_metadatas)
             if documents_for_chroma:
-                collection = self.vector_client.get_collection()
-                collection.add(
+                self.vector_client.add_documents(
                     documents=documents_for_chroma,
                     metadatas=metadatas,
-                    ids=ids
+                    ids=ids,
+                    embeddings=embeddings
                 )
 
-            logger.info(f"Successfully ingested {original_filename} ({len(chunks_data)} chunks + Entities)")
-            return True
+        with span("bm25_write", pipeline="ingestion"):
+            self.lexical_client.delete(redo_ids)
+            self.lexical_client.update_metadatas(kept_ids, kept_metadatas)
+            self.lexical_client.add_documents(
+                documents=documents_for_chroma,
+                metadatas=metadatas,
+                ids=ids
+            )
+        return len(new_rows)
 
-        except Exception as e:
-            logger.error(f"Error processing file {original_filename}: {e}", exc_info=True)
-            return False
-        finally:
-            if os.path.exists(file_path):
-                os.remove(file_path)
-                logger.info("Temporary file cleaned up.")
-                
\ No newline at end of file
+    def _chunk_metadata(self, file_name: str, row: dict, entities=None) -> dict:
+        metadata = {
+            "source": file_name,
+            "chunk_index": row["index"],
+            "type": "enriched_chunk",
+            "page_start": row["page_start"],
+            "page_end": row["page_end"],
+            "uploaded_at": self.uploaded_at,
+            "doc_type": self.doc_type
+        }
+        # One boolean flag per mentioned entity type, for filtered retrieval (kept chunks keep their flags)
+        for ent in entities or []:
+            if isinstance(ent, dict) and ent.get('name'):
+                metadata[entity_flag(ent.get('type', 'Entity'))] = True
+        return metadata
+
+    def _chunk_embeddings(self, ids, texts, pooled_vectors):
+        # "mean_pool" reuses the sentence vectors computed while chunking (no extra forward pass, but the
+        # LLM context prefix is not embedded); "encode" embeds the enriched texts once in a single batch.
+        strategy = getattr(settings, 'CHUNK_EMBEDDING_STRATEGY', 'encode')
+        if strategy == "mean_pool" and all(cid in pooled_vectors for cid in ids):
+            return [pooled_vectors[cid] for cid in ids]
+        return self.vector_client.embedding_fn.encode(texts)
+
+    def _existing_chunks(self, file_name: str) -> tuple:
+        """-> (ids of the document's stored chunks, ids of those whose enrichment failed)"""
+        existing = self.vector_client.get_collection().get(where={"source": file_name}, include=["metadatas"])
+        failed = {
+            chunk_id for chunk_id, metadata in zip(existing["ids"], existing["metadatas"])
+            if metadata and metadata.get("enrichment_failed")
+        }
+        return set(existing["ids"]), failed
+
+    def _existing_chunk_ids(self, file_name: str) -> set:
+        existing = self.vector_client.get_collection().get(where={"source": file_name}, include=[])
+        return set(existing["ids"])
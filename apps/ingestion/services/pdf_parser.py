@@ -1,16 +1,88 @@
+import io
+import logging
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 import pypdf
+from pdfminer.converter import TextConverter
+from pdfminer.layout import LAParams
+from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+from pdfminer.pdfpage import PDFPage
+
+logger = logging.getLogger(__name__)
+
+
+def count_pages(file_path):
+    with open(file_path, 'rb') as f:
+        return len(pypdf.PdfReader(f).pages)
+
+
+def _extract_page_range(file_path, start, end):
+    """Runs in a worker process: pdfminer text of pages [start, end) as [(page_number, text)], 1-based.
+    `maxpages` stops the page walk at `end` instead of visiting the rest of the document."""
+    pages = []
+    resource_manager = PDFResourceManager()
+    with open(file_path, 'rb') as f:
+        for offset, page in enumerate(PDFPage.get_pages(f, pagenos=set(range(start, end)), maxpages=end)):
+            buffer = io.StringIO()
+            device = TextConverter(resource_manager, buffer, laparams=LAParams())
+            PDFPageInterpreter(resource_manager, device).process_page(page)
+            device.close()
+            pages.append((start + offset + 1, buffer.getvalue().replace("\x0c", "")))
+    return pages
+
+
+def iter_pdf_pages(file_path, workers=None, pages_per_task=8, page_count=None, executor=None):
+    """
+    Yields (page_number, text) in page order while later pages are still being parsed.
+    Page ranges are parsed across a process pool, with at most 2 x workers ranges in flight,
+    so memory stays bounded by the read-ahead window whatever the document size.
+    A shared `executor` (bulk ingestion) is used as is and left running.
+    """
+    page_count = page_count if page_count is not None else count_pages(file_path)
+    workers = workers or os.cpu_count() or 1
+    ranges = [(start, min(start + pages_per_task, page_count)) for start in range(0, page_count, pages_per_task)]
+
+    if executor is None and (workers <= 1 or len(ranges) <= 1):
+        for start, end in ranges:
+            yield from _extract_page_range(file_path, start, end)
+        return
+
+    owns_executor = executor is None
+    if owns_executor:
+        executor = ProcessPoolExecutor(max_workers=min(workers, len(ranges)))
+    pending = deque()
+    try:
+        remaining = iter(ranges)
+        for start, end in remaining:
+            pending.append(executor.submit(_extract_page_range, file_path, start, end))
+            if len(pending) >= 2 * workers:
+                break
+        while pending:
+            pages = pending.popleft().result()
+            next_range = next(remaining, None)
+            if next_range is not None:
+                pending.append(executor.submit(_extract_page_range, file_path, *next_range))
+            yield from pages
+    finally:
+        # Also reached when the consumer stops early: don't parse pages nobody will read
+        for future in pending:
+            future.cancel()
+        if owns_executor:
+            executor.shutdown(wait=True)
+
 
 def extract_text_from_pdf(file_path):
-    text = ""
+    parts = []
     try:
         with open(file_path, 'rb') as f:
             reader = pypdf.PdfReader(f)
             for page in reader.pages:
                 page_text = page.extract_text()
                 if page_text:
-                    text += page_text + "\n"
+                    parts.append(page_text)
     except Exception as e:
         print(f"Error parsing PDF: {e}")
         return ""
-    
-    return text
\ No newline at end of file
+
+    return "".join(part + "\n" for part in parts)
@@ -1,8 +1,13 @@
+import logging
 from rest_framework import viewsets, status
+from rest_framework.decorators import action
 from rest_framework.response import Response
+from django.urls import reverse
 from .models import LegalDocument
-from .serializers import LegalDocumentSerializer
-from .services.loader import process_document
+from .serializers import LegalDocumentSerializer, IngestionStatusSerializer
+from .services.job_queue import IngestionJobQueue
+
+logger = logging.getLogger(__name__)
 
 class LegalDocumentViewSet(viewsets.ModelViewSet):
     queryset = LegalDocument.objects.all()
@@ -13,18 +18,22 @@ class LegalDocumentViewSet(viewsets.ModelViewSet):
         serializer.is_valid(raise_exception=True)
         self.perform_create(serializer)
         instance = serializer.instance
-        print(f"Starting RAG pipeline for: {instance.title}")
-        process_document(instance.file.path, instance.title)
-        instance.is_processed = True
-        instance.processing_error = ""
-        instance.save()
-        
+        logger.info(f"Queueing RAG pipeline for: {instance.title}")
+        job_id = IngestionJobQueue().enqueue(instance)
+        instance.refresh_from_db()
+
         headers = self.get_success_headers(serializer.data)
         return Response(
             {
-                "message": "Document ingested and indexed successfully!",
+                "message": "Document uploaded. Ingestion is running in the background.",
+                "job_id": str(job_id),
+                "status_url": request.build_absolute_uri(reverse('legaldocument-job-status', args=[instance.pk])),
                 "data": LegalDocumentSerializer(instance).data
-            }, 
-            status=status.HTTP_201_CREATED, 
+            },
+            status=status.HTTP_202_ACCEPTED,
             headers=headers
         )
+
+    @action(detail=True, methods=['get'], url_path='status')
+    def job_status(self, request, pk=None):
+        return Response(IngestionStatusSerializer(self.get_object()).data)
@@ -1,5 +1,37 @@
+import os
+import sys
+import logging
+import threading
 from django.apps import AppConfig
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
 
 class RagEngineConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'apps.rag_engine'
\ No newline at end of file
+    name = 'apps.rag_engine'
+
+    def ready(self):
+        if not getattr(settings, 'RAG_ENGINE_PRELOAD', True) or not self._should_preload():
+            return
+
+        from .logic.registry import ModelRegistry
+        warmup = getattr(settings, 'RAG_ENGINE_WARMUP', True)
+        if getattr(settings, 'RAG_ENGINE_PRELOAD_IN_BACKGROUND', True):
+            # The worker starts serving right away (health reports "degraded" until every component is warm);
+            # a request needing a component still loading waits for it on the registry lock
+            logger.info("Preloading RAG components in the background (reranker, embeddings, LLM chain, retrievers)...")
+            threading.Thread(target=ModelRegistry().initialize, kwargs={"warmup": warmup}, name="rag-preload", daemon=True).start()
+            return
+        logger.info("Preloading RAG components (reranker, embeddings, LLM chain, retrievers)...")
+        ModelRegistry().initialize(warmup=warmup)
+
+    @staticmethod
+    def _should_preload():
+        # Only web workers need the models: skip `migrate`, `shell`, ... and the runserver autoreloader parent.
+        if not sys.argv or not sys.argv[0].endswith("manage.py"):
+            return True
+        command = sys.argv[1] if len(sys.argv) > 1 else ""
+        if command not in getattr(settings, 'RAG_ENGINE_PRELOAD_COMMANDS', ("runserver",)):
+            return False
+        return command != "runserver" or os.environ.get("RUN_MAIN") == "true"
@@ -0,0 +1,187 @@
+import fcntl
+import hashlib
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DIGEST_SIZE = 16
+MIN_CAPACITY = 1024
+
+
+def text_digest(text: str) -> bytes:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=DIGEST_SIZE).digest()
+
+
+class EmbeddingCache:
+    """
+    Content-addressed store of embeddings for one model, keyed by the text's 16-byte blake2b digest:
+    - vectors.bin: memory-mapped (capacity x dim) matrix of float16/float32 rows, grown by doubling,
+    - ids.bin: the digests in row order (row i = i-th digest), loaded into a dict at startup,
+    - an in-memory LRU in front for hot texts (repeated queries), holding float32 copies.
+    Rows are written before their digest is appended, so a crash never exposes a half-written vector.
+    Appends take an exclusive flock: several processes (web workers, ingestion) can share the directory.
+    The files are append-only and capped at `max_entries` rows: past it, new vectors are no longer persisted
+    (delete the directory to start over, e.g. after a model change).
+    """
+
+    def __init__(self, directory: str, model_name: str, dim: int, dtype: str = "float16", lru_size: int = 4096,
+                 max_entries: int = None):
+        slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", os.path.basename(model_name.rstrip("/"))) or "model"
+        model_hash = hashlib.sha1(model_name.encode("utf-8")).hexdigest()[:8]
+        self.path = os.path.join(directory, f"{slug}-{model_hash}-{dim}-{dtype}")
+        os.makedirs(self.path, exist_ok=True)
+        self.dim = dim
+        self.dtype = np.dtype(dtype)
+        self.row_bytes = dim * self.dtype.itemsize
+        self.vectors_path = os.path.join(self.path, "vectors.bin")
+        self.ids_path = os.path.join(self.path, "ids.bin")
+        self.lock_path = os.path.join(self.path, "lock")
+
+        self.lock = threading.Lock()
+        self.index = {}
+        self.ids_offset = 0
+        self.matrix = None
+        self.capacity = 0
+        self.lru = OrderedDict()
+        self.lru_size = lru_size
+        self.max_entries = max_entries
+        self.full = False
+        self.hits = 0
+        self.lru_hits = 0
+        self.misses = 0
+
+        open(self.ids_path, "ab").close()
+        with self.lock:
+            self._refresh()
+        logger.info(f"Embedding cache: {len(self.index)} vectors in {self.path} ({self.dtype.name}).")
+
+    def get_or_compute(self, texts: list, compute, persist: bool = True) -> np.ndarray:
+        """
+        Vectors (float32) for `texts`; `compute(missing_texts)` embeds the ones seen for the first time.
+        persist=False (one-off texts, e.g. the chunker's sentence windows): served from the cache when present,
+        but neither written to disk nor kept in the LRU.
+        """
+        digests = [text_digest(text) for text in texts]
+        out = np.empty((len(texts), self.dim), dtype=np.float32)
+        missing = OrderedDict()
+
+        with self.lock:
+            stale = False
+            for i, digest in enumerate(digests):
+                vector = self.lru.get(digest)
+                if vector is not None:
+                    self.lru.move_to_end(digest)
+                    self.lru_hits += 1
+                    out[i] = vector
+                elif digest in self.index:
+                    out[i] = self._row(self.index[digest])
+                    if persist:
+                        self._remember(digest, out[i])
+                    self.hits += 1
+                else:
+                    if not stale:
+                        # Another process may have embedded it since our last look
+                        self._refresh()
+                        stale = True
+                        if digest in self.index:
+                            out[i] = self._row(self.index[digest])
+                            self.hits += 1
+                            continue
+                    missing.setdefault(digest, []).append(i)
+
+        if not missing:
+            return out
+
+        new_texts = [texts[positions[0]] for positions in missing.values()]
+        vectors = np.asarray(compute(new_texts), dtype=np.float32)
+        for vector, positions in zip(vectors, missing.values()):
+            out[positions] = vector
+        with self.lock:
+            self.misses += len(new_texts)
+            if persist:
+                self._append(list(missing.keys()), vectors)
+                for digest, vector in zip(missing.keys(), vectors):
+                    self._remember(digest, vector)
+        return out
+
+    def _row(self, row: int) -> np.ndarray:
+        if row >= self.capacity:
+            self._map()
+        return np.asarray(self.matrix[row], dtype=np.float32)
+
+    def _remember(self, digest: bytes, vector: np.ndarray):
+        if self.lru_size <= 0:
+            return
+        self.lru[digest] = np.array(vector, dtype=np.float32)
+        self.lru.move_to_end(digest)
+        while len(self.lru) > self.lru_size:
+            self.lru.popitem(last=False)
+
+    def _refresh(self):
+        """Reads the digests appended (by any process) since the last refresh."""
+        size = os.path.getsize(self.ids_path)
+        size -= size % DIGEST_SIZE
+        if size <= self.ids_offset:
+            return
+        with open(self.ids_path, "rb") as f:
+            f.seek(self.ids_offset)
+            data = f.read(size - self.ids_offset)
+        first_row = self.ids_offset // DIGEST_SIZE
+        for k in range(len(data) // DIGEST_SIZE):
+            self.index.setdefault(data[k * DIGEST_SIZE:(k + 1) * DIGEST_SIZE], first_row + k)
+        self.ids_offset = size
+
+    def _map(self):
+        size = os.path.getsize(self.vectors_path) if os.path.exists(self.vectors_path) else 0
+        self.capacity = size // self.row_bytes
+        self.matrix = np.memmap(self.vectors_path, dtype=self.dtype, mode="r+", shape=(self.capacity, self.dim)) if self.capacity else None
+
+    def _append(self, digests: list, vectors: np.ndarray):
+        with open(self.lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                self._refresh()
+                fresh = [k for k, digest in enumerate(digests) if digest not in self.index]
+                count = self.ids_offset // DIGEST_SIZE
+                if self.max_entries is not None and count + len(fresh) > self.max_entries:
+                    fresh = fresh[:max(0, self.max_entries - count)]
+                    if not self.full:
+                        self.full = True
+                        logger.warning(f"Embedding cache {self.path} reached EMBEDDING_CACHE_MAX_ENTRIES ({self.max_entries}): "
+                                       f"new vectors are no longer persisted.")
+                if not fresh:
+                    return
+                needed = count + len(fresh)
+                if needed > self.capacity:
+                    self._map()
+                if needed > self.capacity:
+                    capacity = max(MIN_CAPACITY, self.capacity * 2, needed)
+                    with open(self.vectors_path, "ab") as f:
+                        f.truncate(capacity * self.row_bytes)
+                    self._map()
+                self.matrix[count:needed] = vectors[fresh].astype(self.dtype)
+                self.matrix.flush()
+                with open(self.ids_path, "ab") as f:
+                    f.write(b"".join(digests[k] for k in fresh))
+                for row, k in enumerate(fresh, start=count):
+                    self.index[digests[k]] = row
+                self.ids_offset = needed * DIGEST_SIZE
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self.index),
+            "max_entries": self.max_entries,
+            "full": self.full,
+            "hits": self.hits,
+            "lru_hits": self.lru_hits,
+            "misses": self.misses,
+            "path": self.path,
+            "dtype": self.dtype.name,
+        }
@@ -0,0 +1,83 @@
+import logging
+import threading
+import numpy as np
+import torch
+from langchain_core.embeddings import Embeddings
+from sentence_transformers import SentenceTransformer
+from django.conf import settings
+from apps.rag_engine.connectors.embedding_cache import EmbeddingCache
+
+logger = logging.getLogger(__name__)
+
+
+def get_device_config():
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    use_bf16 = device == "cuda" and torch.cuda.is_bf16_supported()
+    if use_bf16:
+        logger.info("GPU Acceleration: Bfloat16 enabled (RTX 4060 Optimized).")
+    else:
+        logger.info(f"GPU Acceleration: Standard Precision on {device}.")
+    return device, use_bf16
+
+
+class EmbeddingService(Embeddings):
+    """
+    Single embedding model shared by semantic chunking, Chroma indexing and query embedding.
+    Vectors are L2-normalized, so dot product == cosine similarity. With EMBEDDING_CACHE_DIR set, every chunk or query
+    is embedded once per model: later encodes (re-indexing, repeated queries) are served from the cache.
+    """
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __new__(cls):
+        with cls._instance_lock:
+            if cls._instance is None:
+                instance = super(EmbeddingService, cls).__new__(cls)
+                instance.model_name = getattr(settings, 'EMBEDDING_MODEL_NAME', 'all-MiniLM-L6-v2')
+                instance.batch_size = getattr(settings, 'EMBEDDING_BATCH_SIZE', 128)
+                device, use_bf16 = get_device_config()
+                instance.model = SentenceTransformer(instance.model_name, device=device, trust_remote_code=True)
+                if use_bf16:
+                    instance.model.to(dtype=torch.bfloat16)
+                logger.info(f"Embedding model '{instance.model_name}' loaded on {device} (batch size {instance.batch_size}).")
+                cache_dir = getattr(settings, 'EMBEDDING_CACHE_DIR', None)
+                instance.cache = EmbeddingCache(
+                    cache_dir,
+                    instance.model_name,
+                    instance.model.get_sentence_embedding_dimension(),
+                    dtype=getattr(settings, 'EMBEDDING_CACHE_DTYPE', "float16"),
+                    lru_size=getattr(settings, 'EMBEDDING_CACHE_LRU_SIZE', 4096),
+                    max_entries=getattr(settings, 'EMBEDDING_CACHE_MAX_ENTRIES', None),
+                ) if cache_dir else None
+                cls._instance = instance
+        return cls._instance
+
+    def __init__(self):
+        pass
+
+    def encode(self, texts, batch_size: int = None, persist: bool = True) -> np.ndarray:
+        # persist=False: one-off texts that must not fill the cache (see EmbeddingCache.get_or_compute)
+        if not texts:
+            return np.zeros((0, self.model.get_sentence_embedding_dimension()), dtype=np.float32)
+        if self.cache is not None:
+            return self.cache.get_or_compute(list(texts), lambda missing: self._encode(missing, batch_size), persist=persist)
+        return self._encode(texts, batch_size)
+
+    def _encode(self, texts, batch_size: int = None) -> np.ndarray:
+        vectors = self.model.encode(
+            list(texts),
+            batch_size=batch_size or self.batch_size,
+            normalize_embeddings=True,
+            convert_to_numpy=True,
+            show_progress_bar=False
+        )
+        return vectors.astype(np.float32, copy=False)
+
+    def embed_documents(self, texts):
+        return self.encode(texts).tolist()
+
+    def embed_query(self, text):
+        return self.encode([text])[0].tolist()
+
+    def stats(self) -> dict:
+        return self.cache.stats() if self.cache is not None else {}
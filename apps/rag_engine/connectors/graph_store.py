@@ -1,38 +1,307 @@
+import asyncio
 import logging
 import os
-from neo4j import GraphDatabase
-from langchain_community.graphs import Neo4jGraph
+import threading
+import time
+from neo4j import AsyncGraphDatabase, GraphDatabase, unit_of_work
+from neo4j.exceptions import DriverError
 from django.conf import settings
 
 logger = logging.getLogger(__name__)
 
+ENTITY_FULLTEXT_INDEX = "entity_name_fulltext"
+
+
+def neo4j_connection():
+    """-> (uri, (user, password)) from settings, falling back to the environment."""
+    uri = getattr(settings, 'NEO4J_URI', os.getenv('NEO4J_URI', 'bolt://localhost:7687'))
+    user = getattr(settings, 'NEO4J_USERNAME', os.getenv('NEO4J_USERNAME', 'neo4j'))
+    password = getattr(settings, 'NEO4J_PASSWORD', os.getenv('NEO4J_PASSWORD', 'password'))
+    return uri, (user, password)
+
+
+def driver_options() -> dict:
+    """Connection pool settings shared by the sync and async drivers (NEO4J_* settings, seconds)."""
+    return {
+        "max_connection_pool_size": getattr(settings, 'NEO4J_MAX_CONNECTION_POOL_SIZE', 100),
+        "connection_acquisition_timeout": getattr(settings, 'NEO4J_CONNECTION_ACQUISITION_TIMEOUT', 60.0),
+        "connection_timeout": getattr(settings, 'NEO4J_CONNECTION_TIMEOUT', 30.0),
+        "max_connection_lifetime": getattr(settings, 'NEO4J_MAX_CONNECTION_LIFETIME', 3600),
+        "max_transaction_retry_time": getattr(settings, 'NEO4J_MAX_TRANSACTION_RETRY_TIME', 30.0),
+    }
+
+
+def read_timeout(timeout: float = None):
+    """Per-query timeout of a read transaction: the caller's, else NEO4J_READ_TIMEOUT_MS (None = server default)."""
+    if timeout is not None:
+        return timeout
+    default_ms = getattr(settings, 'NEO4J_READ_TIMEOUT_MS', None)
+    return default_ms / 1000 if default_ms else None
+
+
+class GraphUnavailable(RuntimeError):
+    pass
+
+
+class GraphCircuitBreaker:
+    """
+    After a connection-level failure (server down, pool exhausted, routing lost), reads are refused for
+    `cooldown` seconds instead of each one waiting for its own connection timeout; the first read after the
+    cooldown probes the server again. Query errors (timeouts, Cypher errors) do not open it.
+    """
+
+    def __init__(self, cooldown: float):
+        self.cooldown = cooldown
+        self.lock = threading.Lock()
+        self.open_until = 0.0
+        self.failures = 0
+        self.rejected = 0
+
+    def check(self):
+        with self.lock:
+            if time.monotonic() < self.open_until:
+                self.rejected += 1
+                raise GraphUnavailable(f"Neo4j unavailable, graph reads paused for {self.open_until - time.monotonic():.1f}s")
+
+    def failed(self, error):
+        with self.lock:
+            self.failures += 1
+            self.open_until = time.monotonic() + self.cooldown
+        logger.warning(f"Neo4j connection failure, skipping graph reads for {self.cooldown:.0f}s: {error}")
+
+    def succeeded(self):
+        self.open_until = 0.0
+
+    def stats(self) -> dict:
+        return {
+            "open": time.monotonic() < self.open_until,
+            "failures": self.failures,
+            "rejected": self.rejected,
+        }
+
+
+# Transaction functions for single-statement reads / writes (see GraphStoreClient._read / _write)
+def _consume(tx, query, **params):
+    tx.run(query, **params).consume()
+
+
+def _single(tx, query, **params):
+    return tx.run(query, **params).single()
+
+
+def _data(tx, query, **params):
+    return tx.run(query, **params).data()
+
+
+def clean_label(entity_type: str) -> str:
+    clean_type = (entity_type or "Entity").capitalize()
+    if not clean_type.isalnum():
+        clean_type = "Entity"
+    return clean_type
+
+
 class GraphStoreClient:
     _instance = None
 
+    # Retrieval scope pre-filters (see SearchFilters.cypher_params): a null parameter disables its predicate
+    DOCUMENT_SCOPE = """
+        ($scope_sources IS NULL OR d.name IN $scope_sources)
+        AND ($scope_after IS NULL OR d.uploaded_at >= $scope_after)
+        AND ($scope_before IS NULL OR d.uploaded_at <= $scope_before)
+        AND ($scope_doc_types IS NULL OR d.doc_type IN $scope_doc_types)
+    """
+    CHUNK_SCOPE = """
+        ($scope_entity_types IS NULL OR EXISTS {
+            MATCH (c)-[:MENTIONS]->(scoped:Entity)
+            WHERE any(label IN labels(scoped) WHERE label IN $scope_entity_types)
+        })
+    """
+
+    # Graph retrieval (see search_chunks_by_entities), shared with AsyncGraphStoreClient
+    ENTITY_SEEDS_QUERY = f"""
+        CALL db.index.fulltext.queryNodes($index, $terms, {{limit: $entity_limit}}) YIELD node AS e, score
+        MATCH (d:Document)-[:HAS_CHUNK]->(c:Chunk)-[:MENTIONS]->(e)
+        WHERE {DOCUMENT_SCOPE} AND {CHUNK_SCOPE}
+        WITH d, c, sum(score) AS score
+        ORDER BY score DESC LIMIT $seed_limit
+        RETURN c.id AS id, c.text AS text, d.name AS source, c.index AS chunk_index,
+               c.page_start AS page_start, c.page_end AS page_end, score, 0 AS hop
+    """
+    ENTITY_EXPANSION_QUERY = f"""
+        UNWIND $seeds AS seed
+        MATCH (s:Chunk {{id: seed.id}})
+        CALL {{
+            WITH s
+            MATCH (c:Chunk)
+            WHERE c.source = s.source AND c.index IN [s.index - 1, s.index + 1]
+            MATCH (d:Document {{name: c.source}})
+            RETURN d, c, $adjacent_weight AS weight
+          UNION
+            WITH s
+            MATCH (s)-[:MENTIONS]->(shared:Entity)
+            WHERE COUNT {{ (shared)<-[:MENTIONS]-() }} <= $max_entity_degree
+            MATCH (shared)<-[:MENTIONS]-(c:Chunk)<-[:HAS_CHUNK]-(d:Document)
+            WHERE c <> s
+            RETURN d, c, $shared_weight AS weight
+        }}
+        WITH d, c, max(seed.score * weight) AS score
+        WHERE NOT c.id IN $seed_ids AND {DOCUMENT_SCOPE} AND {CHUNK_SCOPE}
+        RETURN c.id AS id, c.text AS text, d.name AS source, c.index AS chunk_index,
+               c.page_start AS page_start, c.page_end AS page_end, score, 1 AS hop
+        ORDER BY score DESC LIMIT $k
+    """
+    GRAPH_CONTEXT_QUERY = f"""
+        MATCH (d:Document)
+        WHERE d.name IN $file_names AND {DOCUMENT_SCOPE}
+        RETURN d.name as name, d.created_at as date, count {{ (d)-[:HAS_CHUNK]->() }} as chunk_count
+    """
+
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super(GraphStoreClient, cls).__new__(cls)
-            uri = getattr(settings, 'NEO4J_URI', os.getenv('NEO4J_URI', 'bolt://localhost:7687'))
-            user = getattr(settings, 'NEO4J_USERNAME', os.getenv('NEO4J_USERNAME', 'neo4j'))
-            password = getattr(settings, 'NEO4J_PASSWORD', os.getenv('NEO4J_PASSWORD', 'password'))
-            cls._instance.driver = GraphDatabase.driver(uri, auth=(user, password))
-            cls._instance.driver.verify_connectivity()
-            logger.info("Neo4j Native Driver Connected successfully.")
-            cls._instance.graph = Neo4jGraph(
-                url=uri, 
-                username=user, 
-                password=password
-            )
-            logger.info("LangChain Graph Adapter Initialized.")
-            
+            uri, auth = neo4j_connection()
+            cls._instance.driver = GraphDatabase.driver(uri, auth=auth, **driver_options())
+            cls._instance.breaker = GraphCircuitBreaker(getattr(settings, 'NEO4J_FAILURE_COOLDOWN_SECONDS', 30))
+            cls._instance.batch_size = getattr(settings, 'NEO4J_BATCH_SIZE', 500)
+            cls._instance._indexed_labels = set()
+            # label -> monotonic time before which its failed constraint is not attempted again
+            cls._instance._failed_labels = {}
+            cls._instance.label_retry_seconds = getattr(settings, 'NEO4J_LABEL_CONSTRAINT_RETRY_SECONDS', 3600)
+            cls._instance.schema_ready = False
+            cls._instance._graph = None
+            cls._instance._graph_lock = threading.Lock()
+            try:
+                cls._instance.driver.verify_connectivity()
+                logger.info("Neo4j Native Driver Connected successfully.")
+                cls._instance.ensure_schema()
+            except DriverError as e:
+                # Retrieval runs without the graph until Neo4j is back (the pool reconnects on its own)
+                cls._instance.breaker.failed(e)
 
         return cls._instance
 
+    @property
+    def graph(self):
+        # LangChain adapter (introspects the schema when built): only for callers that need it, never the ask path
+        if self._graph is None:
+            with self._graph_lock:
+                if self._graph is None:
+                    from langchain_community.graphs import Neo4jGraph
+                    uri, (user, password) = neo4j_connection()
+                    self._graph = Neo4jGraph(url=uri, username=user, password=password)
+                    logger.info("LangChain Graph Adapter Initialized.")
+        return self._graph
+
+    def _read(self, work, timeout: float = None, **params):
+        """
+        Runs `work(tx, **params)` in a managed read transaction (routed to a reader in a cluster) bounded by
+        `timeout` (see read_timeout). Connection failures open the circuit breaker.
+        """
+        self.breaker.check()
+        try:
+            with self.driver.session() as session:
+                result = session.execute_read(unit_of_work(timeout=read_timeout(timeout))(work), **params)
+        except DriverError as e:
+            self.breaker.failed(e)
+            raise
+        self.breaker.succeeded()
+        return result
+
+    def _write(self, work, *args, **params):
+        if not self.schema_ready:
+            # Neo4j was unreachable at startup: the constraints must exist before the first MERGE
+            self.ensure_schema()
+        with self.driver.session() as session:
+            return session.execute_write(work, *args, **params)
+
+    def stats(self) -> dict:
+        return {**driver_options(), **self.breaker.stats()}
+
+    def ensure_schema(self):
+        # Uniqueness constraints double as indexes: every MERGE of the ingestion path becomes an index lookup.
+        statements = [
+            "CREATE CONSTRAINT chunk_id_unique IF NOT EXISTS FOR (c:Chunk) REQUIRE c.id IS UNIQUE",
+            "CREATE CONSTRAINT document_name_unique IF NOT EXISTS FOR (d:Document) REQUIRE d.name IS UNIQUE",
+            "CREATE INDEX entity_name IF NOT EXISTS FOR (e:Entity) ON (e.name)",
+            # Neighbour lookup of the graph expansion: seek on (document, position) instead of walking HAS_CHUNK
+            "CREATE INDEX chunk_source_index IF NOT EXISTS FOR (c:Chunk) ON (c.source, c.index)",
+            f"CREATE FULLTEXT INDEX {ENTITY_FULLTEXT_INDEX} IF NOT EXISTS FOR (e:Entity) ON EACH [e.name]",
+        ]
+        try:
+            with self.driver.session() as session:
+                for statement in statements:
+                    session.run(statement).consume()
+            self.schema_ready = True
+            logger.info("Neo4j schema (constraints & indexes) ensured.")
+        except Exception as e:
+            logger.error(f"Could not create Neo4j constraints/indexes: {e}")
+            return
+        self.backfill_entity_label()
+
+    def backfill_entity_label(self):
+        # Entities written before the :Entity label existed are invisible to the full-text index (graph retrieval).
+        # Scans every MENTIONS edge, so it runs once per database: a marker node records that it is done.
+        marker = "MATCH (m:SchemaMigration {name: 'entity_label'}) RETURN m"
+        query = """
+        MATCH (:Chunk)-[:MENTIONS]->(e)
+        WHERE NOT e:Entity
+        CALL { WITH e SET e:Entity } IN TRANSACTIONS OF 10000 ROWS
+        """
+        try:
+            with self.driver.session() as session:
+                if session.run(marker).single() is not None:
+                    return
+                labelled = session.run(query).consume().counters.labels_added
+                session.run("MERGE (m:SchemaMigration {name: 'entity_label'}) SET m.applied_at = datetime()").consume()
+            if labelled:
+                logger.info(f"Added the :Entity label to {labelled} entities ingested before it existed.")
+        except Exception as e:
+            logger.error(f"Could not backfill the :Entity label: {e}")
+
+    def _ensure_label_indexes(self, labels):
+        now = time.monotonic()
+        missing = {label for label in set(labels) - self._indexed_labels if self._failed_labels.get(label, 0) <= now}
+        if not missing:
+            return
+        with self.driver.session() as session:
+            for label in missing:
+                try:
+                    session.run(
+                        f"CREATE CONSTRAINT {label.lower()}_name_unique IF NOT EXISTS FOR (e:{label}) REQUIRE e.name IS UNIQUE"
+                    ).consume()
+                except Exception as e:
+                    # e.g. duplicate names already under this label: MERGE still works, just without the index
+                    self._failed_labels[label] = now + self.label_retry_seconds
+                    logger.error(f"Could not create the {label} name constraint, writing without it "
+                                 f"(retried in {self.label_retry_seconds}s): {e}")
+                    continue
+                self._failed_labels.pop(label, None)
+                self._indexed_labels.add(label)
+
+    @staticmethod
+    def _clean_label(entity_type: str) -> str:
+        return clean_label(entity_type)
+
+    @staticmethod
+    def fulltext_query(text: str, max_terms: int = 32) -> str:
+        # Lucene query over the entity-name index: word tokens only, so no operator / escaping surprises
+        from apps.rag_engine.connectors.lexical_store import tokenize
+        terms = [t for t in dict.fromkeys(tokenize(text)) if len(t) > 2 and not t.isdigit()][:max_terms]
+        return " OR ".join(terms)
+
+    @staticmethod
+    def _scope_params(filters=None) -> dict:
+        if filters is not None:
+            return filters.cypher_params()
+        return {"scope_sources": None, "scope_after": None, "scope_before": None,
+                "scope_doc_types": None, "scope_entity_types": None}
+
     def close(self):
         if self.driver:
             self.driver.close()
 
-    def create_document_node(self, file_name: str, metadata: dict = None, upload_date=None, **kwargs):
+    def create_document_node(self, file_name: str, metadata: dict = None, upload_date=None, doc_type: str = "",
+                             uploaded_at: float = None, **kwargs):
         if not self.driver:
             logger.error("Neo4j driver not available. Skipping node creation.")
             return
@@ -44,12 +313,12 @@ class GraphStoreClient:
             d.status = 'ingested',
             d.upload_date = $upload_date,
             d.source_type = 'pdf'
+        SET d.doc_type = $doc_type, d.uploaded_at = $uploaded_at
         RETURN d
         """
         date_str = str(upload_date) if upload_date else "Unknown"
-        with self.driver.session() as session:
-            session.run(query, file_name=file_name, upload_date=date_str)
-            logger.info(f"📄 Graph Node created/merged for: {file_name}")
+        self._write(_consume, query, file_name=file_name, upload_date=date_str, doc_type=doc_type or "", uploaded_at=uploaded_at)
+        logger.info(f"📄 Graph Node created/merged for: {file_name}")
     
 
     def add_chunk_node(self, file_name: str, chunk_text: str, chunk_id: str, chunk_index: int = 0, **kwargs):
@@ -65,60 +334,219 @@ class GraphStoreClient:
         MERGE (d)-[:HAS_CHUNK]->(c)
         """
         
-        with self.driver.session() as session:
-            session.run(query, file_name=file_name, chunk_id=chunk_id, text=chunk_text, chunk_index=chunk_index)
+        self._write(_consume, query, file_name=file_name, chunk_id=chunk_id, text=chunk_text, chunk_index=chunk_index)
         
 
     def create_entity_and_relate(self, chunk_id: str, entity_name: str, entity_type: str):
         if not self.driver or not entity_name: return
-        clean_type = entity_type.capitalize()
-        if not clean_type.isalnum(): 
-            clean_type = "Entity" 
+        clean_type = self._clean_label(entity_type)
 
         query = f"""
         MATCH (c:Chunk {{id: $chunk_id}})
         MERGE (e:{clean_type} {{name: $name}})
+        SET e:Entity
         MERGE (c)-[:MENTIONS]->(e)
         """
-        with self.driver.session() as session:
-            session.run(query, chunk_id=chunk_id, name=entity_name)
+        self._write(_consume, query, chunk_id=chunk_id, name=entity_name)
        
 
-    def get_chunks_linked_to_entity(self, keyword):
-        if not self.driver: return []
-        
-        with self.driver.session() as session:
-            result = session.run(
-                """
-                MATCH (e:Entity)<-[:MENTIONS]-(c:Chunk)
-                WHERE toLower(e.name) CONTAINS toLower($keyword)
-                RETURN c.text AS text LIMIT 5
-                """,
-                keyword=keyword
+    def _batches(self, rows, batch_size=None):
+        size = batch_size or self.batch_size
+        for start in range(0, len(rows), size):
+            yield rows[start:start + size]
+
+    def _write_chunks(self, tx, file_name: str, chunk_rows: list, batch_size=None):
+        query = """
+        MERGE (d:Document {name: $file_name})
+        WITH d
+        UNWIND $rows AS row
+        MERGE (c:Chunk {id: row.id})
+        SET
+            c.text = row.text,
+            c.source = $file_name,
+            c.index = row.index,
+            c.page_start = row.page_start,
+            c.page_end = row.page_end
+        MERGE (d)-[:HAS_CHUNK]->(c)
+        """
+        for batch in self._batches(chunk_rows, batch_size):
+            tx.run(query, file_name=file_name, rows=batch).consume()
+
+    def _write_entities(self, tx, entity_rows: list, batch_size=None):
+        by_label = {}
+        for row in entity_rows:
+            if not row.get("name"):
+                continue
+            by_label.setdefault(self._clean_label(row.get("type")), []).append(
+                {"chunk_id": row["chunk_id"], "name": row["name"]}
             )
-            return list(set([record["text"] for record in result]))
 
-    def get_graph_context(self, file_names: list) -> str:
-        if not self.driver or not file_names:
-            return ""
+        for label, rows in by_label.items():
+            query = f"""
+            UNWIND $rows AS row
+            MATCH (c:Chunk {{id: row.chunk_id}})
+            MERGE (e:{label} {{name: row.name}})
+            SET e:Entity
+            MERGE (c)-[:MENTIONS]->(e)
+            """
+            for batch in self._batches(rows, batch_size):
+                tx.run(query, rows=batch).consume()
+
+    def add_chunks_bulk(self, file_name: str, chunk_rows: list, batch_size: int = None):
+        # chunk_rows: [{"id": ..., "text": ..., "index": ...}]
+        if not self.driver or not chunk_rows: return
+        self._write(self._write_chunks, file_name, chunk_rows, batch_size)
+
+    def relate_entities_bulk(self, entity_rows: list, batch_size: int = None):
+        # entity_rows: [{"chunk_id": ..., "name": ..., "type": ...}]
+        if not self.driver or not entity_rows: return
+        self._ensure_label_indexes({self._clean_label(row.get("type")) for row in entity_rows})
+        self._write(self._write_entities, entity_rows, batch_size)
+
+    def write_document_graph(self, file_name: str, chunk_rows: list, entity_rows: list, batch_size: int = None):
+        if not self.driver or not chunk_rows: return
+        self._ensure_label_indexes({self._clean_label(row.get("type")) for row in entity_rows})
+
+        def _write(tx):
+            self._write_chunks(tx, file_name, chunk_rows, batch_size)
+            self._write_entities(tx, entity_rows, batch_size)
+
+        self._write(_write)
+        logger.info(f"🕸️ Bulk graph write for {file_name}: {len(chunk_rows)} chunks, {len(entity_rows)} entity links.")
+
+    def get_document_fingerprint(self, file_name: str):
+        if not self.driver: return None
+        record = self._read(
+            _single, query="MATCH (d:Document {name: $file_name}) RETURN d.fingerprint AS fingerprint", file_name=file_name
+        )
+        return record["fingerprint"] if record else None
+
+    def set_document_fingerprint(self, file_name: str, fingerprint: str):
+        if not self.driver: return
+        self._write(
+            _consume, "MERGE (d:Document {name: $file_name}) SET d.fingerprint = $fingerprint, d.updated_at = datetime()",
+            file_name=file_name, fingerprint=fingerprint
+        )
+
+    def delete_chunks(self, chunk_ids: list, batch_size: int = None):
+        if not self.driver or not chunk_ids: return
         query = """
-        MATCH (d:Document)
-        WHERE d.name IN $file_names
-        RETURN d.name as name, d.created_at as date, count { (d)-[:HAS_CHUNK]->() } as chunk_count
+        UNWIND $ids AS chunk_id
+        MATCH (c:Chunk {id: chunk_id})
+        DETACH DELETE c
         """
-        
-        context_parts = []
-        with self.driver.session() as session:
-            result = session.run(query, file_names=file_names)
-            for record in result:
-                info = f"Document '{record['name']}' (Indexed on {record['date']}) contains {record['chunk_count']} sections."
-                context_parts.append(info)
-        
+
+        def _delete(tx):
+            for batch in self._batches(chunk_ids, batch_size):
+                tx.run(query, ids=batch).consume()
+
+        self._write(_delete)
+        logger.info(f"🗑️ Deleted {len(chunk_ids)} stale chunks from the graph.")
+
+    def update_chunk_indexes(self, rows: list, batch_size: int = None):
+        # rows: [{"id": ..., "index": ..., "page_start": ..., "page_end": ...}]
+        if not self.driver or not rows: return
+        query = """
+        UNWIND $rows AS row
+        MATCH (c:Chunk {id: row.id})
+        SET c.index = row.index, c.page_start = row.page_start, c.page_end = row.page_end
+        """
+
+        def _update(tx):
+            for batch in self._batches(rows, batch_size):
+                tx.run(query, rows=batch).consume()
+
+        self._write(_update)
+
+    def get_chunks_linked_to_entity(self, keyword, filters=None, timeout: float = None):
+        if not self.driver: return []
+        terms = self.fulltext_query(keyword)
+        if not terms:
+            return []
+
+        rows = self._read(
+            _data,
+            timeout=timeout,
+            query=f"""
+            CALL db.index.fulltext.queryNodes($index, $terms, {{limit: 50}}) YIELD node AS e
+            MATCH (d:Document)-[:HAS_CHUNK]->(c:Chunk)-[:MENTIONS]->(e)
+            WHERE {self.DOCUMENT_SCOPE} AND {self.CHUNK_SCOPE}
+            RETURN c.text AS text LIMIT 5
+            """,
+            index=ENTITY_FULLTEXT_INDEX,
+            terms=terms,
+            **self._scope_params(filters)
+        )
+        return list(set([row["text"] for row in rows]))
+
+    def search_chunks_by_entities(self, query_text: str, k: int = 20, filters=None, timeout: float = None, **options) -> list:
+        """
+        Graph retrieval: entities matching the question (full-text index) -> the chunks mentioning them (seeds),
+        expanded to chunks sharing a seed's entities and to the seed's neighbours in its document (index +-1).
+        Seeds score the sum of their matched entities' full-text scores; expanded chunks inherit
+        `weight x seed score`. Entities mentioned by more than `max_entity_degree` chunks are not expanded
+        through (too generic to say anything about relevance). `timeout` (seconds) bounds the transaction.
+        `options`: see graph_search_params.
+        -> [{"id", "text", "source", "chunk_index", "page_start", "page_end", "score", "hop"}], best first.
+        """
+        params = self.graph_search_params(query_text, k, filters, **options)
+        if not self.driver or params is None:
+            return []
+        seed_params, expansion_params = params
+
+        def _search(tx):
+            seeds = tx.run(self.ENTITY_SEEDS_QUERY, **seed_params).data()
+            if not seeds:
+                return []
+            expanded = tx.run(self.ENTITY_EXPANSION_QUERY, **self._seed_params(seeds), **expansion_params).data()
+            return seeds + expanded
+
+        return self.rank_graph_rows(self._read(_search, timeout=timeout), k)
+
+    @classmethod
+    def graph_search_params(cls, query_text: str, k: int, filters=None, entity_limit: int = 20, seed_limit: int = 20,
+                            max_entity_degree: int = 50, shared_weight: float = 0.5, adjacent_weight: float = 0.3):
+        """-> (seed query params, expansion query params), None when the question has no searchable term."""
+        terms = cls.fulltext_query(query_text)
+        if not terms:
+            return None
+        scope = cls._scope_params(filters)
+        seed_params = dict(index=ENTITY_FULLTEXT_INDEX, terms=terms, entity_limit=entity_limit, seed_limit=seed_limit, **scope)
+        expansion_params = dict(adjacent_weight=adjacent_weight, shared_weight=shared_weight,
+                                max_entity_degree=max_entity_degree, k=k, **scope)
+        return seed_params, expansion_params
+
+    @staticmethod
+    def _seed_params(seeds) -> dict:
+        return {
+            "seeds": [{"id": row["id"], "score": row["score"]} for row in seeds],
+            "seed_ids": [row["id"] for row in seeds],
+        }
+
+    @staticmethod
+    def rank_graph_rows(rows, k: int) -> list:
+        rows.sort(key=lambda row: row["score"], reverse=True)
+        return rows[:k]
+
+    @staticmethod
+    def format_graph_context(records) -> str:
+        context_parts = [
+            f"Document '{record['name']}' (Indexed on {record['date']}) contains {record['chunk_count']} sections."
+            for record in records
+        ]
         if context_parts:
             return "GRAPH METADATA:\n" + "\n".join(context_parts)
         return ""
 
-    def get_related_chunks_by_id(self, chunk_ids: list):
+    def get_graph_context(self, file_names: list, filters=None, timeout: float = None) -> str:
+        if not self.driver or not file_names:
+            return ""
+        records = self._read(
+            _data, timeout=timeout, query=self.GRAPH_CONTEXT_QUERY, file_names=file_names, **self._scope_params(filters)
+        )
+        return self.format_graph_context(records)
+
+    def get_related_chunks_by_id(self, chunk_ids: list, timeout: float = None):
         if not self.driver or not chunk_ids:
             return []
 
@@ -128,6 +556,93 @@ class GraphStoreClient:
         MATCH (d:Document)-[:HAS_CHUNK]->(c)
         RETURN d.name as source, c.text as text
         """
-        with self.driver.session() as session:
-            result = session.run(query, chunk_ids=chunk_ids)
-            return [record.data() for record in result]
+        return self._read(_data, timeout=timeout, query=query, chunk_ids=chunk_ids)
+
+
+class AsyncGraphStoreClient:
+    """
+    asyncio counterpart of GraphStoreClient's retrieval reads (same Cypher), for the ASGI ask pipeline.
+    An async driver (and its pool) belongs to the event loop that created it, so there is a single one, on the
+    server's long-lived loop: bound by the ASGI lifespan startup (config/asgi.py, which closes it at shutdown), or
+    else the first loop running in the main thread. Short-lived loops (async views under runserver / WSGI get a
+    new one per request) must use GraphStoreClient instead: see `serves_running_loop`.
+    """
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __new__(cls):
+        with cls._instance_lock:
+            if cls._instance is None:
+                instance = super(AsyncGraphStoreClient, cls).__new__(cls)
+                instance.uri, instance.auth = neo4j_connection()
+                instance.loop = None
+                instance._driver = None
+                instance.breaker = GraphCircuitBreaker(getattr(settings, 'NEO4J_FAILURE_COOLDOWN_SECONDS', 30))
+                cls._instance = instance
+        return cls._instance
+
+    def bind(self, loop):
+        with self._instance_lock:
+            self.loop = loop
+
+    def serves_running_loop(self) -> bool:
+        loop = asyncio.get_running_loop()
+        if self.loop is None and threading.current_thread() is threading.main_thread():
+            self.bind(loop)
+        return self.loop is loop
+
+    def driver(self):
+        if not self.serves_running_loop():
+            raise RuntimeError("AsyncGraphStoreClient only runs on the server's long-lived event loop "
+                               "(ASGI with lifespan); use GraphStoreClient from short-lived loops.")
+        if self._driver is None:
+            self._driver = AsyncGraphDatabase.driver(self.uri, auth=self.auth, **driver_options())
+            logger.info("Neo4j async driver created for the server event loop.")
+        return self._driver
+
+    async def close(self):
+        driver, self._driver = self._driver, None
+        if driver is not None:
+            await driver.close()
+            logger.info("Neo4j async driver closed.")
+
+    async def _read(self, work, timeout: float = None, **params):
+        """Async GraphStoreClient._read: managed read transaction, per-query timeout, circuit breaker."""
+        self.breaker.check()
+        try:
+            async with self.driver().session() as session:
+                result = await session.execute_read(unit_of_work(timeout=read_timeout(timeout))(work), **params)
+        except DriverError as e:
+            self.breaker.failed(e)
+            raise
+        self.breaker.succeeded()
+        return result
+
+    async def search_chunks_by_entities(self, query_text: str, k: int = 20, filters=None, timeout: float = None, **options) -> list:
+        params = GraphStoreClient.graph_search_params(query_text, k, filters, **options)
+        if params is None:
+            return []
+        seed_params, expansion_params = params
+
+        async def _search(tx):
+            seeds = await (await tx.run(GraphStoreClient.ENTITY_SEEDS_QUERY, **seed_params)).data()
+            if not seeds:
+                return []
+            expanded = await (await tx.run(
+                GraphStoreClient.ENTITY_EXPANSION_QUERY, **GraphStoreClient._seed_params(seeds), **expansion_params
+            )).data()
+            return seeds + expanded
+
+        return GraphStoreClient.rank_graph_rows(await self._read(_search, timeout=timeout), k)
+
+    async def get_graph_context(self, file_names: list, filters=None, timeout: float = None) -> str:
+        if not file_names:
+            return ""
+
+        async def _context(tx):
+            result = await tx.run(
+                GraphStoreClient.GRAPH_CONTEXT_QUERY, file_names=file_names, **GraphStoreClient._scope_params(filters)
+            )
+            return await result.data()
+
+        return GraphStoreClient.format_graph_context(await self._read(_context, timeout=timeout))
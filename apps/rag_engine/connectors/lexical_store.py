@@ -0,0 +1,221 @@
+import heapq
+import json
+import logging
+import math
+import os
+import re
+import sqlite3
+import threading
+from collections import Counter
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+SCOPE_COLUMNS = {"source": "TEXT", "uploaded_at": "REAL", "doc_type": "TEXT"}
+
+
+def tokenize(text: str):
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class LexicalStoreClient:
+    """
+    Persistent BM25 index (inverted postings + document length stats) stored in SQLite.
+    Loaded once per process; chunks are appended at ingestion time, queries only read
+    the postings of the query terms.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(LexicalStoreClient, cls).__new__(cls)
+            default_path = os.path.join(os.path.dirname(getattr(settings, 'CHROMA_DB_PATH', './data/chroma_db')), "bm25_index.sqlite3")
+            index_path = getattr(settings, 'BM25_INDEX_PATH', default_path)
+            cls._instance.k1 = getattr(settings, 'BM25_K1', 1.5)
+            cls._instance.b = getattr(settings, 'BM25_B', 0.75)
+
+            os.makedirs(os.path.dirname(os.path.abspath(index_path)), exist_ok=True)
+            cls._instance.lock = threading.RLock()
+            cls._instance.conn = sqlite3.connect(index_path, check_same_thread=False)
+            cls._instance._create_schema()
+            cls._instance._load_stats()
+            logger.info(f"BM25 Index loaded from {index_path} ({cls._instance.doc_count} chunks).")
+
+        return cls._instance
+
+    def _create_schema(self):
+        with self.lock, self.conn:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS documents (
+                    id TEXT PRIMARY KEY,
+                    length INTEGER NOT NULL,
+                    text TEXT NOT NULL,
+                    metadata TEXT NOT NULL
+                )
+            """)
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS postings (
+                    term TEXT NOT NULL,
+                    doc_id TEXT NOT NULL,
+                    tf INTEGER NOT NULL,
+                    PRIMARY KEY (term, doc_id)
+                ) WITHOUT ROWID
+            """)
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_postings_doc ON postings(doc_id)")
+
+            # Scope columns (copied out of the metadata JSON) so filtered searches can use an index
+            columns = {row[1] for row in self.conn.execute("PRAGMA table_info(documents)")}
+            for column, sql_type in SCOPE_COLUMNS.items():
+                if column not in columns:
+                    self.conn.execute(f"ALTER TABLE documents ADD COLUMN {column} {sql_type}")
+                    self.conn.execute(f"UPDATE documents SET {column} = json_extract(metadata, '$.{column}')")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_documents_source ON documents(source)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_documents_uploaded_at ON documents(uploaded_at)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_documents_doc_type ON documents(doc_type)")
+
+    def _load_stats(self):
+        with self.lock:
+            row = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(length), 0) FROM documents").fetchone()
+            self.doc_count, self.total_length = row[0], row[1]
+            self.data_version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def _refresh_if_changed(self):
+        # data_version only moves when another connection (e.g. an ingest_pdf process) committed
+        with self.lock:
+            if self.conn.execute("PRAGMA data_version").fetchone()[0] != self.data_version:
+                self._load_stats()
+
+    def count(self) -> int:
+        self._refresh_if_changed()
+        return self.doc_count
+
+    @property
+    def avgdl(self) -> float:
+        return self.total_length / self.doc_count if self.doc_count else 0.0
+
+    def add_documents(self, documents, metadatas, ids):
+        if not ids:
+            return
+        with self.lock, self.conn:
+            self._delete_ids(ids)
+            for doc_id, text, metadata in zip(ids, documents, metadatas):
+                term_freqs = Counter(tokenize(text))
+                length = sum(term_freqs.values())
+                metadata = metadata or {}
+                self.conn.execute(
+                    "INSERT INTO documents (id, length, text, metadata, source, uploaded_at, doc_type) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (doc_id, length, text, json.dumps(metadata), *(metadata.get(column) for column in SCOPE_COLUMNS))
+                )
+                self.conn.executemany(
+                    "INSERT INTO postings (term, doc_id, tf) VALUES (?, ?, ?)",
+                    [(term, doc_id, tf) for term, tf in term_freqs.items()]
+                )
+                self.doc_count += 1
+                self.total_length += length
+        logger.info(f"BM25 Index: appended {len(ids)} chunks (total: {self.doc_count}).")
+
+    def delete(self, ids):
+        if not ids:
+            return
+        with self.lock, self.conn:
+            self._delete_ids(ids)
+
+    def _delete_ids(self, ids):
+        for doc_id in ids:
+            row = self.conn.execute("SELECT length FROM documents WHERE id = ?", (doc_id,)).fetchone()
+            if row is None:
+                continue
+            self.conn.execute("DELETE FROM postings WHERE doc_id = ?", (doc_id,))
+            self.conn.execute("DELETE FROM documents WHERE id = ?", (doc_id,))
+            self.doc_count -= 1
+            self.total_length -= row[0]
+
+    def search(self, query: str, k: int = 20, filters=None):
+        return self.search_many([query], k=k, filters=filters)[0]
+
+    def search_many(self, queries, k: int = 20, filters=None):
+        """BM25 top-k of several queries: the postings of a term shared by the queries are read once."""
+        query_terms = [set(tokenize(query)) for query in queries]
+        self._refresh_if_changed()
+        all_terms = set().union(*query_terms)
+        if not all_terms or not self.doc_count:
+            return [[] for _ in queries]
+
+        scoped = filters is not None and not filters.is_empty()
+        if scoped:
+            predicate, scope_params = filters.sql_where("d")
+            if filters.has_indexed_predicate():
+                # Drive the join from the (indexed) scoped documents: one postings PK lookup per in-scope chunk,
+                # so the cost follows the size of the scope, not the size of the corpus
+                postings_query = (f"SELECT p.doc_id, p.tf, d.length FROM documents d CROSS JOIN postings p "
+                                  f"WHERE p.term = ? AND p.doc_id = d.id AND {predicate}")
+            else:
+                postings_query = (f"SELECT p.doc_id, p.tf, d.length FROM postings p JOIN documents d ON d.id = p.doc_id "
+                                  f"WHERE p.term = ? AND {predicate}")
+
+        # term -> [(doc_id, BM25 contribution)]
+        contributions = {}
+        with self.lock:
+            n_docs, avgdl = self.doc_count, self.avgdl
+            for term in all_terms:
+                if scoped:
+                    rows = self.conn.execute(postings_query, (term, *scope_params)).fetchall()
+                    if not rows:
+                        continue
+                    # IDF stays corpus-wide so scores don't depend on the scope
+                    df = self.conn.execute("SELECT COUNT(*) FROM postings WHERE term = ?", (term,)).fetchone()[0]
+                else:
+                    rows = self.conn.execute(
+                        "SELECT p.doc_id, p.tf, d.length FROM postings p JOIN documents d ON d.id = p.doc_id WHERE p.term = ?",
+                        (term,)
+                    ).fetchall()
+                    if not rows:
+                        continue
+                    df = len(rows)
+                idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+                contributions[term] = [
+                    (doc_id, idf * tf * (self.k1 + 1) / (tf + self.k1 * (1 - self.b + self.b * length / avgdl)))
+                    for doc_id, tf, length in rows
+                ]
+
+        results = []
+        for terms in query_terms:
+            scores = {}
+            for term in terms:
+                for doc_id, value in contributions.get(term, ()):
+                    scores[doc_id] = scores.get(doc_id, 0.0) + value
+            results.append(heapq.nlargest(k, scores.items(), key=lambda item: item[1]))
+        return results
+
+    def update_metadatas(self, ids, metadatas):
+        if not ids:
+            return
+        # Merged into the stored metadata (same semantics as Chroma's collection.update)
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "UPDATE documents SET metadata = json_patch(metadata, ?) WHERE id = ?",
+                [(json.dumps(metadata or {}), doc_id) for doc_id, metadata in zip(ids, metadatas)]
+            )
+            self.conn.executemany(
+                f"UPDATE documents SET {', '.join(f'{c} = json_extract(metadata, ?)' for c in SCOPE_COLUMNS)} WHERE id = ?",
+                [(*(f"$.{c}" for c in SCOPE_COLUMNS), doc_id) for doc_id in ids]
+            )
+
+    def get_documents(self, ids):
+        if not ids:
+            return {}
+        placeholders = ",".join("?" for _ in ids)
+        with self.lock:
+            rows = self.conn.execute(
+                f"SELECT id, text, metadata FROM documents WHERE id IN ({placeholders})",
+                list(ids)
+            ).fetchall()
+        return {doc_id: (text, json.loads(metadata)) for doc_id, text, metadata in rows}
+
+    def clear(self):
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM postings")
+            self.conn.execute("DELETE FROM documents")
+            self.doc_count, self.total_length = 0, 0
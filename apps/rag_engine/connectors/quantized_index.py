@@ -0,0 +1,265 @@
+import fcntl
+import logging
+import os
+import threading
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SEARCH_BLOCK_ROWS = 65536
+MIN_CAPACITY = 1024
+
+
+def truncate_and_normalize(vectors: np.ndarray, dimensions: int = None) -> np.ndarray:
+    """Matryoshka truncation: keeps the first `dimensions` components and re-normalizes (dot product == cosine)."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if dimensions:
+        vectors = vectors[..., :dimensions]
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1.0, norms)
+
+
+def quantize(vectors: np.ndarray, dtype: str) -> tuple:
+    """-> (codes, per-row scales or None). int8 is symmetric scalar quantization with one scale per vector."""
+    if dtype == "int8":
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+        return codes, scales.astype(np.float32)
+    return vectors.astype(np.dtype(dtype)), None
+
+
+class QuantizedVectorIndex:
+    """
+    Compact copy of the chunk vectors for VECTOR_STORAGE="quantized", so web workers never load Chroma's HNSW:
+    - search.bin: the (optionally Matryoshka-truncated) vectors as float16 or int8 codes (+ scales.bin), held in
+      RAM and scanned exhaustively to build a short list,
+    - full.bin: the full float32 vectors, memory-mapped: only the short list's rows are read, for exact re-scoring,
+    - ops.log: "+id" / "-id" lines in write order; the n-th "+" line is row n of both matrices.
+    Files are written under an exclusive flock, vectors before the log line that makes them visible, and always at
+    the offset of the row the log will give them: bytes left past it by a writer that crashed before its log line
+    are overwritten by the next add, so rows never shift. The ingestion process and the web workers share the
+    files; readers catch up before every search.
+    Deleted rows stay on disk until `manage.py rebuild_vector_index` compacts them.
+    """
+
+    def __init__(self, directory: str, dim: int, dimensions: int = None, dtype: str = "int8"):
+        self.dim = dim
+        self.dimensions = dimensions if dimensions and dimensions < dim else None
+        self.search_dim = self.dimensions or dim
+        self.dtype = dtype
+        self.path = os.path.join(directory, f"{dim}-{self.search_dim}-{dtype}")
+        os.makedirs(self.path, exist_ok=True)
+        self.search_path = os.path.join(self.path, "search.bin")
+        self.scales_path = os.path.join(self.path, "scales.bin")
+        self.full_path = os.path.join(self.path, "full.bin")
+        self.log_path = os.path.join(self.path, "ops.log")
+        self.lock_path = os.path.join(self.path, "lock")
+        self.search_row_bytes = self.search_dim * np.dtype(np.int8 if dtype == "int8" else dtype).itemsize
+
+        self.lock = threading.Lock()
+        self._reset()
+        open(self.log_path, "ab").close()
+        with self.lock:
+            self._refresh()
+        logger.info(f"Quantized vector index: {len(self.rows)} vectors ({dtype}, {self.search_dim}/{dim} dims) in {self.path}.")
+
+    def _reset(self):
+        self.log_offset = 0
+        self.log_inode = None
+        self.count = 0
+        self.ids = []
+        self.rows = {}
+        codes_dtype = np.int8 if self.dtype == "int8" else np.dtype(self.dtype)
+        self.codes = np.empty((0, self.search_dim), dtype=codes_dtype)
+        self.scales = np.empty(0, dtype=np.float32)
+        self.alive = np.empty(0, dtype=bool)
+        self.full = None
+
+    def __len__(self):
+        return len(self.rows)
+
+    @property
+    def memory_bytes(self) -> int:
+        return self.codes[:self.count].nbytes + self.scales[:self.count].nbytes + self.alive[:self.count].nbytes
+
+    def add(self, ids: list, vectors):
+        if not ids:
+            return
+        full = np.asarray(vectors, dtype=np.float32)
+        codes, scales = quantize(truncate_and_normalize(full, self.dimensions), self.dtype)
+        with self.lock, self._file_lock(fcntl.LOCK_EX):
+            self._refresh()
+            _write_rows(self.search_path, self.count * self.search_row_bytes, codes.tobytes())
+            if scales is not None:
+                _write_rows(self.scales_path, self.count * 4, scales.tobytes())
+            _write_rows(self.full_path, self.count * self.dim * 4, full.tobytes())
+            with open(self.log_path, "a", encoding="utf-8") as f:
+                f.write("".join(f"+{doc_id}\n" for doc_id in ids))
+            self._refresh()
+
+    def delete(self, ids: list):
+        if not ids:
+            return
+        with self.lock, self._file_lock(fcntl.LOCK_EX):
+            with open(self.log_path, "a", encoding="utf-8") as f:
+                f.write("".join(f"-{doc_id}\n" for doc_id in ids))
+            self._refresh()
+
+    def rebuild(self, batches) -> int:
+        """Rewrites the files from (ids, vectors) batches, without deleted rows; readers switch over at their next search."""
+        targets = (self.search_path, self.scales_path, self.full_path, self.log_path)
+        files = {path: open(path + ".tmp", "wb") for path in targets}
+        written = 0
+        try:
+            for ids, vectors in batches:
+                full = np.asarray(vectors, dtype=np.float32)
+                codes, scales = quantize(truncate_and_normalize(full, self.dimensions), self.dtype)
+                files[self.search_path].write(codes.tobytes())
+                if scales is not None:
+                    files[self.scales_path].write(scales.tobytes())
+                files[self.full_path].write(full.tobytes())
+                files[self.log_path].write("".join(f"+{doc_id}\n" for doc_id in ids).encode("utf-8"))
+                written += len(ids)
+        finally:
+            for f in files.values():
+                f.close()
+        with self.lock, self._file_lock(fcntl.LOCK_EX):
+            for path in targets:
+                os.replace(path + ".tmp", path)
+            self._refresh()
+        return written
+
+    def search(self, query_vector, k: int, candidate_k: int, allowed_ids=None) -> list:
+        """
+        -> [(id, exact cosine)] best first: the `candidate_k` best rows by quantized score, re-scored with the
+        float32 full vectors.
+        """
+        query_full = np.asarray(query_vector, dtype=np.float32)
+        query = truncate_and_normalize(query_full, self.dimensions)
+        # Only the snapshot is taken under the lock: rows below `n` are never rewritten (a refresh appends, a rebuild
+        # swaps in new arrays), so concurrent queries scan in parallel
+        with self.lock:
+            with self._file_lock(fcntl.LOCK_SH):
+                self._refresh()
+            n = self.count
+            if not n:
+                return []
+            mask = self.alive[:n].copy()
+            if allowed_ids is not None:
+                allowed = np.zeros(n, dtype=bool)
+                rows = [self.rows[doc_id] for doc_id in allowed_ids if doc_id in self.rows]
+                allowed[rows] = True
+                mask &= allowed
+            codes, scales, full, ids = self.codes[:n], self.scales[:n], self.full, self.ids
+
+        live = int(mask.sum())
+        if not live:
+            return []
+        scores = np.full(n, -np.inf, dtype=np.float32)
+        for start in range(0, n, SEARCH_BLOCK_ROWS):
+            end = min(n, start + SEARCH_BLOCK_ROWS)
+            block = codes[start:end].astype(np.float32) @ query
+            if self.dtype == "int8":
+                block *= scales[start:end]
+            scores[start:end] = np.where(mask[start:end], block, -np.inf)
+
+        short = min(live, max(k, candidate_k))
+        candidates = np.argpartition(-scores, short - 1)[:short]
+        candidates = np.sort(candidates[np.isfinite(scores[candidates])])
+        exact = full[candidates] @ query_full
+        order = np.argsort(-exact)[:k]
+        return [(ids[candidates[i]], float(exact[i])) for i in order]
+
+    def _file_lock(self, mode):
+        return _FileLock(self.lock_path, mode)
+
+    def _refresh(self):
+        """Applies the log lines written (by any process) since the last refresh."""
+        stat = os.stat(self.log_path)
+        if self.log_inode is not None and stat.st_ino != self.log_inode:
+            # Rebuilt by rebuild_vector_index: start over from the new files
+            self._reset()
+        self.log_inode = stat.st_ino
+        if stat.st_size <= self.log_offset:
+            return
+        with open(self.log_path, "rb") as f:
+            f.seek(self.log_offset)
+            data = f.read(stat.st_size - self.log_offset)
+        data = data[:data.rfind(b"\n") + 1]
+        self.log_offset += len(data)
+
+        first_row = self.count
+        for line in data.decode("utf-8").splitlines():
+            op, doc_id = line[0], line[1:]
+            if op == "+":
+                previous = self.rows.get(doc_id)
+                if previous is not None:
+                    self.alive[previous] = False
+                self._grow(self.count + 1)
+                self.rows[doc_id] = self.count
+                self.ids.append(doc_id)
+                self.alive[self.count] = True
+                self.count += 1
+            elif op == "-" and doc_id in self.rows:
+                self.alive[self.rows.pop(doc_id)] = False
+
+        added = self.count - first_row
+        if added:
+            with open(self.search_path, "rb") as f:
+                f.seek(first_row * self.search_row_bytes)
+                self.codes[first_row:self.count] = np.frombuffer(
+                    f.read(added * self.search_row_bytes), dtype=self.codes.dtype
+                ).reshape(added, self.search_dim)
+            if self.dtype == "int8":
+                with open(self.scales_path, "rb") as f:
+                    f.seek(first_row * 4)
+                    self.scales[first_row:self.count] = np.frombuffer(f.read(added * 4), dtype=np.float32)
+            self.full = np.memmap(self.full_path, dtype=np.float32, mode="r", shape=(self.count, self.dim))
+
+    def _grow(self, needed: int):
+        capacity = len(self.alive)
+        if needed <= capacity:
+            return
+        capacity = max(MIN_CAPACITY, capacity * 2, needed)
+        codes = np.empty((capacity, self.search_dim), dtype=self.codes.dtype)
+        codes[:self.count] = self.codes[:self.count]
+        scales = np.ones(capacity, dtype=np.float32)
+        scales[:self.count] = self.scales[:self.count]
+        alive = np.zeros(capacity, dtype=bool)
+        alive[:self.count] = self.alive[:self.count]
+        self.codes, self.scales, self.alive = codes, scales, alive
+
+    def stats(self) -> dict:
+        return {
+            "vectors": len(self.rows),
+            "rows": self.count,
+            "dtype": self.dtype,
+            "search_dimensions": self.search_dim,
+            "dimensions": self.dim,
+            "memory_bytes": self.memory_bytes,
+            "path": self.path,
+        }
+
+
+def _write_rows(path: str, offset: int, data: bytes):
+    """Writes `data` at `offset`, dropping whatever lies past it (rows of a writer that died before its log line)."""
+    with open(path, "r+b" if os.path.exists(path) else "wb") as f:
+        f.truncate(offset)
+        f.seek(offset)
+        f.write(data)
+
+
+class _FileLock:
+    def __init__(self, path: str, mode):
+        self.path = path
+        self.mode = mode
+
+    def __enter__(self):
+        self.file = open(self.path, "a")
+        fcntl.flock(self.file, self.mode)
+        return self
+
+    def __exit__(self, *exc):
+        fcntl.flock(self.file, fcntl.LOCK_UN)
+        self.file.close()
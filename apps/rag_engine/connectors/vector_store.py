@@ -1,41 +1,40 @@
 import logging
-import torch
+import os
 import chromadb
 from chromadb.config import Settings
 from langchain_chroma import Chroma
-from langchain_huggingface import HuggingFaceEmbeddings
 from django.conf import settings
+from apps.rag_engine.connectors.embeddings import EmbeddingService
 
 logger = logging.getLogger(__name__)
 
+# Chroma collection metadata keys of the HNSW parameters (fixed at creation, except search_ef)
+HNSW_KEYS = {
+    "space": "hnsw:space",
+    "M": "hnsw:M",
+    "construction_ef": "hnsw:construction_ef",
+    "search_ef": "hnsw:search_ef",
+    "num_threads": "hnsw:num_threads",
+}
+
+
+def hnsw_metadata(params: dict = None) -> dict:
+    params = params if params is not None else getattr(settings, 'CHROMA_HNSW', {})
+    return {HNSW_KEYS[name]: value for name, value in params.items() if name in HNSW_KEYS and value is not None}
+
+
 class VectorStoreClient:
     _instance = None
 
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super(VectorStoreClient, cls).__new__(cls)
-            
+
             persist_path = getattr(settings, 'CHROMA_DB_PATH', './data/chroma_db')
             collection_name = getattr(settings, 'CHROMA_COLLECTION_NAME', 'legal_docs')
-            model_name = getattr(settings, 'EMBEDDING_MODEL_NAME', 'all-MiniLM-L6-v2')
 
             logger.info(f"Initializing Vector Store at {persist_path}...")
-            device = "cuda" if torch.cuda.is_available() else "cpu"
-            model_kwargs = {"device": device, "trust_remote_code": True}
-            
-            # Optimisation RTX 4060
-            if device == "cuda" and torch.cuda.is_bf16_supported():
-                model_kwargs["model_kwargs"] = {"torch_dtype": torch.bfloat16}
-                logger.info(f"VectorStore: Embeddings running on {device} (Bfloat16 Mode).")
-            else:
-                logger.info(f"VectorStore: Embeddings running on {device}.")
-
-
-            cls._instance.embedding_fn = HuggingFaceEmbeddings(
-                model_name=model_name,
-                model_kwargs=model_kwargs,
-                encode_kwargs={"device": device, "batch_size": 32}
-            )
+            cls._instance.embedding_fn = EmbeddingService()
 
             cls._instance.client = chromadb.PersistentClient(
                 path=persist_path,
@@ -45,8 +44,23 @@ class VectorStoreClient:
                 client=cls._instance.client,
                 collection_name=collection_name,
                 embedding_function=cls._instance.embedding_fn,
+                collection_metadata=hnsw_metadata() or None,
             )
-            
+            cls._instance.check_hnsw_params()
+
+            cls._instance.quantized = None
+            if getattr(settings, 'VECTOR_STORAGE', 'hnsw') == "quantized":
+                from apps.rag_engine.connectors.quantized_index import QuantizedVectorIndex
+                cls._instance.quantized = QuantizedVectorIndex(
+                    os.path.join(persist_path, "quantized", collection_name),
+                    cls._instance.embedding_fn.model.get_sentence_embedding_dimension(),
+                    dimensions=getattr(settings, 'VECTOR_INDEX_DIMENSIONS', None),
+                    dtype=getattr(settings, 'VECTOR_QUANTIZATION', "int8"),
+                )
+                if not len(cls._instance.quantized) and cls._instance.get_collection().count():
+                    logger.warning("Quantized vector index is empty but the collection is not: "
+                                   "run `manage.py rebuild_vector_index` to fill it.")
+
         return cls._instance
 
     def get_collection(self):
@@ -54,13 +68,69 @@ class VectorStoreClient:
             name=getattr(settings, 'CHROMA_COLLECTION_NAME', 'legal_docs')
         )
 
+    def check_hnsw_params(self):
+        # HNSW parameters only apply when the collection is created: an existing one keeps its own
+        current = self.get_collection().metadata or {}
+        stale = {key: (current.get(key), value) for key, value in hnsw_metadata().items() if current.get(key) != value}
+        if stale:
+            details = ", ".join(f"{key}={old} (settings: {new})" for key, (old, new) in stale.items())
+            logger.warning(f"Chroma collection HNSW parameters differ from CHROMA_HNSW: {details}. "
+                           f"Run `manage.py rebuild_vector_index --hnsw` to rebuild it with the new ones.")
+
 
-    def add_documents(self, documents, metadatas, ids):
-        self.db.add_texts(
-            texts=documents,
+    def add_documents(self, documents, metadatas, ids, embeddings=None):
+        # Precomputed vectors skip the embedding function entirely
+        if embeddings is None:
+            embeddings = self.embedding_fn.embed_documents(documents)
+        self.get_collection().add(
+            documents=documents,
             metadatas=metadatas,
-            ids=ids
+            ids=ids,
+            embeddings=[list(map(float, v)) for v in embeddings]
         )
+        if self.quantized is not None:
+            self.quantized.add(ids, embeddings)
+
+    def delete(self, ids):
+        if not ids:
+            return
+        self.get_collection().delete(ids=ids)
+        if self.quantized is not None:
+            self.quantized.delete(ids)
+
+    def quantized_search(self, query: str, k: int = 20, where: dict = None) -> list:
+        """-> [(id, cosine, text, metadata)] from the quantized index, re-scored exactly (see QuantizedVectorIndex)."""
+        return self.search_many([self.embedding_fn.encode([query])[0]], k=k, where=where)[0]
+
+    def search_many(self, query_vectors, k: int = 20, where: dict = None) -> list:
+        """
+        Vector top-k of several (already embedded) queries in one pass -> per query [(id, score, text, metadata)].
+        Score is the cosine similarity (Chroma's l2 / cosine / ip distances converted, vectors are normalized).
+        """
+        collection = self.get_collection()
+        if self.quantized is None:
+            result = collection.query(
+                query_embeddings=[list(map(float, v)) for v in query_vectors],
+                n_results=k,
+                where=where or None,
+                include=["documents", "metadatas", "distances"],
+            )
+            l2 = (collection.metadata or {}).get("hnsw:space", "l2") == "l2"
+            return [
+                [(doc_id, 1 - distance / 2 if l2 else 1 - distance, text, metadata)
+                 for doc_id, distance, text, metadata in zip(ids, distances, documents, metadatas)]
+                for ids, distances, documents, metadatas in zip(result["ids"], result["distances"], result["documents"], result["metadatas"])
+            ]
+
+        allowed_ids = collection.get(where=where, include=[])["ids"] if where else None
+        candidate_k = k * getattr(settings, 'VECTOR_RESCORE_FACTOR', 4)
+        hits = [self.quantized.search(vector, k, candidate_k, allowed_ids=allowed_ids) for vector in query_vectors]
+        wanted = list({doc_id for per_query in hits for doc_id, _ in per_query})
+        if not wanted:
+            return [[] for _ in hits]
+        stored = collection.get(ids=wanted, include=["documents", "metadatas"])
+        by_id = {doc_id: (text, metadata) for doc_id, text, metadata in zip(stored["ids"], stored["documents"], stored["metadatas"])}
+        return [[(doc_id, score, *by_id[doc_id]) for doc_id, score in per_query if doc_id in by_id] for per_query in hits]
 
     def search(self, query, n_results=5):
-        return self.db.similarity_search(query, k=n_results)
\ No newline at end of file
+        return self.db.similarity_search(query, k=n_results)
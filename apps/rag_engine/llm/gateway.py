@@ -0,0 +1,235 @@
+import asyncio
+import hashlib
+import logging
+import threading
+from collections import deque
+from typing import Any
+from concurrent.futures import Future
+from contextlib import asynccontextmanager, contextmanager
+from django.conf import settings
+from langchain_core.runnables import Runnable
+from apps.rag_engine.llm.providers import build_chat_model, provider_options
+
+logger = logging.getLogger(__name__)
+
+# Roles whose prompts expect a JSON object back (providers switch to their JSON mode)
+JSON_ROLES = {"enrichment"}
+DEFAULT_ROLES = {"answer": "groq", "enrichment": "ollama"}
+
+
+class ConcurrencyLimit:
+    """
+    Counting semaphore shared by threads and event loops, so a provider has one limit whether it is called
+    from the sync views, the ingestion workers or the async pipeline. Slots are handed over in FIFO order.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = max(1, limit)
+        self.active = 0
+        self.waiters = deque()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        with self.lock:
+            if self.active < self.limit and not self.waiters:
+                self.active += 1
+                return
+            event = threading.Event()
+            self.waiters.append(event)
+        event.wait()
+
+    async def acquire_async(self):
+        loop = asyncio.get_running_loop()
+        with self.lock:
+            if self.active < self.limit and not self.waiters:
+                self.active += 1
+                return
+            future = loop.create_future()
+            waiter = (loop, future)
+            self.waiters.append(waiter)
+        try:
+            await future
+        except asyncio.CancelledError:
+            with self.lock:
+                queued = waiter in self.waiters
+                if queued:
+                    self.waiters.remove(waiter)
+            if not queued and future.done() and not future.cancelled():
+                # The slot reached us just as we were cancelled: pass it on
+                self.release()
+            raise
+
+    def release(self):
+        with self.lock:
+            while self.waiters:
+                waiter = self.waiters.popleft()
+                if isinstance(waiter, threading.Event):
+                    waiter.set()
+                    return
+                loop, future = waiter
+                if not loop.is_closed():
+                    loop.call_soon_threadsafe(self._wake, future)
+                    return
+            self.active -= 1
+
+    def _wake(self, future):
+        if future.cancelled():
+            self.release()
+        else:
+            future.set_result(None)
+
+    @contextmanager
+    def slot(self):
+        self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    @asynccontextmanager
+    async def aslot(self):
+        await self.acquire_async()
+        try:
+            yield
+        finally:
+            self.release()
+
+
+class LLMGateway(Runnable[Any, Any]):
+    """
+    Drop-in chat model for LangChain chains (`prompt | gateway | parser`) in front of a provider:
+    - every call (invoke, ainvoke, stream, astream) takes a slot of the provider's ConcurrencyLimit,
+    - identical prompts already in flight are coalesced: followers wait for the leader's reply instead of
+      sending the same request again (invoke / ainvoke only; streams are per client).
+    """
+
+    def __init__(self, provider: str, model, limit: ConcurrencyLimit, model_name: str, json_mode: bool = False,
+                 coalesce: bool = True):
+        self.provider = provider
+        self.json_mode = json_mode
+        self.model = model
+        self.limit = limit
+        self.model_name = model_name
+        self.coalesce = coalesce
+        self.inflight = {}
+        self.inflight_lock = threading.Lock()
+        self.calls = 0
+        self.coalesced = 0
+
+    @staticmethod
+    def _key(input) -> str:
+        text = input.to_string() if hasattr(input, "to_string") else str(input)
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def _join(self, input):
+        """-> (key, future, is_leader)."""
+        key = self._key(input)
+        with self.inflight_lock:
+            future = self.inflight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return key, future, False
+            future = Future()
+            self.inflight[key] = future
+            return key, future, True
+
+    def _settle(self, key, future, result=None, error=None):
+        with self.inflight_lock:
+            self.inflight.pop(key, None)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def invoke(self, input, config=None, **kwargs):
+        if not self.coalesce:
+            return self._invoke(input, config, **kwargs)
+        key, future, leader = self._join(input)
+        if not leader:
+            return future.result()
+        try:
+            result = self._invoke(input, config, **kwargs)
+        except BaseException as e:
+            self._settle(key, future, error=e)
+            raise
+        self._settle(key, future, result)
+        return result
+
+    async def ainvoke(self, input, config=None, **kwargs):
+        if not self.coalesce:
+            return await self._ainvoke(input, config, **kwargs)
+        key, future, leader = self._join(input)
+        if not leader:
+            return await asyncio.wrap_future(future)
+        try:
+            result = await self._ainvoke(input, config, **kwargs)
+        except BaseException as e:
+            self._settle(key, future, error=e)
+            raise
+        self._settle(key, future, result)
+        return result
+
+    def _invoke(self, input, config, **kwargs):
+        with self.limit.slot():
+            self.calls += 1
+            return self.model.invoke(input, config, **kwargs)
+
+    async def _ainvoke(self, input, config, **kwargs):
+        async with self.limit.aslot():
+            self.calls += 1
+            return await self.model.ainvoke(input, config, **kwargs)
+
+    def stream(self, input, config=None, **kwargs):
+        with self.limit.slot():
+            self.calls += 1
+            yield from self.model.stream(input, config, **kwargs)
+
+    async def astream(self, input, config=None, **kwargs):
+        async with self.limit.aslot():
+            self.calls += 1
+            async for chunk in self.model.astream(input, config, **kwargs):
+                yield chunk
+
+    def stats(self) -> dict:
+        return {
+            "provider": self.provider,
+            "model": self.model_name,
+            "json_mode": self.json_mode,
+            "max_concurrency": self.limit.limit,
+            "active": self.limit.active,
+            "queued": len(self.limit.waiters),
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+        }
+
+
+_GATEWAYS = {}
+_LIMITS = {}
+_lock = threading.Lock()
+
+
+def get_llm(role: str) -> LLMGateway:
+    """Chat model for a pipeline role ("answer", "enrichment"), per LLM_ROLES. Built once per process."""
+    provider = getattr(settings, 'LLM_ROLES', DEFAULT_ROLES).get(role, role)
+    json_mode = role in JSON_ROLES
+    key = (provider, json_mode)
+    with _lock:
+        if key not in _GATEWAYS:
+            options = provider_options(provider)
+            if provider not in _LIMITS:
+                _LIMITS[provider] = ConcurrencyLimit(options.get("max_concurrency", 8))
+            _GATEWAYS[key] = LLMGateway(
+                provider,
+                build_chat_model(provider, options, json_mode=json_mode),
+                _LIMITS[provider],
+                model_name=options.get("model", provider),
+                json_mode=json_mode,
+                coalesce=getattr(settings, 'LLM_COALESCE_INFLIGHT', True),
+            )
+            logger.info(f"LLM '{role}': provider '{provider}' ({options.get('backend', provider)}, "
+                        f"{options.get('model', 'default model')}, max {_LIMITS[provider].limit} concurrent calls).")
+        return _GATEWAYS[key]
+
+
+def llm_stats() -> list:
+    return [gateway.stats() for gateway in list(_GATEWAYS.values())]
@@ -0,0 +1,129 @@
+import asyncio
+import logging
+import os
+import time
+from django.conf import settings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from apps.rag_engine.llm.stub import stub_answer, stub_reply
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROVIDERS = {
+    "groq": {"backend": "groq", "model": "llama-3.3-70b-versatile", "max_concurrency": 8},
+    "ollama": {"backend": "ollama", "model": "mistral-nemo", "max_concurrency": 8},
+    "local": {"backend": "local", "max_concurrency": 1},
+    "stub": {"backend": "stub", "max_concurrency": 64},
+}
+
+
+def provider_options(name: str) -> dict:
+    providers = getattr(settings, 'LLM_PROVIDERS', DEFAULT_PROVIDERS)
+    if name not in providers:
+        raise ValueError(f"Unknown LLM provider '{name}' (configured: {', '.join(providers)}).")
+    return {"backend": name, **providers[name]}
+
+
+def build_chat_model(name: str, options: dict, json_mode: bool = False):
+    backend = options["backend"]
+    if backend == "groq":
+        return _groq(options, json_mode)
+    if backend == "ollama":
+        return _ollama(options, json_mode)
+    if backend == "local":
+        return _local(options)
+    if backend == "stub":
+        return StubChatModel(json_mode=json_mode, latency_ms=options.get("latency_ms", 0))
+    raise ValueError(f"LLM provider '{name}' has unknown backend '{backend}'.")
+
+
+def _http_limits(options: dict):
+    import httpx
+    return httpx.Limits(
+        max_connections=options.get("max_connections", 20),
+        max_keepalive_connections=options.get("max_keepalive_connections", 10),
+        keepalive_expiry=options.get("keepalive_expiry", 60.0),
+    )
+
+
+def _groq(options: dict, json_mode: bool):
+    # One pooled keep-alive client per provider: no TLS handshake per question
+    import httpx
+    from langchain_groq import ChatGroq
+
+    limits, timeout = _http_limits(options), options.get("timeout", 60.0)
+    return ChatGroq(
+        temperature=0,
+        model_name=options.get("model", "llama-3.3-70b-versatile"),
+        api_key=options.get("api_key") or getattr(settings, 'GROQ_API_KEY', None) or os.getenv('GROQ_API_KEY'),
+        http_client=httpx.Client(limits=limits, timeout=timeout),
+        http_async_client=httpx.AsyncClient(limits=limits, timeout=timeout),
+        max_retries=options.get("max_retries", 2),
+        model_kwargs={"response_format": {"type": "json_object"}} if json_mode else {},
+    )
+
+
+def _ollama(options: dict, json_mode: bool):
+    from langchain_ollama import ChatOllama
+
+    return ChatOllama(
+        model=options.get("model", "mistral-nemo"),
+        temperature=0,
+        base_url=options.get("base_url") or getattr(settings, 'OLLAMA_BASE_URL', "http://host.docker.internal:11434"),
+        format="json" if json_mode else None,
+        # Keeps the model loaded between calls instead of Ollama's 5 minute default
+        keep_alive=options.get("keep_alive", "30m"),
+        client_kwargs={"limits": _http_limits(options), "timeout": options.get("timeout", 300)},
+    )
+
+
+def _local(options: dict):
+    # In-process seq2seq model (the flan-t5 fetched by download_models.py): no network, one call at a time
+    from transformers import pipeline
+    from langchain_community.llms import HuggingFacePipeline
+
+    model_path = options.get("model") or getattr(settings, 'LLM_MODEL_NAME')
+    generation = {**getattr(settings, 'GENERATION_CONFIG', {}), **options.get("generation", {})}
+    generator = pipeline("text2text-generation", model=model_path, tokenizer=model_path, truncation=True, **generation)
+    logger.info(f"Local LLM loaded from {model_path}.")
+    return HuggingFacePipeline(pipeline=generator)
+
+
+class StubChatModel(BaseChatModel):
+    """
+    Deterministic offline chat model: extractive answers from the prompt's excerpts, or the enrichment JSON
+    in json mode. `latency_ms` simulates a remote model for benchmarks.
+    """
+    json_mode: bool = False
+    latency_ms: float = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub"
+
+    def _reply(self, messages) -> str:
+        prompt = "\n".join(str(m.content) for m in messages)
+        return stub_reply(prompt) if self.json_mode else stub_answer(prompt)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self._reply(messages)))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self._reply(messages)))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        for word in self._reply(messages).split(" "):
+            yield ChatGenerationChunk(message=AIMessageChunk(content=word + " "))
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000)
+        for word in self._reply(messages).split(" "):
+            yield ChatGenerationChunk(message=AIMessageChunk(content=word + " "))
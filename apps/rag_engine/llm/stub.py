@@ -0,0 +1,37 @@
+"""
+Deterministic offline replies, shared by the "stub" LLM provider and the fake Ollama server
+(apps/evaluation/scripts/fake_ollama.py). Standard library only.
+"""
+import json
+import re
+
+BATCH_CHUNK_PATTERN = re.compile(r'<chunk id="(\d+)">\s*(.*?)\s*</chunk>', re.DOTALL)
+SINGLE_CHUNK_PATTERN = re.compile(r"<chunk_to_analyze>\s*(.*?)\s*</chunk_to_analyze>", re.DOTALL)
+ENTITY_PATTERN = re.compile(r"\b[A-Z][a-zA-Z]{3,}(?:\s+[A-Z][a-zA-Z]{3,})*")
+EXCERPT_PATTERN = re.compile(r"^Content: (.+)$", re.MULTILINE)
+
+NO_INFORMATION_ANSWER = "I don't have enough information."
+
+
+def stub_analysis(chunk: str) -> dict:
+    names = list(dict.fromkeys(ENTITY_PATTERN.findall(chunk)))[:5]
+    first_sentence = chunk.strip().split(".")[0][:120]
+    return {
+        "context": f"Discusses: {first_sentence}",
+        "entities": [{"name": name, "type": "CONCEPT"} for name in names],
+    }
+
+
+def stub_reply(prompt: str) -> str:
+    """JSON reply in the shape the enrichment prompts ask for (single chunk or batched <chunk id="N"> blocks)."""
+    batch = BATCH_CHUNK_PATTERN.findall(prompt)
+    if batch:
+        return json.dumps({"chunks": [{"id": int(n), **stub_analysis(chunk)} for n, chunk in batch]})
+    single = SINGLE_CHUNK_PATTERN.search(prompt)
+    return json.dumps(stub_analysis(single.group(1) if single else prompt))
+
+
+def stub_answer(prompt: str) -> str:
+    """Extractive answer: the first sentence of each of the first two excerpts of the answer prompt."""
+    sentences = [excerpt.strip().split(". ")[0].rstrip(".") + "." for excerpt in EXCERPT_PATTERN.findall(prompt)[:2]]
+    return " ".join(sentences) if sentences else NO_INFORMATION_ANSWER
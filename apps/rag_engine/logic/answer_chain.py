@@ -0,0 +1,62 @@
+import logging
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+NO_DOCUMENTS_ANSWER = "Je n'ai trouvé aucun document pertinent dans la base de connaissances."
+
+ANSWER_TEMPLATE = """You are an expert Legal AI Assistant powered by a Graph-RAG system.
+
+        Your goal is to answer the user's question accurately using the provided context.
+        The context contains two parts:
+        1. **Excerpts**: Text passages directly relevant to the question.
+        2. **Graph Insights**: Information about document structure, dates, and related entities (Laws, Persons).
+
+        Guidelines:
+        - Synthesize information from both the text excerpts and the graph insights.
+        - If the Graph Insights provide dates or document types, use them to contextualize your answer.
+        - Cite specific documents (e.g., "According to the Labor Code...").
+        - If the answer is not in the context, say "I don't have enough information."
+
+        Context:
+        {context}
+
+        Question: {question}
+
+        Answer:"""
+
+
+def build_answer_chain():
+    from langchain_core.prompts import ChatPromptTemplate
+    from langchain_core.output_parsers import StrOutputParser
+    from apps.rag_engine.llm.gateway import get_llm
+
+    llm = get_llm("answer")
+    prompt = ChatPromptTemplate.from_template(ANSWER_TEMPLATE)
+    logger.info(f"Answer chain ({llm.provider}: {llm.model_name}) initialized.")
+    return prompt | llm | StrOutputParser()
+
+
+def build_context(docs, question: str = None) -> tuple:
+    if getattr(settings, 'CONTEXT_PACKING_ENABLED', True):
+        from apps.rag_engine.logic.context_builder import ContextBuilder
+        return ContextBuilder().build(docs, question)
+
+    vector_context = "\n\n".join([
+        f"[Document: {d.metadata.get('source', 'Unknown')} | Score: {d.metadata.get('relevance_score', 0):.2f}]\nContent: {d.page_content}"
+        for d in docs
+    ])
+
+    graph_context = ""
+    if docs and "graph_context" in docs[0].metadata:
+        graph_context = docs[0].metadata["graph_context"]
+        logger.info("🕸️ Graph Context injected into prompt.")
+
+    full_context = f"""
+        --- EXCERPTS FROM DOCUMENTS (VECTOR SEARCH) ---
+        {vector_context}
+
+        --- KNOWLEDGE GRAPH INSIGHTS (STRUCTURE & RELATIONS) ---
+        {graph_context}
+        """
+    return full_context, graph_context
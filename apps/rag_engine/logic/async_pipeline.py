@@ -0,0 +1,93 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+from django.conf import settings
+from apps.rag_engine.logic.telemetry import span, submit_in_context
+
+logger = logging.getLogger(__name__)
+
+# CPU-bound / blocking work of the async path (embedding, SQLite BM25, Chroma, cross-encoder).
+# Sized for the cores, not for the number of in-flight questions: those wait on the event loop.
+_EXECUTOR = ThreadPoolExecutor(max_workers=getattr(settings, 'RAG_ASYNC_EXECUTOR_WORKERS', 8), thread_name_prefix="rag-async")
+
+
+async def run_sync(fn, *args, **kwargs):
+    """Awaits `fn(*args, **kwargs)` run in the executor, inside a copy of the caller's telemetry context."""
+    return await asyncio.wrap_future(submit_in_context(_EXECUTOR, fn, *args, **kwargs))
+
+
+class AsyncHybridSearcher:
+    """
+    Event-loop version of HybridSearcher.search_and_rerank (same fusion and reranking code):
+    BM25, vector retrieval and the cross-encoder run in the executor, while the graph retriever and the
+    graph context go through the async Neo4j driver, so a question waiting on I/O holds no thread.
+    """
+
+    def __init__(self, searcher, graph_client):
+        self.searcher = searcher
+        self.graph_client = graph_client
+
+    async def search_and_rerank(self, query: str, initial_k: int = 20, final_k: int = 5, candidate_k: Optional[int] = None,
+                                retrievers: Optional[List[str]] = None, rerank: bool = True, filters=None) -> list:
+        graph_task = None
+        if filters is not None and filters.sources:
+            graph_task = asyncio.ensure_future(self._graph_context(filters.sources, filters))
+
+        ensemble = await run_sync(self.searcher.build_ensemble, initial_k, candidate_k, retrievers, filters)
+        with span("retrieval"):
+            results = await asyncio.gather(*[
+                self._run_retriever(ensemble, name, retriever, query, initial_k, filters)
+                for name, retriever in zip(ensemble.names, ensemble.retrievers)
+            ])
+        candidates = ensemble.fuse(list(results))
+        logger.info(f"Hybrid Phase (async): Found {len(candidates)} candidates.")
+
+        found_sources = list(set([d.metadata.get('source') for d in candidates if d.metadata.get('source')]))
+        graph_context_str = ""
+        if graph_task is not None:
+            graph_context_str = await graph_task
+        elif found_sources:
+            graph_context_str = await self._graph_context(found_sources, filters)
+
+        return await run_sync(self.searcher.rank_candidates, query, candidates, ensemble.names, graph_context_str, final_k, rerank)
+
+    async def _run_retriever(self, ensemble, name, retriever, query, k, filters):
+        # Same latency budget and failure isolation as EnsembleRetriever, without parking a thread on the wait
+        timeout = (ensemble.timeouts or {}).get(name)
+        if name == "graph":
+            work = self._graph_search(query, k, filters)
+        else:
+            work = run_sync(ensemble._run_retriever, name, retriever, query, None)
+        try:
+            return await asyncio.wait_for(work, timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Retriever '{name}' exceeded its {timeout:.3f}s budget, fusing without it.")
+            return []
+
+    async def _graph_call(self, method, *args, **kwargs):
+        # The async driver lives on the server loop; a per-request loop (runserver / WSGI) uses the sync client
+        if self.graph_client.serves_running_loop():
+            return await getattr(self.graph_client, method)(*args, **kwargs)
+        return await run_sync(getattr(self.searcher.graph_client, method), *args, **kwargs)
+
+    async def _graph_search(self, query, k, filters):
+        from apps.rag_engine.logic.hybrid_search import GraphRetriever
+        options = self.searcher.graph_retriever_options()
+        try:
+            with span("graph"):
+                rows = await self._graph_call(
+                    "search_chunks_by_entities", query, k=k, filters=filters, timeout=options.pop("timeout"), **options
+                )
+            return GraphRetriever.to_documents(rows)
+        except Exception as e:
+            logger.error(f"Retriever GraphRetriever failed, ignoring it for this query: {e}")
+            return []
+
+    async def _graph_context(self, sources, filters=None) -> str:
+        try:
+            with span("graph"):
+                return await self._graph_call("get_graph_context", sources, filters)
+        except Exception as e:
+            logger.error(f"Graph context failed, answering without it: {e}")
+            return ""
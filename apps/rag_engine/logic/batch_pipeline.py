@@ -0,0 +1,98 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from django.conf import settings
+from apps.rag_engine.logic.answer_chain import NO_DOCUMENTS_ANSWER, build_context
+from apps.rag_engine.logic.telemetry import span, submit_in_context
+
+logger = logging.getLogger(__name__)
+
+
+class BatchAnswerer:
+    """
+    Answers a list of questions (compliance checklists) with the pipeline's work shared across them, wave by wave
+    (`wave_size` questions): one embedding forward pass, semantic cache lookups with those embeddings,
+    HybridSearcher.search_and_rerank_many, then the LLM generations on a pool of `llm_concurrency` threads.
+    Results are yielded as soon as each is ready (cache hits first), not in input order: each carries its `index`.
+    Generation of a wave overlaps with the retrieval of the next one.
+    """
+
+    def __init__(self, searcher, chain, embeddings, cache, llm_concurrency: int = None, wave_size: int = None):
+        self.searcher = searcher
+        self.chain = chain
+        self.embeddings = embeddings
+        self.cache = cache
+        self.llm_concurrency = llm_concurrency or getattr(settings, 'BATCH_ASK_LLM_CONCURRENCY', 8)
+        self.wave_size = wave_size or getattr(settings, 'BATCH_ASK_WAVE_SIZE', 64)
+
+    def answer(self, questions, filters=None, initial_k: int = 20, final_k: int = 5):
+        scope = filters.scope_key() if filters else ""
+        pool = ThreadPoolExecutor(max_workers=self.llm_concurrency, thread_name_prefix="batch-llm")
+        generations = []
+        try:
+            for start in range(0, len(questions), self.wave_size):
+                wave = list(range(start, min(start + self.wave_size, len(questions))))
+                for result in self._retrieve_wave(questions, wave, filters, scope, initial_k, final_k):
+                    if isinstance(result, dict):
+                        yield result
+                    else:
+                        generations.append(submit_in_context(pool, self._generate, *result))
+                finished = [future for future in generations if future.done()]
+                for future in finished:
+                    generations.remove(future)
+                    yield future.result()
+            for future in as_completed(generations):
+                yield future.result()
+        finally:
+            # Client gone (or done): queued generations are dropped, running ones finish on their own
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _retrieve_wave(self, questions, wave, filters, scope, initial_k, final_k):
+        """Yields ready results (dicts) and the arguments of the generations to run (tuples)."""
+        with span("embed"):
+            vectors = self.embeddings.encode([questions[i] for i in wave])
+
+        pending = []
+        with span("cache_lookup"):
+            for i, vector in zip(wave, vectors):
+                cached, _ = self.cache.lookup(questions[i], scope=scope, embedding=vector)
+                if cached:
+                    yield {"index": i, "question": questions[i], **cached, "cached": True}
+                else:
+                    pending.append((i, vector))
+        if not pending:
+            return
+
+        try:
+            ranked = self.searcher.search_and_rerank_many(
+                [questions[i] for i, _ in pending], initial_k=initial_k, final_k=final_k,
+                filters=filters, query_vectors=[vector for _, vector in pending]
+            )
+        except Exception as e:
+            logger.error(f"Batch retrieval failed for {len(pending)} questions: {e}", exc_info=True)
+            for i, _ in pending:
+                yield {"index": i, "question": questions[i], "error": str(e)}
+            return
+
+        for (i, vector), docs in zip(pending, ranked):
+            if not docs:
+                yield {"index": i, "question": questions[i], "answer": NO_DOCUMENTS_ANSWER, "sources": [], "cached": False}
+                continue
+            with span("prompt"):
+                full_context, graph_context = build_context(docs, questions[i])
+            sources = list(set([d.metadata.get('source', 'Unknown') for d in docs]))
+            yield (i, questions[i], full_context, graph_context, sources, vector, scope)
+
+    def _generate(self, index, question, full_context, graph_context, sources, embedding, scope) -> dict:
+        try:
+            with span("llm"):
+                answer = self.chain.invoke({"context": full_context, "question": question})
+        except Exception as e:
+            logger.error(f"Batch answer {index} failed: {e}")
+            return {"index": index, "question": question, "error": str(e)}
+        payload = {
+            "answer": answer,
+            "sources": sources,
+            "graph_context_used": bool(graph_context)
+        }
+        self.cache.store(question, payload, sources, embedding=embedding, scope=scope)
+        return {"index": index, "question": question, **payload, "cached": False}
@@ -0,0 +1,238 @@
+import logging
+import math
+import re
+from functools import lru_cache
+from django.conf import settings
+from apps.rag_engine.connectors.lexical_store import tokenize
+
+logger = logging.getLogger(__name__)
+
+# Enriched chunks are stored as "Context: <document-level summary>\n\nContent: <raw chunk>"
+CONTENT_MARKER = "Content: "
+SENTENCE_SPLIT_PATTERN = re.compile(r"(?<=[.?!;])\s+|\n{2,}")
+# Below this many tokens left, no passage (header + a sentence) can fit: packing stops
+MIN_PASSAGE_TOKENS = 24
+STOPWORDS = {
+    "the", "a", "an", "and", "or", "of", "to", "in", "on", "for", "by", "with", "is", "are", "be", "as", "at",
+    "that", "this", "it", "from", "which", "what", "how", "le", "la", "les", "de", "des", "du", "et", "un",
+    "une", "en", "dans", "par", "pour", "sur", "est", "sont", "au", "aux", "qui", "que", "quel", "quelle",
+    "quels", "quelles", "comment",
+}
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        logger.info("tiktoken unavailable: context token counts are estimated (4 characters per token).")
+        return None
+
+
+def count_tokens(text: str) -> int:
+    encoding = _encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return math.ceil(len(text) / 4)
+
+
+def split_chunk(text: str) -> tuple:
+    """-> (enrichment summary, raw chunk content)."""
+    if text.startswith("Context: ") and CONTENT_MARKER in text:
+        summary, content = text.split(CONTENT_MARKER, 1)
+        return summary[len("Context: "):].strip(), content.strip()
+    return "", text.strip()
+
+
+def split_sentences(text: str) -> list:
+    return [s.strip() for s in SENTENCE_SPLIT_PATTERN.split(text) if s and s.strip()]
+
+
+def _stems(text: str) -> set:
+    # Crude prefix stemming: "obligation" / "obligations" / "obligatoire" share "obliga"
+    return {token[:6] for token in tokenize(text) if len(token) > 2 and token not in STOPWORDS}
+
+
+class ContextBuilder:
+    """
+    Packs reranked chunks into the LLM prompt under a token budget:
+    - adjacent chunks of the same document (chunk_index n, n+1) are merged into one passage,
+    - the enrichment summary prefix is dropped (it serves retrieval, not answering),
+    - sentences repeated across passages (overlapping chunks, boilerplate) are kept once,
+    - with a question, only the sentences sharing terms with it (plus `sentence_window` neighbours) are kept,
+    - passages are added best-first until `max_tokens`; the graph insights get their own smaller budget.
+    """
+
+    def __init__(self, max_tokens=None, graph_max_tokens=None, sentence_window=None, redundancy_threshold=None,
+                 include_summary=None):
+        self.max_tokens = max_tokens or getattr(settings, 'CONTEXT_MAX_TOKENS', 2000)
+        self.graph_max_tokens = graph_max_tokens or getattr(settings, 'CONTEXT_GRAPH_MAX_TOKENS', 200)
+        self.sentence_window = sentence_window if sentence_window is not None else getattr(settings, 'CONTEXT_SENTENCE_WINDOW', 1)
+        self.redundancy_threshold = redundancy_threshold or getattr(settings, 'CONTEXT_REDUNDANCY_THRESHOLD', 0.8)
+        self.include_summary = include_summary if include_summary is not None else getattr(settings, 'CONTEXT_INCLUDE_CHUNK_SUMMARY', False)
+
+    def build(self, docs, question: str = None) -> tuple:
+        """-> (prompt context, graph context)."""
+        graph_context = ""
+        if docs and "graph_context" in docs[0].metadata:
+            graph_context = self._truncate(docs[0].metadata["graph_context"], self.graph_max_tokens)
+            logger.info("🕸️ Graph Context injected into prompt.")
+
+        passages = self.merge_adjacent(docs)
+        self.drop_redundant(passages)
+        if question:
+            self.select_relevant(passages, _stems(question))
+        excerpts = self.pack(passages, self.max_tokens - count_tokens(graph_context))
+
+        original_tokens = sum(count_tokens(d.page_content) for d in docs)
+        packed_tokens = count_tokens(excerpts)
+        logger.info(f"Context packed: {len(docs)} chunks -> {len(passages)} passages, "
+                    f"{original_tokens} -> {packed_tokens} tokens (budget {self.max_tokens}).")
+
+        full_context = f"""
+        --- EXCERPTS FROM DOCUMENTS (VECTOR SEARCH) ---
+        {excerpts}
+
+        --- KNOWLEDGE GRAPH INSIGHTS (STRUCTURE & RELATIONS) ---
+        {graph_context}
+        """
+        return full_context, graph_context
+
+    def merge_adjacent(self, docs) -> list:
+        """Groups consecutive chunks of a document into passages, ordered by their best relevance."""
+        by_source = {}
+        for position, doc in enumerate(docs):
+            summary, content = split_chunk(doc.page_content)
+            by_source.setdefault(doc.metadata.get("source", "Unknown"), []).append({
+                "index": doc.metadata.get("chunk_index"),
+                "position": position,
+                "score": doc.metadata.get("relevance_score", doc.metadata.get("fusion_score", 0.0)) or 0.0,
+                "summary": summary,
+                "content": content,
+                "page_start": doc.metadata.get("page_start"),
+                "page_end": doc.metadata.get("page_end"),
+            })
+
+        passages = []
+        for source, chunks in by_source.items():
+            chunks.sort(key=lambda c: (c["index"] is None, c["index"] if c["index"] is not None else c["position"]))
+            current = None
+            for chunk in chunks:
+                adjacent = (current is not None and chunk["index"] is not None and current["last_index"] is not None
+                            and chunk["index"] == current["last_index"] + 1)
+                if adjacent:
+                    current["sentences"].extend(split_sentences(chunk["content"]))
+                    current["last_index"] = chunk["index"]
+                    current["score"] = max(current["score"], chunk["score"])
+                    current["position"] = min(current["position"], chunk["position"])
+                    current["page_end"] = chunk["page_end"] if chunk["page_end"] is not None else current["page_end"]
+                    continue
+                current = {
+                    "source": source,
+                    "first_index": chunk["index"],
+                    "last_index": chunk["index"],
+                    "score": chunk["score"],
+                    "position": chunk["position"],
+                    "summary": chunk["summary"],
+                    "sentences": split_sentences(chunk["content"]),
+                    "page_start": chunk["page_start"],
+                    "page_end": chunk["page_end"],
+                }
+                passages.append(current)
+        # Reranker order first; position breaks ties (and orders unscored candidates)
+        passages.sort(key=lambda p: (-p["score"], p["position"]))
+        for passage in passages:
+            passage["keep"] = [True] * len(passage["sentences"])
+        return passages
+
+    def drop_redundant(self, passages):
+        """Keeps the first occurrence (in passage order) of sentences that are (near-)duplicates of one another."""
+        seen = []
+        for passage in passages:
+            for i, sentence in enumerate(passage["sentences"]):
+                tokens = set(tokenize(sentence))
+                if not tokens:
+                    passage["keep"][i] = False
+                    continue
+                if any(len(tokens & other) / len(tokens | other) >= self.redundancy_threshold for other in seen):
+                    passage["keep"][i] = False
+                else:
+                    seen.append(tokens)
+
+    def select_relevant(self, passages, question_stems: set):
+        """Within each passage, keeps sentences sharing a term with the question plus their neighbours."""
+        if not question_stems:
+            return
+        for passage in passages:
+            matches = [
+                i for i, sentence in enumerate(passage["sentences"])
+                if passage["keep"][i] and _stems(sentence) & question_stems
+            ]
+            if not matches:
+                # Semantic match the lexical test can't see: the reranker vouched for it, keep it whole
+                continue
+            window = set()
+            for i in matches:
+                window.update(range(i - self.sentence_window, i + self.sentence_window + 1))
+            passage["keep"] = [keep and i in window for i, keep in enumerate(passage["keep"])]
+            passage["relevance"] = {i: len(_stems(passage["sentences"][i]) & question_stems) for i in matches}
+
+    def pack(self, passages, budget: int) -> str:
+        # A passage that does not fit is skipped, not the end of packing: smaller lower-ranked ones may still fit
+        blocks = []
+        for passage in passages:
+            if budget < MIN_PASSAGE_TOKENS:
+                break
+            header = self._header(passage)
+            kept = [i for i, keep in enumerate(passage["keep"]) if keep]
+            if not kept:
+                continue
+            cost = count_tokens(header) + 4
+            if budget - cost <= 0:
+                continue
+            lines = []
+            if self.include_summary and passage["summary"]:
+                lines.append(f"Summary: {passage['summary']}")
+            body = " ".join(passage["sentences"][i] for i in kept)
+            body_tokens = count_tokens(body) + sum(count_tokens(line) for line in lines)
+            if cost + body_tokens > budget:
+                # Partial passage: best sentences first, printed back in document order
+                relevance = passage.get("relevance", {})
+                ranked = sorted(kept, key=lambda i: (-relevance.get(i, 0), i))
+                chosen, remaining = [], budget - cost - sum(count_tokens(line) for line in lines)
+                for i in ranked:
+                    sentence_tokens = count_tokens(passage["sentences"][i]) + 1
+                    if sentence_tokens <= remaining:
+                        chosen.append(i)
+                        remaining -= sentence_tokens
+                if not chosen:
+                    continue
+                body = " ".join(passage["sentences"][i] for i in sorted(chosen))
+                body_tokens = budget - cost - remaining
+            lines.append(f"Content: {body}")
+            blocks.append(header + "\n" + "\n".join(lines))
+            budget -= cost + body_tokens
+        return "\n\n".join(blocks)
+
+    @staticmethod
+    def _header(passage) -> str:
+        parts = [f"Document: {passage['source']}"]
+        if passage["page_start"] is not None:
+            pages = passage["page_start"] if passage["page_end"] in (None, passage["page_start"]) else f"{passage['page_start']}-{passage['page_end']}"
+            parts.append(f"p. {pages}")
+        parts.append(f"Score: {passage['score']:.2f}")
+        return "[" + " | ".join(parts) + "]"
+
+    @staticmethod
+    def _truncate(text: str, max_tokens: int) -> str:
+        if count_tokens(text) <= max_tokens:
+            return text
+        lines, used = [], 0
+        for line in text.splitlines():
+            line_tokens = count_tokens(line) + 1
+            if used + line_tokens > max_tokens:
+                break
+            lines.append(line)
+            used += line_tokens
+        return "\n".join(lines)
@@ -0,0 +1,134 @@
+import hashlib
+import json
+from datetime import datetime, time as dt_time, timezone as dt_timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from apps.rag_engine.connectors.graph_store import clean_label
+
+ENTITY_FLAG_PREFIX = "entity_"
+
+
+def entity_flag(entity_type: str) -> str:
+    # Chunk metadata key marking "this chunk mentions an entity of this type" (Chroma metadata can't hold lists)
+    return f"{ENTITY_FLAG_PREFIX}{clean_label(entity_type)}"
+
+
+def _parse_timestamp(value, end_of_day=False):
+    if value in (None, ""):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    parsed = parse_datetime(str(value))
+    if parsed is None:
+        day = parse_date(str(value))
+        if day is None:
+            raise ValueError(f"Invalid date: {value!r} (expected ISO 8601, e.g. 2024-01-31)")
+        parsed = datetime.combine(day, dt_time.max if end_of_day else dt_time.min)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=dt_timezone.utc)
+    return parsed.timestamp()
+
+
+def _string_list(value, name):
+    if value in (None, ""):
+        return []
+    if isinstance(value, str):
+        value = [value]
+    if not isinstance(value, (list, tuple)) or not all(isinstance(v, str) and v for v in value):
+        raise ValueError(f"'{name}' must be a string or a list of strings")
+    return sorted(set(value))
+
+
+class SearchFilters:
+    """
+    Retrieval scope: source documents, upload date range, entity types mentioned by the chunk and document type.
+    Rendered as a Chroma `where` clause, a SQL predicate on the BM25 documents table and Cypher parameters,
+    so each index only touches the matching slice.
+    """
+
+    def __init__(self, sources=None, uploaded_after=None, uploaded_before=None, entity_types=None, doc_types=None):
+        self.sources = _string_list(sources, "sources")
+        self.uploaded_after = _parse_timestamp(uploaded_after)
+        self.uploaded_before = _parse_timestamp(uploaded_before, end_of_day=True)
+        self.entity_types = sorted({clean_label(t) for t in _string_list(entity_types, "entity_types")})
+        self.doc_types = _string_list(doc_types, "doc_types")
+
+    @classmethod
+    def from_dict(cls, data):
+        """Parses the `filters` object of an API request. Raises ValueError on malformed input."""
+        if not data:
+            return None
+        if not isinstance(data, dict):
+            raise ValueError("'filters' must be an object")
+        unknown = set(data) - {"sources", "uploaded_after", "uploaded_before", "entity_types", "doc_types"}
+        if unknown:
+            raise ValueError(f"Unknown filters: {', '.join(sorted(unknown))}")
+        filters = cls(**data)
+        return None if filters.is_empty() else filters
+
+    def is_empty(self) -> bool:
+        return not (self.sources or self.uploaded_after is not None or self.uploaded_before is not None
+                    or self.entity_types or self.doc_types)
+
+    def as_dict(self) -> dict:
+        return {
+            "sources": self.sources,
+            "uploaded_after": self.uploaded_after,
+            "uploaded_before": self.uploaded_before,
+            "entity_types": self.entity_types,
+            "doc_types": self.doc_types,
+        }
+
+    def scope_key(self) -> str:
+        return hashlib.sha1(json.dumps(self.as_dict(), sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+    def has_indexed_predicate(self) -> bool:
+        # Predicates backed by a column index in the BM25 store (entity flags are not)
+        return bool(self.sources or self.doc_types or self.uploaded_after is not None or self.uploaded_before is not None)
+
+    def chroma_where(self):
+        conditions = []
+        if self.sources:
+            conditions.append({"source": {"$in": self.sources}})
+        if self.uploaded_after is not None:
+            conditions.append({"uploaded_at": {"$gte": self.uploaded_after}})
+        if self.uploaded_before is not None:
+            conditions.append({"uploaded_at": {"$lte": self.uploaded_before}})
+        if self.doc_types:
+            conditions.append({"doc_type": {"$in": self.doc_types}})
+        if self.entity_types:
+            flags = [{entity_flag(t): True} for t in self.entity_types]
+            conditions.append(flags[0] if len(flags) == 1 else {"$or": flags})
+        if not conditions:
+            return None
+        return conditions[0] if len(conditions) == 1 else {"$and": conditions}
+
+    def sql_where(self, alias: str = "d"):
+        """-> (predicate, params) over the BM25 documents table."""
+        clauses, params = [], []
+        if self.sources:
+            clauses.append(f"{alias}.source IN ({','.join('?' * len(self.sources))})")
+            params.extend(self.sources)
+        if self.uploaded_after is not None:
+            clauses.append(f"{alias}.uploaded_at >= ?")
+            params.append(self.uploaded_after)
+        if self.uploaded_before is not None:
+            clauses.append(f"{alias}.uploaded_at <= ?")
+            params.append(self.uploaded_before)
+        if self.doc_types:
+            clauses.append(f"{alias}.doc_type IN ({','.join('?' * len(self.doc_types))})")
+            params.extend(self.doc_types)
+        if self.entity_types:
+            flags = [f"json_extract({alias}.metadata, ?) = 1" for _ in self.entity_types]
+            clauses.append("(" + " OR ".join(flags) + ")")
+            params.extend(f"$.{entity_flag(t)}" for t in self.entity_types)
+        return " AND ".join(clauses) or "1", params
+
+    def cypher_params(self) -> dict:
+        # Consumed by GraphStoreClient.DOCUMENT_SCOPE / CHUNK_SCOPE: null parameters disable their predicate
+        return {
+            "scope_sources": self.sources or None,
+            "scope_after": self.uploaded_after,
+            "scope_before": self.uploaded_before,
+            "scope_doc_types": self.doc_types or None,
+            "scope_entity_types": self.entity_types or None,
+        }
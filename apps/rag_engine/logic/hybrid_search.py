@@ -1,85 +1,338 @@
-from typing import List, Optional
-import torch
+from typing import Any, Dict, List, Optional
 import logging
-from langchain_community.retrievers import BM25Retriever
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from django.conf import settings
 from langchain_core.retrievers import BaseRetriever
 from langchain_core.documents import Document
 from langchain_core.callbacks import CallbackManagerForRetrieverRun
-from sentence_transformers import CrossEncoder
 from apps.rag_engine.connectors.vector_store import VectorStoreClient
 from apps.rag_engine.connectors.graph_store import GraphStoreClient
+from apps.rag_engine.connectors.lexical_store import LexicalStoreClient
+from apps.rag_engine.logic.reranker import RerankerService, fusion_is_confident
+from apps.rag_engine.logic.telemetry import span, submit_in_context
 
 logger = logging.getLogger(__name__)
 
+class BM25IndexRetriever(BaseRetriever):
+    index: Any
+    k: int = 20
+    filters: Any = None
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun = None) -> List[Document]:
+        hits = self.index.search(query, k=self.k, filters=self.filters)
+        stored = self.index.get_documents([doc_id for doc_id, _ in hits])
+        docs = []
+        for doc_id, score in hits:
+            if doc_id not in stored:
+                continue
+            text, metadata = stored[doc_id]
+            docs.append(Document(page_content=text, metadata={**metadata, "id": doc_id, "bm25_score": score}))
+        return docs
+
+class QuantizedVectorRetriever(BaseRetriever):
+    """Vector retrieval for VECTOR_STORAGE="quantized" (see VectorStoreClient.quantized_search)."""
+    client: Any
+    k: int = 20
+    where: Optional[Dict[str, Any]] = None
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun = None) -> List[Document]:
+        return [
+            Document(page_content=text, metadata={**metadata, "id": doc_id, "vector_score": score})
+            for doc_id, score, text, metadata in self.client.quantized_search(query, k=self.k, where=self.where)
+        ]
+
+class GraphRetriever(BaseRetriever):
+    """Chunks reached from the question's entities through the knowledge graph (see GraphStoreClient.search_chunks_by_entities)."""
+    graph: Any
+    k: int = 20
+    filters: Any = None
+    timeout: Optional[float] = None
+    options: Dict[str, Any] = {}
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun = None) -> List[Document]:
+        rows = self.graph.search_chunks_by_entities(query, k=self.k, filters=self.filters, timeout=self.timeout, **self.options)
+        return self.to_documents(rows)
+
+    @staticmethod
+    def to_documents(rows) -> List[Document]:
+        return [
+            Document(page_content=row["text"], metadata={
+                "id": row["id"],
+                "source": row["source"],
+                "chunk_index": row["chunk_index"],
+                "page_start": row["page_start"],
+                "page_end": row["page_end"],
+                "graph_score": row["score"],
+                "graph_hop": row["hop"],
+            })
+            for row in rows if row.get("text")
+        ]
+
+_RETRIEVER_POOL = ThreadPoolExecutor(max_workers=8, thread_name_prefix="retriever")
+
 class EnsembleRetriever(BaseRetriever):
+    """
+    Weighted Reciprocal Rank Fusion over retrievers queried concurrently:
+    score(d) = sum_i weights[i] / (c + rank_i(d)). Only the best `top_k` fused candidates are returned.
+    """
     retrievers: List[BaseRetriever]
     weights: List[float]
+    c: int = 60
+    top_k: Optional[int] = None
+    names: Optional[List[str]] = None
+    timeouts: Optional[Dict[str, float]] = None
+
+    def _run_retriever(self, name, retriever, query, run_manager):
+        try:
+            with span(name):
+                if run_manager:
+                    return retriever.invoke(query, config={"callbacks": run_manager.get_child()})
+                return retriever.invoke(query)
+        except Exception as e:
+            logger.error(f"Retriever {type(retriever).__name__} failed, ignoring it for this query: {e}")
+            return []
 
     def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun = None) -> List[Document]:
-        all_docs_list = []
-        for retriever in self.retrievers:
-            if run_manager:
-                docs = retriever.invoke(query, config={"callbacks": run_manager.get_child()})
-            else:
-                docs = retriever.invoke(query)
-            all_docs_list.append(docs)
+        names = self.names or [type(r).__name__ for r in self.retrievers]
+        futures = [
+            submit_in_context(_RETRIEVER_POOL, self._run_retriever, name, retriever, query, run_manager)
+            for name, retriever in zip(names, self.retrievers)
+        ]
+        all_docs_list = [self._collect(name, future) for name, future in zip(names, futures)]
+        return self.fuse(all_docs_list)
+
+    def _collect(self, name, future):
+        # A retriever over its latency budget is left out of this query's fusion instead of delaying it
+        timeout = (self.timeouts or {}).get(name)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            logger.warning(f"Retriever '{name}' exceeded its {timeout:.3f}s budget, fusing without it.")
+            return []
 
+    def fuse(self, all_docs_list: List[List[Document]]) -> List[Document]:
+        names = self.names or [type(r).__name__ for r in self.retrievers]
+        fused_scores = {}
         unique_docs = {}
-        for docs in all_docs_list:
-            for doc in docs:
-                if doc.page_content not in unique_docs:
-                    unique_docs[doc.page_content] = doc
-        
-        return list(unique_docs.values())
+        ranks = {}
+        for name, weight, docs in zip(names, self.weights, all_docs_list):
+            for rank, doc in enumerate(docs, start=1):
+                key = doc.page_content
+                if key not in unique_docs:
+                    unique_docs[key] = doc
+                fused_scores[key] = fused_scores.get(key, 0.0) + weight / (self.c + rank)
+                ranks.setdefault(key, {}).setdefault(name, rank)
+
+        ranked_keys = sorted(fused_scores, key=fused_scores.get, reverse=True)
+        if self.top_k is not None:
+            ranked_keys = ranked_keys[:self.top_k]
+
+        fused = []
+        for key in ranked_keys:
+            doc = unique_docs[key]
+            if not doc.metadata.get("id") and getattr(doc, "id", None):
+                doc.metadata["id"] = doc.id
+            doc.metadata["fusion_score"] = fused_scores[key]
+            doc.metadata["retriever_ranks"] = ranks[key]
+            fused.append(doc)
+        return fused
 
 class HybridSearcher:
-    def __init__(self):
+    def __init__(self, reranker=None, graph_client=None):
         self.vector_connector = VectorStoreClient()
         self.chroma_db = self.vector_connector.db
-        self.graph_client = GraphStoreClient()
-        logger.info(" Loading Cross-Encoder model on GPU...")
-        device = "cuda" if torch.cuda.is_available() else "cpu"
-        self.reranker = CrossEncoder(
-            'cross-encoder/ms-marco-MiniLM-L-6-v2',
-            device=device
-        )
+        self.graph_client = graph_client if graph_client is not None else GraphStoreClient()
+        self.lexical_client = LexicalStoreClient()
+        self.reranker = reranker if reranker is not None else RerankerService()
 
-        if device == "cuda" and torch.cuda.is_bf16_supported():
-            self.reranker.model.to(dtype=torch.bfloat16)
-            logger.info(f"Cross-Encoder running on {torch.cuda.get_device_name(0)} (Mode: Bfloat16 ).")
-        else:
-            logger.info(f"Cross-Encoder running on {device} (Mode: Standard).")
-                
+    @staticmethod
+    def graph_retriever_options() -> dict:
+        return {
+            "timeout": getattr(settings, 'GRAPH_RETRIEVER_TIMEOUT_MS', 300) / 1000,
+            "entity_limit": getattr(settings, 'GRAPH_RETRIEVER_ENTITY_LIMIT', 20),
+            "seed_limit": getattr(settings, 'GRAPH_RETRIEVER_SEED_LIMIT', 20),
+            "max_entity_degree": getattr(settings, 'GRAPH_RETRIEVER_MAX_ENTITY_DEGREE', 50),
+            "shared_weight": getattr(settings, 'GRAPH_RETRIEVER_SHARED_WEIGHT', 0.5),
+            "adjacent_weight": getattr(settings, 'GRAPH_RETRIEVER_ADJACENT_WEIGHT', 0.3),
+        }
 
-    def search_and_rerank(self, query: str, initial_k: int = 20, final_k: int = 5) -> List[Document]:
-        vector_retriever = self.chroma_db.as_retriever(search_kwargs={"k": initial_k})
-        collection_data = self.chroma_db.get()
-        all_texts = collection_data['documents']
-        if not all_texts:
-            logger.warning("Database is empty.")
-            return []
+    def build_retrievers(self, initial_k: int, filters=None):
+        vector_kwargs = {"k": initial_k}
+        where = filters.chroma_where() if filters is not None else None
+        if where:
+            vector_kwargs["filter"] = where
+        graph_options = self.graph_retriever_options()
+        if self.vector_connector.quantized is not None:
+            vector = QuantizedVectorRetriever(client=self.vector_connector, k=initial_k, where=where or None)
+        else:
+            vector = self.chroma_db.as_retriever(search_kwargs=vector_kwargs)
+        return {
+            "bm25": BM25IndexRetriever(index=self.lexical_client, k=initial_k, filters=filters),
+            "vector": vector,
+            "graph": GraphRetriever(graph=self.graph_client, k=initial_k, filters=filters,
+                                    timeout=graph_options.pop("timeout"), options=graph_options),
+        }
 
-        bm25_retriever = BM25Retriever.from_texts(all_texts)
-        bm25_retriever.k = initial_k
-        ensemble = EnsembleRetriever(
-            retrievers=[bm25_retriever, vector_retriever],
-            weights=[0.5, 0.5]
+    def build_ensemble(self, initial_k: int = 20, candidate_k: Optional[int] = None,
+                       retrievers: Optional[List[str]] = None, filters=None) -> EnsembleRetriever:
+        if not self.lexical_client.count():
+            logger.warning("BM25 index is empty. Run `manage.py build_bm25_index` if the vector store is populated.")
+        available = self.build_retrievers(initial_k, filters)
+        names = [name for name in (retrievers or getattr(settings, 'HYBRID_RETRIEVERS', ["bm25", "vector"])) if name in available]
+        weights = getattr(settings, 'HYBRID_RETRIEVER_WEIGHTS', {"bm25": 0.5, "vector": 0.5})
+        return EnsembleRetriever(
+            retrievers=[available[name] for name in names],
+            weights=[weights.get(name, 0.5) for name in names],
+            names=names,
+            timeouts={name: ms / 1000 for name, ms in getattr(settings, 'HYBRID_RETRIEVER_TIMEOUTS_MS', {}).items()},
+            c=getattr(settings, 'HYBRID_RRF_K', 60),
+            top_k=candidate_k or getattr(settings, 'HYBRID_CANDIDATE_K', initial_k)
         )
-        
-        candidates = ensemble.invoke(query)
+
+    def search_and_rerank(self, query: str, initial_k: int = 20, final_k: int = 5, candidate_k: Optional[int] = None,
+                          retrievers: Optional[List[str]] = None, rerank: bool = True, filters=None) -> List[Document]:
+        # Scoped to explicit sources: the graph context doesn't depend on the candidates, fetch it alongside retrieval
+        graph_future = None
+        if filters is not None and filters.sources:
+            graph_future = submit_in_context(_RETRIEVER_POOL, self._graph_context, filters.sources, filters)
+
+        ensemble = self.build_ensemble(initial_k, candidate_k, retrievers, filters)
+        with span("retrieval"):
+            candidates = ensemble.invoke(query)
         logger.info(f"Hybrid Phase: Found {len(candidates)} candidates.")
         found_sources = list(set([d.metadata.get('source') for d in candidates if d.metadata.get('source')]))
         graph_context_str = ""
-        if found_sources:
-            graph_context_str = self.graph_client.get_graph_context(found_sources)
-            if graph_context_str:
-                logger.info(f"Graph Phase: Retrieved context for {len(found_sources)} documents.")
-            
-        if not candidates or not self.reranker:
+        if graph_future is not None:
+            graph_context_str = graph_future.result()
+        elif found_sources:
+            graph_context_str = self._graph_context(found_sources, filters)
+        if graph_context_str:
+            logger.info(f"Graph Phase: Retrieved context for {len(found_sources)} documents.")
+
+        return self.rank_candidates(query, candidates, ensemble.names, graph_context_str, final_k, rerank)
+
+    def search_and_rerank_many(self, queries: List[str], initial_k: int = 20, final_k: int = 5, candidate_k: Optional[int] = None,
+                               retrievers: Optional[List[str]] = None, rerank: bool = True, filters=None,
+                               query_vectors=None) -> List[List[Document]]:
+        """
+        search_and_rerank for a batch of questions (same fusion and reranking), with the work shared across them:
+        BM25 reads each term's postings once, the vector lookups are one Chroma query over the batch's embeddings,
+        graph contexts are fetched once per distinct set of sources and every (question, candidate) pair goes to the
+        cross-encoder in full-size batches. Graph retrieval stays per question, on the retriever pool.
+        """
+        ensemble = self.build_ensemble(initial_k, candidate_k, retrievers, filters)
+        names = ensemble.names
+        by_name = dict(zip(names, ensemble.retrievers))
+
+        # Per-question retrievers start first and run while the batched ones work (no per-query latency budget
+        # here: a batch is about throughput, and Neo4j already enforces GRAPH_RETRIEVER_TIMEOUT_MS per query)
+        pending = {
+            name: [submit_in_context(_RETRIEVER_POOL, ensemble._run_retriever, name, by_name[name], query, None) for query in queries]
+            for name in names if name not in ("bm25", "vector")
+        }
+        results = {}
+        with span("retrieval"):
+            if "bm25" in by_name:
+                results["bm25"] = self._batch_bm25(queries, initial_k, filters)
+            if "vector" in by_name:
+                results["vector"] = self._batch_vector(queries, initial_k, filters, query_vectors)
+            for name, futures in pending.items():
+                results[name] = [future.result() for future in futures]
+        candidates = [ensemble.fuse([results[name][i] for name in names]) for i in range(len(queries))]
+        logger.info(f"Hybrid Phase (batch): {sum(len(c) for c in candidates)} candidates for {len(queries)} questions.")
+
+        graph_contexts = self._batch_graph_context(candidates, filters)
+
+        scores = {}
+        to_score = [i for i, docs in enumerate(candidates)
+                    if docs and self.reranker and rerank and not self.skips_rerank(docs, names, final_k)]
+        if to_score:
+            with span("rerank"):
+                items = [(queries[i], candidates[i]) for i in to_score]
+                if hasattr(self.reranker, "score_many"):
+                    batch_scores = self.reranker.score_many(items)
+                else:
+                    flat = self.reranker.predict([[query, doc.page_content] for query, docs in items for doc in docs])
+                    batch_scores, offset = [], 0
+                    for _, docs in items:
+                        batch_scores.append(list(flat[offset:offset + len(docs)]))
+                        offset += len(docs)
+                scores = dict(zip(to_score, batch_scores))
+
+        return [
+            self.rank_candidates(query, candidates[i], names, graph_contexts[i], final_k, rerank, scores=scores.get(i))
+            for i, query in enumerate(queries)
+        ]
+
+    def _batch_bm25(self, queries, k, filters) -> List[List[Document]]:
+        try:
+            with span("bm25"):
+                hits = self.lexical_client.search_many(queries, k=k, filters=filters)
+                stored = self.lexical_client.get_documents(list({doc_id for per_query in hits for doc_id, _ in per_query}))
+        except Exception as e:
+            logger.error(f"Batch BM25 failed, ignoring it for this batch: {e}")
+            return [[] for _ in queries]
+        return [
+            [Document(page_content=stored[doc_id][0], metadata={**stored[doc_id][1], "id": doc_id, "bm25_score": score})
+             for doc_id, score in per_query if doc_id in stored]
+            for per_query in hits
+        ]
+
+    def _batch_vector(self, queries, k, filters, query_vectors=None) -> List[List[Document]]:
+        where = filters.chroma_where() if filters is not None else None
+        try:
+            if query_vectors is None:
+                with span("embed"):
+                    query_vectors = self.vector_connector.embedding_fn.encode(queries)
+            with span("vector"):
+                rows = self.vector_connector.search_many(query_vectors, k=k, where=where)
+        except Exception as e:
+            logger.error(f"Batch vector search failed, ignoring it for this batch: {e}")
+            return [[] for _ in queries]
+        return [
+            [Document(page_content=text, metadata={**(metadata or {}), "id": doc_id, "vector_score": score})
+             for doc_id, score, text, metadata in per_query]
+            for per_query in rows
+        ]
+
+    def _batch_graph_context(self, candidates, filters=None) -> List[str]:
+        if filters is not None and filters.sources:
+            keys = [tuple(sorted(filters.sources))] * len(candidates)
+        else:
+            keys = [tuple(sorted({d.metadata.get('source') for d in docs if d.metadata.get('source')})) for docs in candidates]
+        futures = {
+            key: submit_in_context(_RETRIEVER_POOL, self._graph_context, list(key), filters)
+            for key in set(keys) if key
+        }
+        contexts = {key: future.result() for key, future in futures.items()}
+        return [contexts.get(key, "") for key in keys]
+
+    def skips_rerank(self, candidates: List[Document], names: List[str], final_k: int) -> bool:
+        return getattr(settings, 'RERANKER_EARLY_EXIT', False) and fusion_is_confident(
+            candidates, names, final_k, getattr(settings, 'RERANKER_EARLY_EXIT_AGREEMENT', 1.0))
+
+    def rank_candidates(self, query: str, candidates: List[Document], names: List[str], graph_context_str: str = "",
+                        final_k: int = 5, rerank: bool = True, scores: Optional[List[float]] = None) -> List[Document]:
+        """Cross-encoder stage: orders the fused candidates and attaches the graph context to the best one."""
+        if not candidates or not self.reranker or not rerank:
             return candidates[:final_k]
 
-        pairs = [[query, doc.page_content] for doc in candidates]
-        scores = self.reranker.predict(pairs)
+        if self.skips_rerank(candidates, names, final_k):
+            logger.info("Rerank skipped: all retrievers agree on the fused top results.")
+            top_docs = candidates[:final_k]
+            for i, doc in enumerate(top_docs):
+                doc.metadata["relevance_score"] = doc.metadata["fusion_score"]
+                doc.metadata["rank"] = i + 1
+            if top_docs and graph_context_str:
+                top_docs[0].metadata["graph_context"] = graph_context_str
+            return top_docs
+
+        if scores is None:
+            with span("rerank"):
+                if hasattr(self.reranker, "score"):
+                    scores = self.reranker.score(query, candidates)
+                else:
+                    scores = self.reranker.predict([[query, doc.page_content] for doc in candidates])
         doc_scores = list(zip(candidates, scores))
         doc_scores.sort(key=lambda x: x[1], reverse=True)
 
@@ -93,4 +346,12 @@ class HybridSearcher:
             top_docs.append(doc)
             logger.info(f"Rank {i+1} | Score: {score:.4f} | Src: {doc.metadata.get('source', 'Unknown')}")
 
-        return top_docs
\ No newline at end of file
+        return top_docs
+
+    def _graph_context(self, sources, filters=None) -> str:
+        try:
+            with span("graph"):
+                return self.graph_client.get_graph_context(sources, filters)
+        except Exception as e:
+            logger.error(f"Graph context failed, answering without it: {e}")
+            return ""
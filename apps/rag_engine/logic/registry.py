@@ -0,0 +1,135 @@
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def _build_vector_store(registry):
+    from apps.rag_engine.connectors.vector_store import VectorStoreClient
+    return VectorStoreClient()
+
+
+def _build_embeddings(registry):
+    from apps.rag_engine.connectors.embeddings import EmbeddingService
+    return EmbeddingService()
+
+
+def _build_lexical_index(registry):
+    from apps.rag_engine.connectors.lexical_store import LexicalStoreClient
+    return LexicalStoreClient()
+
+
+def _build_graph_store(registry):
+    from apps.rag_engine.connectors.graph_store import GraphStoreClient
+    return GraphStoreClient()
+
+
+def _build_reranker(registry):
+    from apps.rag_engine.logic.reranker import RerankerService
+    return RerankerService()
+
+
+def _build_answer_chain(registry):
+    from apps.rag_engine.logic.answer_chain import build_answer_chain
+    return build_answer_chain()
+
+
+def _build_searcher(registry):
+    from apps.rag_engine.logic.hybrid_search import HybridSearcher
+    for name in ("vector_store", "lexical_index", "graph_store"):
+        registry.get(name)
+    return HybridSearcher(reranker=registry.get("reranker"))
+
+
+def _build_async_graph_store(registry):
+    from apps.rag_engine.connectors.graph_store import AsyncGraphStoreClient
+    return AsyncGraphStoreClient()
+
+
+def _build_async_searcher(registry):
+    from apps.rag_engine.logic.async_pipeline import AsyncHybridSearcher
+    return AsyncHybridSearcher(registry.get("searcher"), registry.get("async_graph_store"))
+
+
+class ModelRegistry:
+    """
+    Process-wide pool of the heavy RAG components (models, clients, chains).
+    Each component is built once, under its own lock, and then shared by every request thread.
+    """
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    BUILDERS = {
+        "vector_store": _build_vector_store,
+        "embeddings": _build_embeddings,
+        "lexical_index": _build_lexical_index,
+        "graph_store": _build_graph_store,
+        "reranker": _build_reranker,
+        "answer_chain": _build_answer_chain,
+        "searcher": _build_searcher,
+        "async_graph_store": _build_async_graph_store,
+        "async_searcher": _build_async_searcher,
+    }
+
+    def __new__(cls):
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = super(ModelRegistry, cls).__new__(cls)
+                cls._instance.components = {}
+                cls._instance.load_times = {}
+                cls._instance.errors = {}
+                cls._instance.warmed_up = False
+                cls._instance.locks = {name: threading.Lock() for name in cls.BUILDERS}
+        return cls._instance
+
+    def get(self, name: str):
+        if name in self.components:
+            return self.components[name]
+        if name not in self.BUILDERS:
+            raise KeyError(f"Unknown RAG component: {name}")
+
+        with self.locks[name]:
+            if name not in self.components:
+                start = time.perf_counter()
+                try:
+                    self.components[name] = self.BUILDERS[name](self)
+                except Exception as e:
+                    self.errors[name] = str(e)
+                    raise
+                self.load_times[name] = time.perf_counter() - start
+                self.errors.pop(name, None)
+                logger.info(f"Registry: '{name}' ready in {self.load_times[name]:.2f}s.")
+        return self.components[name]
+
+    def initialize(self, warmup: bool = False):
+        for name in self.BUILDERS:
+            try:
+                self.get(name)
+            except Exception as e:
+                logger.error(f"Registry: failed to build '{name}': {e}")
+        if warmup:
+            self.warmup()
+
+    def warmup(self):
+        # One dummy forward pass per model so the first real request doesn't pay for lazy CUDA/kernel init.
+        start = time.perf_counter()
+        try:
+            if "embeddings" in self.components:
+                self.components["embeddings"].embed_query("warmup")
+            if "reranker" in self.components:
+                self.components["reranker"].predict([["warmup", "warmup"]])
+            self.warmed_up = True
+            logger.info(f"Registry: warmup pass done in {time.perf_counter() - start:.2f}s.")
+        except Exception as e:
+            logger.error(f"Registry: warmup failed: {e}")
+
+    def status(self) -> dict:
+        return {
+            name: {
+                "warm": name in self.components,
+                "load_seconds": round(self.load_times[name], 3) if name in self.load_times else None,
+                "error": self.errors.get(name),
+            }
+            for name in self.BUILDERS
+        }
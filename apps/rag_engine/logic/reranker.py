@@ -0,0 +1,246 @@
+import hashlib
+import logging
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+import numpy as np
+import torch
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RERANKER_MODEL = 'cross-encoder/ms-marco-MiniLM-L-6-v2'
+
+
+def load_cross_encoder(model_name: str = DEFAULT_RERANKER_MODEL, quantize: bool = False):
+    from sentence_transformers import CrossEncoder
+
+    logger.info(" Loading Cross-Encoder model on GPU...")
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    reranker = CrossEncoder(model_name, device=device)
+
+    if device == "cuda" and torch.cuda.is_bf16_supported():
+        reranker.model.to(dtype=torch.bfloat16)
+        logger.info(f"Cross-Encoder running on {torch.cuda.get_device_name(0)} (Mode: Bfloat16 ).")
+    elif device == "cpu" and quantize:
+        reranker.model = torch.quantization.quantize_dynamic(reranker.model, {torch.nn.Linear}, dtype=torch.qint8)
+        logger.info("Cross-Encoder running on cpu (Mode: dynamic int8).")
+    else:
+        logger.info(f"Cross-Encoder running on {device} (Mode: Standard).")
+    return reranker
+
+
+class OnnxCrossEncoder:
+    """CrossEncoder.predict-compatible wrapper around an ONNX Runtime export (optionally int8-quantized) for CPU nodes."""
+
+    def __init__(self, model_name: str, export_dir: str, quantize: bool = False, max_length: int = 512):
+        from optimum.onnxruntime import ORTModelForSequenceClassification
+        from transformers import AutoTokenizer
+
+        target = os.path.join(export_dir, os.path.basename(model_name.rstrip("/")))
+        if not os.path.exists(os.path.join(target, "model.onnx")):
+            logger.info(f"Exporting {model_name} to ONNX in {target}...")
+            ORTModelForSequenceClassification.from_pretrained(model_name, export=True).save_pretrained(target)
+            AutoTokenizer.from_pretrained(model_name).save_pretrained(target)
+
+        file_name = "model.onnx"
+        if quantize:
+            file_name = "model_int8.onnx"
+            if not os.path.exists(os.path.join(target, file_name)):
+                from onnxruntime.quantization import QuantType, quantize_dynamic
+                quantize_dynamic(os.path.join(target, "model.onnx"), os.path.join(target, file_name), weight_type=QuantType.QInt8)
+
+        self.tokenizer = AutoTokenizer.from_pretrained(target)
+        self.model = ORTModelForSequenceClassification.from_pretrained(target, file_name=file_name)
+        self.max_length = max_length
+        logger.info(f"Cross-Encoder running on ONNX Runtime ({file_name}).")
+
+    def predict(self, pairs, batch_size: int = 32, **kwargs):
+        scores = []
+        for i in range(0, len(pairs), batch_size):
+            batch = pairs[i:i + batch_size]
+            inputs = self.tokenizer(
+                [q for q, _ in batch], [p for _, p in batch],
+                padding=True, truncation=True, max_length=self.max_length, return_tensors="pt"
+            )
+            logits = self.model(**inputs).logits.detach().cpu().numpy()
+            # Same activation as CrossEncoder for single-logit models
+            scores.append(1 / (1 + np.exp(-logits[:, 0])) if logits.shape[1] == 1 else logits)
+        return np.concatenate(scores) if scores else np.array([])
+
+
+class RerankerService:
+    """
+    Shared cross-encoder for every request thread.
+    - Pairs from concurrent requests are collected into one micro-batch (up to max_batch pairs, waiting at most
+      max_wait_ms after the first arrival) and scored in a single forward pass by a dedicated worker thread.
+    - Scores are cached per (query hash, chunk id), so repeated / paginated questions skip the model entirely.
+    """
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __new__(cls):
+        with cls._instance_lock:
+            if cls._instance is None:
+                instance = super(RerankerService, cls).__new__(cls)
+                instance.model_name = getattr(settings, 'RERANKER_MODEL_NAME', DEFAULT_RERANKER_MODEL)
+                instance.backend = getattr(settings, 'RERANKER_BACKEND', "torch")
+                instance.quantize = getattr(settings, 'RERANKER_QUANTIZE', False)
+                instance.max_batch = getattr(settings, 'RERANKER_MAX_BATCH_PAIRS', 128)
+                instance.max_wait = getattr(settings, 'RERANKER_MAX_WAIT_MS', 5) / 1000
+                instance.cache_size = getattr(settings, 'RERANKER_CACHE_SIZE', 50000)
+                instance.model = instance._load_model()
+                instance.cache = OrderedDict()
+                instance.cache_lock = threading.Lock()
+                instance.hits = 0
+                instance.misses = 0
+                instance.batches = 0
+                instance.requests = queue.Queue()
+                instance.worker = threading.Thread(target=instance._worker_loop, name="reranker-batcher", daemon=True)
+                instance.worker.start()
+                cls._instance = instance
+        return cls._instance
+
+    def _load_model(self):
+        if self.backend == "onnx":
+            try:
+                export_dir = getattr(settings, 'RERANKER_ONNX_DIR', os.path.join("data", "onnx"))
+                return OnnxCrossEncoder(self.model_name, export_dir, quantize=self.quantize)
+            except ImportError as e:
+                logger.warning(f"ONNX backend unavailable ({e}); install optimum[onnxruntime]. Falling back to torch.")
+        return load_cross_encoder(self.model_name, quantize=self.quantize)
+
+    @staticmethod
+    def cache_key(query: str, doc) -> tuple:
+        query_hash = hashlib.sha1(query.encode("utf-8")).hexdigest()[:16]
+        chunk_id = doc.metadata.get("id") or hashlib.sha1(doc.page_content.encode("utf-8")).hexdigest()
+        return query_hash, chunk_id
+
+    def score(self, query: str, docs) -> list:
+        """Cross-encoder scores for (query, doc) pairs, served from cache or from the shared micro-batch."""
+        keys = [self.cache_key(query, doc) for doc in docs]
+        scores = [None] * len(docs)
+        with self.cache_lock:
+            for i, key in enumerate(keys):
+                if key in self.cache:
+                    self.cache.move_to_end(key)
+                    scores[i] = self.cache[key]
+            missing = [i for i, s in enumerate(scores) if s is None]
+            self.hits += len(docs) - len(missing)
+            self.misses += len(missing)
+        if not missing:
+            return scores
+
+        computed = self.predict([[query, docs[i].page_content] for i in missing])
+        with self.cache_lock:
+            for i, value in zip(missing, computed):
+                scores[i] = float(value)
+                self.cache[keys[i]] = scores[i]
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return scores
+
+    def score_many(self, items) -> list:
+        """
+        score() for many (query, docs) at once: every uncached pair is queued right away, in chunks of max_batch
+        pairs, so the worker runs full-size forward passes back to back.
+        """
+        keys = [[self.cache_key(query, doc) for doc in docs] for query, docs in items]
+        results = [[None] * len(docs) for _, docs in items]
+        missing = []
+        with self.cache_lock:
+            for i, item_keys in enumerate(keys):
+                for j, key in enumerate(item_keys):
+                    if key in self.cache:
+                        self.cache.move_to_end(key)
+                        results[i][j] = self.cache[key]
+                    else:
+                        missing.append((i, j))
+            self.hits += sum(len(item_keys) for item_keys in keys) - len(missing)
+            self.misses += len(missing)
+
+        pairs = [[items[i][0], items[i][1][j].page_content] for i, j in missing]
+        futures = [self.submit(pairs[start:start + self.max_batch]) for start in range(0, len(pairs), self.max_batch)]
+        computed = [value for future in futures for value in future.result()]
+        with self.cache_lock:
+            for (i, j), value in zip(missing, computed):
+                results[i][j] = float(value)
+                self.cache[keys[i][j]] = results[i][j]
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return results
+
+    def predict(self, pairs, **kwargs):
+        # Same call shape as CrossEncoder.predict, routed through the micro-batcher
+        if not pairs:
+            return []
+        return self.submit(pairs).result()
+
+    def submit(self, pairs) -> Future:
+        future = Future()
+        self.requests.put(([tuple(pair) for pair in pairs], future))
+        return future
+
+    def _worker_loop(self):
+        while True:
+            batch = [self.requests.get()]
+            size = len(batch[0][0])
+            deadline = time.perf_counter() + self.max_wait
+            while size < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                try:
+                    item = self.requests.get(timeout=remaining) if remaining > 0 else self.requests.get_nowait()
+                except queue.Empty:
+                    break
+                batch.append(item)
+                size += len(item[0])
+            try:
+                self._run_batch(batch)
+            except Exception as e:
+                logger.error(f"Reranker batch failed: {e}", exc_info=True)
+
+    def _run_batch(self, batch):
+        # Identical pairs from concurrent requests (same question asked twice) are scored once
+        unique = list(dict.fromkeys(pair for pairs, _ in batch for pair in pairs))
+        try:
+            values = self.model.predict([list(pair) for pair in unique], batch_size=max(len(unique), 1))
+            by_pair = dict(zip(unique, (float(v) for v in np.asarray(values).reshape(-1))))
+            self.batches += 1
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        for pairs, future in batch:
+            future.set_result([by_pair[pair] for pair in pairs])
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": self.backend,
+            "quantized": self.quantize,
+            "cache_entries": len(self.cache),
+            "cache_hits": self.hits,
+            "cache_misses": self.misses,
+            "cache_hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "forward_passes": self.batches,
+        }
+
+
+def fusion_is_confident(candidates, retriever_names, final_k: int, min_agreement: float = 1.0) -> bool:
+    """
+    Early-exit heuristic: true when every retriever already ranks the fused top `final_k` documents inside its
+    own top `final_k`, taken as a sign the cross-encoder would mostly confirm the fusion. Not lossless: a candidate
+    outside that set can still outscore it once reranked, so skipping the rerank can change which documents are
+    returned, not just their order (hence RERANKER_EARLY_EXIT is off by default).
+    """
+    if len(retriever_names) < 2 or len(candidates) < final_k:
+        return False
+    top = candidates[:final_k]
+    agreeing = sum(
+        1 for doc in top
+        if all(doc.metadata.get("retriever_ranks", {}).get(name, final_k + 1) <= final_k for name in retriever_names)
+    )
+    return agreeing / len(top) >= min_agreement
@@ -0,0 +1,175 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+import numpy as np
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+from apps.rag_engine.logic.registry import ModelRegistry
+
+logger = logging.getLogger(__name__)
+
+
+class SemanticAnswerCache:
+    """
+    In-process cache of answers keyed on question embeddings (same model as the vector store).
+    A question whose cosine similarity with a cached one is >= SEMANTIC_CACHE_THRESHOLD reuses its
+    answer and sources, provided both were asked with the same retrieval scope (filters). Bounded by
+    LRU size and TTL; entries are dropped when one of their source documents is re-ingested.
+    Re-ingestions are published in the SourceRevision table, which every process polls (at most every
+    SEMANTIC_CACHE_SYNC_SECONDS) to drop its own stale answers.
+    """
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __new__(cls):
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = super(SemanticAnswerCache, cls).__new__(cls)
+                cls._instance.enabled = getattr(settings, 'SEMANTIC_CACHE_ENABLED', True)
+                cls._instance.threshold = getattr(settings, 'SEMANTIC_CACHE_THRESHOLD', 0.92)
+                cls._instance.max_entries = getattr(settings, 'SEMANTIC_CACHE_MAX_ENTRIES', 1000)
+                cls._instance.ttl = getattr(settings, 'SEMANTIC_CACHE_TTL_SECONDS', 24 * 3600)
+                cls._instance.sync_interval = getattr(settings, 'SEMANTIC_CACHE_SYNC_SECONDS', 5)
+                cls._instance._synced_at = timezone.now()
+                cls._instance._next_sync = 0.0
+                cls._instance.lock = threading.Lock()
+                cls._instance.entries = OrderedDict()
+                cls._instance._next_key = 0
+                cls._instance._matrix = None
+                cls._instance._matrix_keys = []
+                cls._instance._matrix_scopes = None
+                cls._instance.hits = 0
+                cls._instance.misses = 0
+                cls._instance.evictions = 0
+                cls._instance.invalidations = 0
+        return cls._instance
+
+    def embed(self, question: str):
+        vector = np.asarray(ModelRegistry().get("embeddings").embed_query(question), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, question: str, scope: str = "", embedding=None):
+        """Returns (cached_payload or None, question_embedding). Only entries stored under `scope` can match."""
+        if not self.enabled:
+            return None, None
+        if embedding is None:
+            embedding = self.embed(question)
+        self._sync()
+
+        with self.lock:
+            self._expire()
+            if self.entries:
+                if self._matrix is None:
+                    self._matrix_keys = list(self.entries)
+                    self._matrix = np.stack([self.entries[k]["embedding"] for k in self._matrix_keys])
+                    self._matrix_scopes = np.array([self.entries[k]["scope"] for k in self._matrix_keys], dtype=object)
+                similarities = np.where(self._matrix_scopes == scope, self._matrix @ embedding, -1.0)
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.threshold:
+                    key = self._matrix_keys[best]
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    entry = self.entries[key]
+                    logger.info(f"Semantic cache HIT (similarity {similarities[best]:.3f}) for: {question}")
+                    return {**entry["payload"], "cached_question": entry["question"], "cache_similarity": float(similarities[best])}, embedding
+            self.misses += 1
+        return None, embedding
+
+    def store(self, question: str, payload: dict, sources, embedding=None, scope: str = ""):
+        if not self.enabled:
+            return
+        if embedding is None:
+            embedding = self.embed(question)
+
+        with self.lock:
+            self.entries[self._next_key] = {
+                "question": question,
+                "embedding": embedding,
+                "payload": payload,
+                "sources": set(sources),
+                "scope": scope,
+                "created_at": time.monotonic(),
+                "stored_at": time.time(),
+            }
+            self._next_key += 1
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+            self._matrix = None
+
+    def invalidate_sources(self, sources):
+        """Drops the local answers built on `sources` and publishes the re-ingestion to the other processes."""
+        sources = set(sources)
+        self._drop(sources)
+        from apps.ingestion.models import SourceRevision
+        now = timezone.now()
+        try:
+            for source in sources:
+                SourceRevision.objects.get_or_create(source=source, defaults={"updated_at": now})
+            SourceRevision.objects.filter(source__in=sources).update(generation=F("generation") + 1, updated_at=now)
+        except Exception as e:
+            logger.error(f"Semantic cache: could not publish the re-ingestion of {sorted(sources)}, "
+                         f"other processes keep their answers until the TTL: {e}")
+
+    def _drop(self, sources, before=None):
+        with self.lock:
+            stale = [key for key, entry in self.entries.items()
+                     if entry["sources"] & sources and (before is None or entry["stored_at"] <= before)]
+            for key in stale:
+                del self.entries[key]
+            if stale:
+                self.invalidations += len(stale)
+                self._matrix = None
+                logger.info(f"Semantic cache: invalidated {len(stale)} answers for re-ingested {sorted(sources)}.")
+
+    def _sync(self):
+        """Applies the re-ingestions published by other processes since the last poll."""
+        if time.monotonic() < self._next_sync:
+            return
+        self._next_sync = time.monotonic() + self.sync_interval
+        from apps.ingestion.models import SourceRevision
+        # Overlap with the previous poll: a revision committed during it may carry an earlier timestamp
+        since = self._synced_at - timedelta(seconds=self.sync_interval)
+        now = timezone.now()
+        try:
+            revisions = list(SourceRevision.objects.filter(updated_at__gte=since).values_list("source", "updated_at"))
+        except Exception as e:
+            logger.warning(f"Semantic cache: could not read source revisions ({e}), keeping the local entries.")
+            return
+        self._synced_at = now
+        for source, updated_at in revisions:
+            # Answers stored after the revision were built on the new chunks
+            self._drop({source}, before=updated_at.timestamp())
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self._matrix = None
+
+    def _expire(self):
+        now = time.monotonic()
+        expired = [key for key, entry in self.entries.items() if now - entry["created_at"] > self.ttl]
+        for key in expired:
+            del self.entries[key]
+        if expired:
+            self.evictions += len(expired)
+            self._matrix = None
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self.entries),
+            "max_entries": self.max_entries,
+            "threshold": self.threshold,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
@@ -0,0 +1,171 @@
+import bisect
+import contextvars
+import json
+import logging
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+_timings = contextvars.ContextVar("rag_stage_timings", default=None)
+request_id_var = contextvars.ContextVar("rag_request_id", default=None)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+
+class Histogram:
+    """Minimal Prometheus-style histogram (cumulative buckets, _sum and _count) keyed by label values."""
+
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self.lock = threading.Lock()
+        self.series = {}
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self.lock:
+            counts, total = self.series.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            self.series[key] = (counts, total + value)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            series = {key: (list(counts), total) for key, (counts, total) in self.series.items()}
+        for key, (counts, total) in sorted(series.items()):
+            labels = [f'{name}="{value}"' for name, value in zip(self.labelnames, key)]
+            cumulative = 0
+            for bound, count in zip(list(self.buckets) + ["+Inf"], counts):
+                cumulative += count
+                le = bound if bound == "+Inf" else repr(float(bound))
+                bucket_labels = ",".join(labels + ['le="%s"' % le])
+                lines.append(f"{self.name}_bucket{{{bucket_labels}}} {cumulative}")
+            label_str = "{" + ",".join(labels) + "}" if labels else ""
+            lines.append(f"{self.name}_sum{label_str} {total}")
+            lines.append(f"{self.name}_count{label_str} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = {}
+        self.collectors = []
+
+    def histogram(self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        if name not in self.metrics:
+            self.metrics[name] = Histogram(name, documentation, labelnames, buckets)
+        return self.metrics[name]
+
+    def register_collector(self, collector):
+        # collector() -> list of exposition lines, evaluated at scrape time
+        self.collectors.append(collector)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics.values():
+            lines.extend(metric.render())
+        for collector in self.collectors:
+            try:
+                lines.extend(collector())
+            except Exception as e:
+                logger.error(f"Metrics collector failed: {e}")
+        return "\n".join(lines) + "\n"
+
+
+METRICS = MetricsRegistry()
+STAGE_HISTOGRAMS = {
+    "query": METRICS.histogram("legalrag_query_stage_seconds", "Duration of each stage of the question answering pipeline.", ["stage"]),
+    "ingestion": METRICS.histogram("legalrag_ingestion_stage_seconds", "Duration of each stage of the document ingestion pipeline.", ["stage"]),
+}
+HTTP_HISTOGRAM = METRICS.histogram("legalrag_http_request_seconds", "HTTP request duration (time to first byte for streams).", ["view", "method", "status"])
+
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex
+
+
+@contextmanager
+def request_context(request_id: str = None):
+    """Binds a request id and a fresh timing collector to everything executed in this context."""
+    id_token = request_id_var.set(request_id or new_request_id())
+    timings = {}
+    timings_token = _timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _timings.reset(timings_token)
+        request_id_var.reset(id_token)
+
+
+@contextmanager
+def collect_timings():
+    """Collects the duration (seconds) of every `span` entered in this context, keyed by stage name."""
+    timings = {}
+    token = _timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _timings.reset(token)
+
+
+@contextmanager
+def span(name: str, pipeline: str = "query"):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - start, pipeline)
+
+
+def record(name: str, seconds: float, pipeline: str = "query"):
+    timings = _timings.get()
+    if timings is not None:
+        timings[name] = timings.get(name, 0.0) + seconds
+    histogram = STAGE_HISTOGRAMS.get(pipeline)
+    if histogram is not None:
+        histogram.observe(seconds, stage=name)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(json.dumps({
+            "event": "span",
+            "request_id": request_id_var.get(),
+            "pipeline": pipeline,
+            "stage": name,
+            "duration_ms": round(seconds * 1000, 2),
+        }))
+
+
+def log_summary(event: str, timings: dict, **fields):
+    logger.info(json.dumps({
+        "event": event,
+        "request_id": request_id_var.get(),
+        **fields,
+        "stages_ms": {stage: round(seconds * 1000, 2) for stage, seconds in timings.items()},
+    }, default=str))
+
+
+def submit_in_context(executor, fn, *args, **kwargs):
+    # Worker threads don't inherit contextvars: run the task inside a copy of the caller's context
+    return executor.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+def iterate_in_context(iterable):
+    # For streaming responses: the body is consumed after the middleware returned, so re-enter the request's context
+    context = contextvars.copy_context()
+    iterator = iter(iterable)
+    while True:
+        try:
+            item = context.run(next, iterator)
+        except StopIteration:
+            return
+        yield item
+
+
+class RequestIdLogFilter(logging.Filter):
+    def filter(self, record):
+        record.request_id = request_id_var.get() or "-"
+        return True
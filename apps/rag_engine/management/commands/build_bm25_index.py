@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from apps.rag_engine.connectors.vector_store import VectorStoreClient
+from apps.rag_engine.connectors.lexical_store import LexicalStoreClient
+
+class Command(BaseCommand):
+    help = 'Rebuilds the persistent BM25 index from the chunks already stored in ChromaDB'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Number of chunks read from Chroma per batch')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        collection = VectorStoreClient().get_collection()
+        index = LexicalStoreClient()
+        index.clear()
+
+        offset = 0
+        while True:
+            batch = collection.get(include=["documents", "metadatas"], limit=batch_size, offset=offset)
+            if not batch["ids"]:
+                break
+            index.add_documents(
+                documents=batch["documents"],
+                metadatas=batch["metadatas"],
+                ids=batch["ids"]
+            )
+            offset += len(batch["ids"])
+            self.stdout.write(f"Indexed {offset} chunks...")
+
+        self.stdout.write(self.style.SUCCESS(f"✅ BM25 index rebuilt with {index.count()} chunks"))
@@ -0,0 +1,103 @@
+import json
+import os
+import subprocess
+import sys
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Runs in a fresh interpreter: what a web worker imports before serving its first request
+PROBE = """
+import time
+start = time.perf_counter()
+import django
+django.setup()
+import {modules}
+print(time.perf_counter() - start)
+"""
+
+
+def parse_importtime(stderr: str) -> list:
+    """`python -X importtime` lines -> [{"module", "self_s", "cumulative_s", "depth"}], in the order printed."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        rows.append({
+            "module": name.strip(),
+            "self_s": int(self_us) / 1e6,
+            "cumulative_s": int(cumulative_us) / 1e6,
+            "depth": (len(name) - len(name.lstrip())) // 2,
+        })
+    return rows
+
+
+def import_chain(rows: list, index: int) -> list:
+    # importtime prints a module after everything it imported, one indent level deeper: the importer is the
+    # next row with a smaller depth
+    chain, depth = [rows[index]["module"]], rows[index]["depth"]
+    for row in rows[index + 1:]:
+        if row["depth"] < depth:
+            chain.append(row["module"])
+            depth = row["depth"]
+    return list(reversed(chain))
+
+
+class Command(BaseCommand):
+    help = ("Measures the import time of the URLconf (every view) in a fresh interpreter, prints the slowest modules "
+            "and packages, and fails if it exceeds STARTUP_IMPORT_BUDGET_SECONDS or imports a STARTUP_FORBIDDEN_IMPORTS package")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--module', action='append', help='Module to import (repeatable, default: the ROOT_URLCONF)')
+        parser.add_argument('--budget', type=float, default=None, help='Seconds (default: STARTUP_IMPORT_BUDGET_SECONDS)')
+        parser.add_argument('--top', type=int, default=20, help='Number of modules and packages listed')
+        parser.add_argument('--json', dest='json_path', help='Write the full report here')
+
+    def handle(self, *args, **options):
+        modules = options['module'] or [settings.ROOT_URLCONF]
+        budget = options['budget'] if options['budget'] is not None else getattr(settings, 'STARTUP_IMPORT_BUDGET_SECONDS', 2.0)
+        forbidden = tuple(getattr(settings, 'STARTUP_FORBIDDEN_IMPORTS', ()))
+
+        # Imports only: no model preload, no ingestion job resumed by the probe
+        env = {**os.environ, "RAG_ENGINE_PRELOAD": "False", "INGESTION_RESUME_ON_STARTUP": "False",
+               "DJANGO_SETTINGS_MODULE": os.environ.get("DJANGO_SETTINGS_MODULE", "config.settings")}
+        probe = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", PROBE.format(modules=", ".join(modules))],
+            capture_output=True, text=True, env=env, cwd=settings.BASE_DIR,
+        )
+        if probe.returncode != 0:
+            raise CommandError(f"Importing {', '.join(modules)} failed:\n{probe.stderr[-2000:]}")
+
+        total = float(probe.stdout.strip().splitlines()[-1])
+        rows = parse_importtime(probe.stderr)
+        packages = {}
+        for row in rows:
+            top_level = row["module"].split(".")[0]
+            packages[top_level] = packages.get(top_level, 0.0) + row["self_s"]
+        violations = [
+            {"module": row["module"], "chain": import_chain(rows, i)}
+            for i, row in enumerate(rows)
+            if row["module"] in forbidden
+        ]
+
+        self.stdout.write(f"Startup imports of {', '.join(modules)}: {total:.3f}s (budget {budget:.3f}s), {len(rows)} modules")
+        self.stdout.write(f"\n{'cumulative':>10}  {'self':>8}  module")
+        for row in sorted(rows, key=lambda r: -r["cumulative_s"])[:options['top']]:
+            self.stdout.write(f"{row['cumulative_s']:>9.3f}s {row['self_s']:>8.3f}s  {row['module']}")
+        self.stdout.write(f"\n{'self':>10}  package")
+        for name, seconds in sorted(packages.items(), key=lambda item: -item[1])[:options['top']]:
+            self.stdout.write(f"{seconds:>9.3f}s  {name}")
+
+        if options['json_path']:
+            with open(options['json_path'], "w", encoding="utf-8") as f:
+                json.dump({"modules": modules, "total_s": total, "budget_s": budget, "imports": rows,
+                           "packages": packages, "forbidden": violations}, f, indent=2)
+
+        errors = []
+        for violation in violations:
+            errors.append(f"forbidden import {violation['module']}: {' -> '.join(violation['chain'])}")
+        if total > budget:
+            errors.append(f"startup imports took {total:.3f}s, over the {budget:.3f}s budget")
+        if errors:
+            raise CommandError("\n".join(errors))
+        self.stdout.write(self.style.SUCCESS("✅ Startup imports within budget"))
@@ -0,0 +1,79 @@
+import os
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from apps.rag_engine.connectors.vector_store import VectorStoreClient, hnsw_metadata
+
+
+def iter_collection(collection, batch_size, include):
+    offset = 0
+    while True:
+        batch = collection.get(include=include, limit=batch_size, offset=offset)
+        if not batch["ids"]:
+            break
+        yield batch
+        offset += len(batch["ids"])
+
+
+class Command(BaseCommand):
+    help = ('Rebuilds the quantized vector index (VECTOR_STORAGE="quantized") from the vectors stored in ChromaDB; '
+            'with --hnsw, first recreates the Chroma collection with the CHROMA_HNSW parameters')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Number of chunks read from Chroma per batch')
+        parser.add_argument('--hnsw', action='store_true', help='Recreate the Chroma collection with the CHROMA_HNSW parameters')
+        parser.add_argument('--skip-quantized', action='store_true', help='Only recreate the Chroma collection (with --hnsw)')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        client = VectorStoreClient()
+
+        if options['hnsw']:
+            self.recreate_collection(client, batch_size)
+        if options['skip_quantized']:
+            return
+
+        index = client.quantized
+        if index is None:
+            from apps.rag_engine.connectors.quantized_index import QuantizedVectorIndex
+            index = QuantizedVectorIndex(
+                os.path.join(getattr(settings, 'CHROMA_DB_PATH', './data/chroma_db'), "quantized",
+                             getattr(settings, 'CHROMA_COLLECTION_NAME', 'legal_docs')),
+                client.embedding_fn.model.get_sentence_embedding_dimension(),
+                dimensions=getattr(settings, 'VECTOR_INDEX_DIMENSIONS', None),
+                dtype=getattr(settings, 'VECTOR_QUANTIZATION', "int8"),
+            )
+        start = time.perf_counter()
+        batches = (
+            (batch["ids"], batch["embeddings"])
+            for batch in iter_collection(client.get_collection(), batch_size, ["embeddings"])
+        )
+        written = index.rebuild(batches)
+        stats = index.stats()
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Quantized index rebuilt with {written} vectors in {time.perf_counter() - start:.1f}s "
+            f"({stats['dtype']}, {stats['search_dimensions']} dims, {stats['memory_bytes'] / 2**20:.1f} MiB in RAM) at {stats['path']}"
+        ))
+
+    def recreate_collection(self, client, batch_size):
+        name = getattr(settings, 'CHROMA_COLLECTION_NAME', 'legal_docs')
+        old = client.get_collection()
+        staging_name = f"{name}_rebuild"
+        try:
+            client.client.delete_collection(staging_name)
+        except Exception:
+            pass
+        staging = client.client.create_collection(staging_name, metadata=hnsw_metadata())
+
+        start, copied = time.perf_counter(), 0
+        for batch in iter_collection(old, batch_size, ["embeddings", "documents", "metadatas"]):
+            staging.add(ids=batch["ids"], embeddings=batch["embeddings"], documents=batch["documents"], metadatas=batch["metadatas"])
+            copied += len(batch["ids"])
+            self.stdout.write(f"Copied {copied} chunks...")
+
+        client.client.delete_collection(name)
+        staging.modify(name=name)
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Collection '{name}' rebuilt with {hnsw_metadata()} ({copied} chunks, {time.perf_counter() - start:.1f}s). "
+            f"Restart the web workers to pick it up."
+        ))
@@ -0,0 +1,63 @@
+import re
+import time
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from apps.rag_engine.logic.telemetry import HTTP_HISTOGRAM, log_summary, request_context, request_id_var
+
+# Client-supplied ids end up in logs and response headers: anything else gets a fresh id
+REQUEST_ID_PATTERN = re.compile(r"[A-Za-z0-9._:-]{1,64}")
+
+class RequestTimingMiddleware:
+    """
+    Gives every request an id (X-Request-ID, propagated if sent and safe) and records its duration and stage timings.
+    Sync and async capable, so async views served over ASGI are not pushed back onto a thread.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if self._skip(request):
+            return self.get_response(request)
+
+        with request_context(self._incoming_request_id(request)) as timings:
+            request.request_id = request_id_var.get()
+            start = time.perf_counter()
+            response = self.get_response(request)
+            self._observe(request, response, timings, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        if self._skip(request):
+            return await self.get_response(request)
+
+        with request_context(self._incoming_request_id(request)) as timings:
+            request.request_id = request_id_var.get()
+            start = time.perf_counter()
+            response = await self.get_response(request)
+            self._observe(request, response, timings, time.perf_counter() - start)
+        return response
+
+    @staticmethod
+    def _incoming_request_id(request):
+        request_id = request.headers.get("X-Request-ID")
+        if request_id and REQUEST_ID_PATTERN.fullmatch(request_id):
+            return request_id
+        return None
+
+    @staticmethod
+    def _skip(request):
+        return request.path.rstrip("/").endswith("metrics")
+
+    @staticmethod
+    def _observe(request, response, timings, duration):
+        view = request.resolver_match.url_name if request.resolver_match else "unresolved"
+        HTTP_HISTOGRAM.observe(duration, view=view, method=request.method, status=response.status_code)
+        log_summary("request", timings, view=view, method=request.method, status=response.status_code,
+                    duration_ms=round(duration * 1000, 2))
+        response["X-Request-ID"] = request.request_id
@@ -1,6 +1,12 @@
 from django.urls import path
-from .views import AskView
+from .views import AskView, AskStreamView, AskBatchView, HealthView, CacheStatsView, ask_async_view, ask_stream_async_view
 
 urlpatterns = [
     path('ask/', AskView.as_view(), name='ask-question'),
-]
\ No newline at end of file
+    path('ask/stream/', AskStreamView.as_view(), name='ask-question-stream'),
+    path('ask/batch/', AskBatchView.as_view(), name='ask-question-batch'),
+    path('async/ask/', ask_async_view, name='ask-question-async'),
+    path('async/ask/stream/', ask_stream_async_view, name='ask-question-stream-async'),
+    path('health/', HealthView.as_view(), name='rag-health'),
+    path('cache/', CacheStatsView.as_view(), name='rag-cache-stats'),
+]
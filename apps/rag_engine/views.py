@@ -1,88 +1,489 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from langchain_groq import ChatGroq
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import StrOutputParser
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
 from django.conf import settings
-import os
+import hmac
+import ipaddress
+import json
+import time
 import logging
 
-from .logic.hybrid_search import HybridSearcher
+from .logic.registry import ModelRegistry
+from .logic.answer_chain import NO_DOCUMENTS_ANSWER, build_context
+from .logic.async_pipeline import run_sync
+from .logic.filters import SearchFilters
+from .logic.semantic_cache import SemanticAnswerCache
+from .logic.telemetry import METRICS, collect_timings, iterate_in_context, log_summary, record, request_context, span
 
 logger = logging.getLogger(__name__)
 
+
+def sse_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+class EventStreamRenderer(BaseRenderer):
+    # Lets clients send `Accept: text/event-stream` without DRF answering 406
+    media_type = "text/event-stream"
+    format = "sse"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return data if isinstance(data, (str, bytes)) else json.dumps(data)
+
+
+def parse_ask_payload(data):
+    """-> (question, SearchFilters or None, error message or None) from an ask request body."""
+    question = data.get("question") if isinstance(data, dict) else None
+    if not question:
+        return None, None, "Question is required"
+    try:
+        return question, SearchFilters.from_dict(data.get("filters")), None
+    except ValueError as e:
+        return None, None, str(e)
+
+
+def parse_batch_payload(data):
+    """-> (questions, SearchFilters or None, error message or None) from a batch ask request body."""
+    questions = data.get("questions") if isinstance(data, dict) else None
+    if not isinstance(questions, list) or not questions:
+        return None, None, "questions must be a non-empty list"
+    questions = [q.get("question") if isinstance(q, dict) else q for q in questions]
+    if not all(isinstance(q, str) and q.strip() for q in questions):
+        return None, None, "every question must be a non-empty string"
+    max_questions = getattr(settings, 'BATCH_ASK_MAX_QUESTIONS', 500)
+    if len(questions) > max_questions:
+        return None, None, f"at most {max_questions} questions per batch"
+    try:
+        return questions, SearchFilters.from_dict(data.get("filters")), None
+    except ValueError as e:
+        return None, None, str(e)
+
+
+def sources_event(docs, sources, graph_context) -> dict:
+    return {
+        "sources": sources,
+        "graph_context": graph_context,
+        "excerpts": [
+            {"source": d.metadata.get('source', 'Unknown'), "score": d.metadata.get('relevance_score'), "text": d.page_content}
+            for d in docs
+        ],
+        "cached": False
+    }
+
+
 class AskView(APIView):
     def post(self, request):
-        question = request.data.get("question")
-        if not question:
-            return Response({"error": "Question is required"}, status=status.HTTP_400_BAD_REQUEST)
+        question, filters, error = parse_ask_payload(request.data)
+        if error:
+            return Response({"error": error}, status=status.HTTP_400_BAD_REQUEST)
+        scope = filters.scope_key() if filters else ""
 
         logger.info(f"Processing query: {question}")
-        searcher = HybridSearcher()
+        cache = SemanticAnswerCache()
+        with span("cache_lookup"):
+            cached, question_embedding = cache.lookup(question, scope=scope)
+        if cached:
+            return Response({**cached, "cached": True})
+
+        registry = ModelRegistry()
+        searcher = registry.get("searcher")
         
-        docs = searcher.search_and_rerank(question, initial_k=20, final_k=5)
+        docs = searcher.search_and_rerank(question, initial_k=20, final_k=5, filters=filters)
         
         if not docs:
             return Response({
-                "answer": "Je n'ai trouvé aucun document pertinent dans la base de connaissances.",
+                "answer": NO_DOCUMENTS_ANSWER,
                 "sources": []
             })
 
-        vector_context = "\n\n".join([
-            f"[Document: {d.metadata.get('source', 'Unknown')} | Score: {d.metadata.get('relevance_score', 0):.2f}]\nContent: {d.page_content}" 
-            for d in docs
-        ])
+        with span("prompt"):
+            full_context, graph_context = build_context(docs, question)
+        sources = list(set([d.metadata.get('source', 'Unknown') for d in docs]))
+        chain = registry.get("answer_chain")
 
-        graph_context = ""
-        if docs and "graph_context" in docs[0].metadata:
-            graph_context = docs[0].metadata["graph_context"]
-            logger.info("🕸️ Graph Context injected into prompt.")
+        logger.info("Generating answer...")
+        with span("llm"):
+            answer = chain.invoke({"context": full_context, "question": question})
 
-        full_context = f"""
-        --- EXCERPTS FROM DOCUMENTS (VECTOR SEARCH) ---
-        {vector_context}
+        payload = {
+            "answer": answer,
+            "sources": sources,
+            "graph_context_used": bool(graph_context)
+        }
+        cache.store(question, payload, sources, embedding=question_embedding, scope=scope)
+        return Response({**payload, "cached": False})
 
-        --- KNOWLEDGE GRAPH INSIGHTS (STRUCTURE & RELATIONS) ---
-        {graph_context}
-        """
-        sources = list(set([d.metadata.get('source', 'Unknown') for d in docs]))
-        api_key = getattr(settings, 'GROQ_API_KEY', os.getenv('GROQ_API_KEY'))
-        
-        llm = ChatGroq(
-            temperature=0, 
-            model_name="llama-3.3-70b-versatile",
-            api_key=api_key
-        )
 
-        template = """You are an expert Legal AI Assistant powered by a Graph-RAG system.
-        
-        Your goal is to answer the user's question accurately using the provided context.
-        The context contains two parts:
-        1. **Excerpts**: Text passages directly relevant to the question.
-        2. **Graph Insights**: Information about document structure, dates, and related entities (Laws, Persons).
-
-        Guidelines:
-        - Synthesize information from both the text excerpts and the graph insights.
-        - If the Graph Insights provide dates or document types, use them to contextualize your answer.
-        - Cite specific documents (e.g., "According to the Labor Code...").
-        - If the answer is not in the context, say "I don't have enough information."
-        
-        Context:
-        {context}
-        
-        Question: {question}
-        
-        Answer:"""
+class AskStreamView(APIView):
+    """
+    Server-Sent Events variant of AskView: emits `sources` as soon as reranking is done,
+    then one `token` event per LLM chunk, then `done` (or `error`).
+    """
+    renderer_classes = [JSONRenderer, EventStreamRenderer]
 
-        prompt = ChatPromptTemplate.from_template(template)
-        chain = prompt | llm | StrOutputParser()
+    def post(self, request):
+        question, filters, error = parse_ask_payload(request.data)
+        if error:
+            return Response({"error": error}, status=status.HTTP_400_BAD_REQUEST)
 
-        logger.info("Generating answer...")
-        answer = chain.invoke({"context": full_context, "question": question})
+        response = StreamingHttpResponse(iterate_in_context(self._stream(question, filters)), content_type="text/event-stream; charset=utf-8")
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"
+        return response
 
-        return Response({
-            "answer": answer,
+    def _stream(self, question, filters=None):
+        with collect_timings() as timings:
+            yield from self._stream_events(question, filters)
+        log_summary("stream", timings)
+
+    def _stream_events(self, question, filters=None):
+        try:
+            logger.info(f"Processing streamed query: {question}")
+            scope = filters.scope_key() if filters else ""
+            cache = SemanticAnswerCache()
+            with span("cache_lookup"):
+                cached, question_embedding = cache.lookup(question, scope=scope)
+            if cached:
+                yield sse_event("sources", {"sources": cached["sources"], "graph_context": "", "cached": True})
+                yield sse_event("token", {"text": cached["answer"]})
+                yield sse_event("done", {**cached, "cached": True})
+                return
+
+            registry = ModelRegistry()
+            docs = registry.get("searcher").search_and_rerank(question, initial_k=20, final_k=5, filters=filters)
+            if not docs:
+                yield sse_event("sources", {"sources": [], "graph_context": "", "cached": False})
+                yield sse_event("token", {"text": NO_DOCUMENTS_ANSWER})
+                yield sse_event("done", {"answer": NO_DOCUMENTS_ANSWER, "sources": [], "cached": False})
+                return
+
+            with span("prompt"):
+                full_context, graph_context = build_context(docs, question)
+            sources = list(set([d.metadata.get('source', 'Unknown') for d in docs]))
+            yield sse_event("sources", sources_event(docs, sources, graph_context))
+
+            logger.info("Streaming answer...")
+            answer_parts = []
+            llm_start = time.perf_counter()
+            for token in registry.get("answer_chain").stream({"context": full_context, "question": question}):
+                if not answer_parts:
+                    record("llm_first_token", time.perf_counter() - llm_start)
+                answer_parts.append(token)
+                yield sse_event("token", {"text": token})
+            record("llm", time.perf_counter() - llm_start)
+
+            payload = {
+                "answer": "".join(answer_parts),
+                "sources": sources,
+                "graph_context_used": bool(graph_context)
+            }
+            cache.store(question, payload, sources, embedding=question_embedding, scope=scope)
+            yield sse_event("done", {**payload, "cached": False})
+        except Exception as e:
+            logger.error(f"Streaming answer failed: {e}", exc_info=True)
+            yield sse_event("error", {"error": str(e)})
+
+
+class AskBatchView(APIView):
+    """
+    Many questions in one call (see BatchAnswerer), answered as Server-Sent Events: one `result` per question as
+    soon as it is ready (with its `index` in the request, results arrive out of order), then `done` with a summary.
+    """
+    renderer_classes = [JSONRenderer, EventStreamRenderer]
+
+    def post(self, request):
+        questions, filters, error = parse_batch_payload(request.data)
+        if error:
+            return Response({"error": error}, status=status.HTTP_400_BAD_REQUEST)
+
+        response = StreamingHttpResponse(iterate_in_context(self._stream(questions, filters)), content_type="text/event-stream; charset=utf-8")
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+    def _stream(self, questions, filters=None):
+        with collect_timings() as timings:
+            yield from self._stream_events(questions, filters)
+        log_summary("batch", timings)
+
+    def _stream_events(self, questions, filters=None):
+        from .logic.batch_pipeline import BatchAnswerer
+
+        start = time.perf_counter()
+        counts = {"answered": 0, "cached": 0, "errors": 0}
+        try:
+            logger.info(f"Processing batch of {len(questions)} questions")
+            registry = ModelRegistry()
+            answerer = BatchAnswerer(
+                registry.get("searcher"), registry.get("answer_chain"), registry.get("embeddings"), SemanticAnswerCache()
+            )
+            for result in answerer.answer(questions, filters):
+                if "error" in result:
+                    counts["errors"] += 1
+                else:
+                    counts["answered"] += 1
+                    counts["cached"] += bool(result.get("cached"))
+                yield sse_event("result", result)
+            elapsed = time.perf_counter() - start
+            yield sse_event("done", {
+                "questions": len(questions), **counts,
+                "elapsed_s": round(elapsed, 3),
+                "questions_per_s": round(len(questions) / elapsed, 2) if elapsed else None,
+            })
+        except Exception as e:
+            logger.error(f"Batch answer failed: {e}", exc_info=True)
+            yield sse_event("error", {"error": str(e)})
+
+
+def _json_body(request):
+    try:
+        return json.loads(request.body or b"{}")
+    except ValueError:
+        return None
+
+
+@csrf_exempt
+@require_POST
+async def ask_async_view(request):
+    """
+    AskView on the event loop (serve through config/asgi.py): Neo4j via the async driver, the LLM via ainvoke,
+    embedding / BM25 / Chroma / reranking in the executor, so waiting on Groq or Neo4j holds no thread.
+    """
+    question, filters, error = parse_ask_payload(_json_body(request))
+    if error:
+        return JsonResponse({"error": error}, status=status.HTTP_400_BAD_REQUEST)
+    scope = filters.scope_key() if filters else ""
+
+    logger.info(f"Processing async query: {question}")
+    cache = SemanticAnswerCache()
+    with span("cache_lookup"):
+        cached, question_embedding = await run_sync(cache.lookup, question, scope=scope)
+    if cached:
+        return JsonResponse({**cached, "cached": True}, json_dumps_params={"ensure_ascii": False})
+
+    registry = ModelRegistry()
+    searcher = await run_sync(registry.get, "async_searcher")
+    docs = await searcher.search_and_rerank(question, initial_k=20, final_k=5, filters=filters)
+    if not docs:
+        return JsonResponse({"answer": NO_DOCUMENTS_ANSWER, "sources": []}, json_dumps_params={"ensure_ascii": False})
+
+    with span("prompt"):
+        full_context, graph_context = build_context(docs, question)
+    sources = list(set([d.metadata.get('source', 'Unknown') for d in docs]))
+    chain = await run_sync(registry.get, "answer_chain")
+
+    with span("llm"):
+        answer = await chain.ainvoke({"context": full_context, "question": question})
+
+    payload = {
+        "answer": answer,
+        "sources": sources,
+        "graph_context_used": bool(graph_context)
+    }
+    await run_sync(cache.store, question, payload, sources, embedding=question_embedding, scope=scope)
+    return JsonResponse({**payload, "cached": False}, json_dumps_params={"ensure_ascii": False})
+
+
+@csrf_exempt
+@require_POST
+async def ask_stream_async_view(request):
+    """Server-Sent Events counterpart of ask_async_view (same events as AskStreamView), LLM tokens via astream."""
+    question, filters, error = parse_ask_payload(_json_body(request))
+    if error:
+        return JsonResponse({"error": error}, status=status.HTTP_400_BAD_REQUEST)
+
+    response = StreamingHttpResponse(
+        _astream(question, filters, getattr(request, "request_id", None)),
+        content_type="text/event-stream; charset=utf-8"
+    )
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+async def _astream(question, filters, request_id):
+    # The body is consumed after the middleware returned: re-bind the request id and a timing collector
+    with request_context(request_id) as timings:
+        async for event in _astream_events(question, filters):
+            yield event
+        log_summary("stream", timings)
+
+
+async def _astream_events(question, filters):
+    try:
+        logger.info(f"Processing async streamed query: {question}")
+        scope = filters.scope_key() if filters else ""
+        cache = SemanticAnswerCache()
+        with span("cache_lookup"):
+            cached, question_embedding = await run_sync(cache.lookup, question, scope=scope)
+        if cached:
+            yield sse_event("sources", {"sources": cached["sources"], "graph_context": "", "cached": True})
+            yield sse_event("token", {"text": cached["answer"]})
+            yield sse_event("done", {**cached, "cached": True})
+            return
+
+        registry = ModelRegistry()
+        searcher = await run_sync(registry.get, "async_searcher")
+        docs = await searcher.search_and_rerank(question, initial_k=20, final_k=5, filters=filters)
+        if not docs:
+            yield sse_event("sources", {"sources": [], "graph_context": "", "cached": False})
+            yield sse_event("token", {"text": NO_DOCUMENTS_ANSWER})
+            yield sse_event("done", {"answer": NO_DOCUMENTS_ANSWER, "sources": [], "cached": False})
+            return
+
+        with span("prompt"):
+            full_context, graph_context = build_context(docs, question)
+        sources = list(set([d.metadata.get('source', 'Unknown') for d in docs]))
+        yield sse_event("sources", sources_event(docs, sources, graph_context))
+
+        chain = await run_sync(registry.get, "answer_chain")
+        answer_parts = []
+        llm_start = time.perf_counter()
+        async for token in chain.astream({"context": full_context, "question": question}):
+            if not answer_parts:
+                record("llm_first_token", time.perf_counter() - llm_start)
+            answer_parts.append(token)
+            yield sse_event("token", {"text": token})
+        record("llm", time.perf_counter() - llm_start)
+
+        payload = {
+            "answer": "".join(answer_parts),
             "sources": sources,
             "graph_context_used": bool(graph_context)
-        })
+        }
+        await run_sync(cache.store, question, payload, sources, embedding=question_embedding, scope=scope)
+        yield sse_event("done", {**payload, "cached": False})
+    except Exception as e:
+        logger.error(f"Async streaming answer failed: {e}", exc_info=True)
+        yield sse_event("error", {"error": str(e)})
+
+
+class HealthView(APIView):
+    def get(self, request):
+        registry = ModelRegistry()
+        components = registry.status()
+        all_warm = all(c["warm"] for c in components.values())
+        return Response({
+            "status": "ok" if all_warm else "degraded",
+            "warmed_up": registry.warmed_up,
+            "components": components
+        }, status=status.HTTP_200_OK)
+
+
+class CacheStatsView(APIView):
+    def get(self, request):
+        return Response(SemanticAnswerCache().stats())
+
+    def delete(self, request):
+        SemanticAnswerCache().clear()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+
+def _semantic_cache_metrics():
+    stats = SemanticAnswerCache().stats()
+    return [
+        "# TYPE legalrag_semantic_cache_hits_total counter",
+        f"legalrag_semantic_cache_hits_total {stats['hits']}",
+        "# TYPE legalrag_semantic_cache_misses_total counter",
+        f"legalrag_semantic_cache_misses_total {stats['misses']}",
+        "# TYPE legalrag_semantic_cache_entries gauge",
+        f"legalrag_semantic_cache_entries {stats['entries']}",
+    ]
+
+METRICS.register_collector(_semantic_cache_metrics)
+
+
+def _reranker_metrics():
+    # Only once the reranker is loaded: a scrape must never trigger a model load
+    reranker = ModelRegistry().components.get("reranker")
+    if reranker is None or not hasattr(reranker, "stats"):
+        return []
+    stats = reranker.stats()
+    return [
+        "# TYPE legalrag_reranker_cache_hits_total counter",
+        f"legalrag_reranker_cache_hits_total {stats['cache_hits']}",
+        "# TYPE legalrag_reranker_cache_misses_total counter",
+        f"legalrag_reranker_cache_misses_total {stats['cache_misses']}",
+        "# TYPE legalrag_reranker_forward_passes_total counter",
+        f"legalrag_reranker_forward_passes_total {stats['forward_passes']}",
+    ]
+
+METRICS.register_collector(_reranker_metrics)
+
+
+def _embedding_cache_metrics():
+    embeddings = ModelRegistry().components.get("embeddings")
+    stats = embeddings.stats() if embeddings is not None and hasattr(embeddings, "stats") else {}
+    if not stats:
+        return []
+    return [
+        "# TYPE legalrag_embedding_cache_hits_total counter",
+        f'legalrag_embedding_cache_hits_total{{tier="lru"}} {stats["lru_hits"]}',
+        f'legalrag_embedding_cache_hits_total{{tier="disk"}} {stats["hits"]}',
+        "# TYPE legalrag_embedding_cache_misses_total counter",
+        f"legalrag_embedding_cache_misses_total {stats['misses']}",
+        "# TYPE legalrag_embedding_cache_entries gauge",
+        f"legalrag_embedding_cache_entries {stats['entries']}",
+    ]
+
+METRICS.register_collector(_embedding_cache_metrics)
+
+
+def _llm_metrics():
+    from .llm.gateway import llm_stats
+    gateways = llm_stats()
+    lines = []
+    for metric, key, kind in (("calls_total", "calls", "counter"), ("coalesced_total", "coalesced", "counter"),
+                              ("queued", "queued", "gauge")):
+        lines.append(f"# TYPE legalrag_llm_{metric} {kind}")
+        for stats in gateways:
+            labels = f'provider="{stats["provider"]}",json="{str(stats["json_mode"]).lower()}"'
+            lines.append(f"legalrag_llm_{metric}{{{labels}}} {stats[key]}")
+    return lines
+
+METRICS.register_collector(_llm_metrics)
+
+
+def _graph_metrics():
+    graph = ModelRegistry().components.get("graph_store")
+    if graph is None or not hasattr(graph, "stats"):
+        return []
+    stats = graph.stats()
+    return [
+        "# TYPE legalrag_graph_connection_failures_total counter",
+        f"legalrag_graph_connection_failures_total {stats['failures']}",
+        "# TYPE legalrag_graph_reads_skipped_total counter",
+        f"legalrag_graph_reads_skipped_total {stats['rejected']}",
+        "# TYPE legalrag_graph_unavailable gauge",
+        f"legalrag_graph_unavailable {int(stats['open'])}",
+    ]
+
+METRICS.register_collector(_graph_metrics)
+
+
+def metrics_allowed(request) -> bool:
+    """Scrapes are accepted with `Authorization: Bearer <METRICS_TOKEN>` or from a METRICS_ALLOWED_NETWORKS address."""
+    token = getattr(settings, 'METRICS_TOKEN', "")
+    if token:
+        supplied = request.headers.get("Authorization", "")
+        if hmac.compare_digest(supplied.encode("utf-8"), f"Bearer {token}".encode("utf-8")):
+            return True
+    try:
+        address = ipaddress.ip_address(request.META.get("REMOTE_ADDR", ""))
+    except ValueError:
+        return False
+    return any(address in ipaddress.ip_network(network, strict=False)
+               for network in getattr(settings, 'METRICS_ALLOWED_NETWORKS', ("127.0.0.1/32", "::1/128")))
+
+
+def metrics_view(request):
+    if not getattr(settings, 'METRICS_ENABLED', True):
+        raise Http404()
+    if not metrics_allowed(request):
+        return HttpResponse("Forbidden", status=403, content_type="text/plain")
+    return HttpResponse(METRICS.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,28 @@
+import asyncio
+import os
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+django_application = get_asgi_application()
+
+
+async def lifespan(receive, send):
+    # Django has no lifespan support: the server loop's resources (async Neo4j driver) are opened / closed here
+    from apps.rag_engine.connectors.graph_store import AsyncGraphStoreClient
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            AsyncGraphStoreClient().bind(asyncio.get_running_loop())
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await AsyncGraphStoreClient().close()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "lifespan":
+        await lifespan(receive, send)
+        return
+    await django_application(scope, receive, send)
@@ -26,7 +26,7 @@ INSTALLED_APPS = [
     'corsheaders',
 
     'apps.ingestion.apps.IngestionConfig',    
-    'apps.rag_engine',   
+    'apps.rag_engine.apps.RagEngineConfig',
     'apps.evaluation',   
 ]
 
@@ -39,6 +39,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'apps.rag_engine.middleware.RequestTimingMiddleware',
 ]
 
 ROOT_URLCONF = 'config.urls'
@@ -82,6 +83,30 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'filters': {
+        'request_id': {'()': 'apps.rag_engine.logic.telemetry.RequestIdLogFilter'},
+    },
+    'formatters': {
+        'default': {'format': '%(asctime)s %(levelname)s [%(request_id)s] %(name)s: %(message)s'},
+    },
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler', 'formatter': 'default', 'filters': ['request_id']},
+    },
+    'root': {'handlers': ['console'], 'level': os.getenv('LOG_LEVEL', 'INFO')},
+}
+
+# Prometheus /metrics: scraped with `Authorization: Bearer <METRICS_TOKEN>` or from METRICS_ALLOWED_NETWORKS (CIDR,
+# comma-separated in the environment); METRICS_ENABLED=False removes the endpoint (404)
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'True') == 'True'
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+METRICS_ALLOWED_NETWORKS = [n.strip() for n in os.getenv('METRICS_ALLOWED_NETWORKS', '127.0.0.1/32,::1/128').split(',') if n.strip()]
+
+MEDIA_URL = 'media/'
+MEDIA_ROOT = os.path.join(BASE_DIR, "data")
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
@@ -108,9 +133,156 @@ CHROMA_COLLECTION_NAME = "legal_documents"
 NEO4J_URI = os.getenv("NEO4J_URI", "bolt://neo4j:7687")
 NEO4J_USERNAME = os.getenv("NEO4J_USERNAME", "neo4j")
 NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD", "password")
+NEO4J_BATCH_SIZE = int(os.getenv("NEO4J_BATCH_SIZE", 500))
+# An entity label whose name constraint could not be created (e.g. duplicate names) is written without it until then
+NEO4J_LABEL_CONSTRAINT_RETRY_SECONDS = 3600
+# Driver connection pool (shared by the sync and async clients; timeouts in seconds). Reads run as managed read
+# transactions (routed to read replicas in a cluster) bounded by NEO4J_READ_TIMEOUT_MS unless the caller passes its own
+# (e.g. GRAPH_RETRIEVER_TIMEOUT_MS); transient failures are retried for at most NEO4J_MAX_TRANSACTION_RETRY_TIME.
+# After a connection failure, graph reads are skipped for NEO4J_FAILURE_COOLDOWN_SECONDS: retrieval carries on without the graph.
+NEO4J_MAX_CONNECTION_POOL_SIZE = int(os.getenv("NEO4J_MAX_CONNECTION_POOL_SIZE", 50))
+NEO4J_CONNECTION_ACQUISITION_TIMEOUT = float(os.getenv("NEO4J_CONNECTION_ACQUISITION_TIMEOUT", 2.0))
+NEO4J_CONNECTION_TIMEOUT = float(os.getenv("NEO4J_CONNECTION_TIMEOUT", 5.0))
+NEO4J_MAX_CONNECTION_LIFETIME = 3600
+NEO4J_MAX_TRANSACTION_RETRY_TIME = 5.0
+NEO4J_READ_TIMEOUT_MS = 2000
+NEO4J_FAILURE_COOLDOWN_SECONDS = 30
+
+# Background ingestion queue (uploads return 202 and are processed by these worker threads); web workers
+# re-enqueue the uploads left queued or interrupted by a restart when they start
+INGESTION_WORKERS = int(os.getenv("INGESTION_WORKERS", 1))
+INGESTION_RESUME_ON_STARTUP = os.getenv("INGESTION_RESUME_ON_STARTUP", "True") == "True"
+# A running job holds a lease on its LegalDocument row (renewed every third of it): with several web workers,
+# only the one holding it runs the job, and a job whose worker died is taken over once its lease expires
+INGESTION_LEASE_SECONDS = 120
+
+# Large PDFs are parsed page-range by page-range in a process pool (None = one worker per CPU) and streamed
+# through the chunker CHUNKER_WINDOW_SENTENCES at a time; chunks are enriched and indexed in batches
+PDF_PARSE_WORKERS = int(os.getenv("PDF_PARSE_WORKERS", 0)) or None
+PDF_PAGES_PER_TASK = 8
+CHUNKER_WINDOW_SENTENCES = 400
+INGESTION_CHUNK_BATCH_SIZE = int(os.getenv("INGESTION_CHUNK_BATCH_SIZE", 256))
+
+# Chunk enrichment with the local Ollama model; concurrency adapts between MIN and MAX to the server's latency
+OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://host.docker.internal:11434")
+ENRICHMENT_MODEL = os.getenv("ENRICHMENT_MODEL", "mistral-nemo")
+ENRICHMENT_INITIAL_CONCURRENCY = int(os.getenv("ENRICHMENT_INITIAL_CONCURRENCY", 2))
+ENRICHMENT_MIN_CONCURRENCY = 1
+ENRICHMENT_MAX_CONCURRENCY = int(os.getenv("ENRICHMENT_MAX_CONCURRENCY", 8))
+ENRICHMENT_LATENCY_TOLERANCE = 1.5
+# Chunks per prompt: >1 sends the shared document context once per batch instead of once per chunk
+ENRICHMENT_BATCH_SIZE = int(os.getenv("ENRICHMENT_BATCH_SIZE", 1))
+ENRICHMENT_MAX_RETRIES = 3
+ENRICHMENT_RETRY_BACKOFF_SECONDS = 1.0
+ENRICHMENT_TIMEOUT_SECONDS = 300
+ENRICHMENT_CACHE_PATH = os.path.join(BASE_DIR, "data", "enrichment_cache.sqlite3")
+
+BM25_INDEX_PATH = os.path.join(BASE_DIR, "data", "bm25_index.sqlite3")
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+# Weighted Reciprocal Rank Fusion of the hybrid retrievers; HYBRID_CANDIDATE_K caps what reaches the cross-encoder
+HYBRID_RETRIEVERS = ["bm25", "vector", "graph"]
+HYBRID_RETRIEVER_WEIGHTS = {"bm25": 0.5, "vector": 0.5, "graph": 0.3}
+HYBRID_RRF_K = 60
+HYBRID_CANDIDATE_K = 20
+# Latency budget per retriever: past it, the query is fused without that retriever's results
+HYBRID_RETRIEVER_TIMEOUTS_MS = {"graph": 400}
+
+# Graph retriever: question terms matched against the Entity full-text index, chunks mentioning them expanded
+# to chunks sharing their entities (scored x SHARED_WEIGHT) and to their neighbours in the document (x ADJACENT_WEIGHT).
+# GRAPH_RETRIEVER_TIMEOUT_MS is enforced by Neo4j on the read transaction.
+GRAPH_RETRIEVER_TIMEOUT_MS = 300
+GRAPH_RETRIEVER_ENTITY_LIMIT = 20
+GRAPH_RETRIEVER_SEED_LIMIT = 20
+GRAPH_RETRIEVER_MAX_ENTITY_DEGREE = 50
+GRAPH_RETRIEVER_SHARED_WEIGHT = 0.5
+GRAPH_RETRIEVER_ADJACENT_WEIGHT = 0.3
 
+# Cross-encoder reranking: pairs from concurrent requests are micro-batched (one forward pass per batch,
+# waiting at most RERANKER_MAX_WAIT_MS), scores cached per (question, chunk id).
+# RERANKER_BACKEND "onnx" needs optimum[onnxruntime]; RERANKER_QUANTIZE applies dynamic int8 on CPU.
+RERANKER_MODEL_NAME = os.getenv("RERANKER_MODEL_NAME", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+RERANKER_BACKEND = os.getenv("RERANKER_BACKEND", "torch")
+RERANKER_QUANTIZE = os.getenv("RERANKER_QUANTIZE", "False") == "True"
+RERANKER_ONNX_DIR = os.path.join(BASE_DIR, "data", "onnx")
+RERANKER_MAX_BATCH_PAIRS = 128
+RERANKER_MAX_WAIT_MS = 5
+RERANKER_CACHE_SIZE = 50000
+# Skip the cross-encoder when every retriever already ranks the fused top final_k inside its own top final_k.
+# A heuristic trading quality for latency: it can change which documents are returned, so it stays opt-in.
+RERANKER_EARLY_EXIT = os.getenv("RERANKER_EARLY_EXIT", "False") == "True"
+RERANKER_EARLY_EXIT_AGREEMENT = 1.0
+
+# Answers reused for near-paraphrased questions (cosine similarity on question embeddings)
+SEMANTIC_CACHE_ENABLED = os.getenv('SEMANTIC_CACHE_ENABLED', 'True') == 'True'
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv('SEMANTIC_CACHE_THRESHOLD', 0.92))
+SEMANTIC_CACHE_MAX_ENTRIES = 1000
+SEMANTIC_CACHE_TTL_SECONDS = 24 * 3600
+# Re-ingestions done by other processes (ingest_bulk, other workers) are picked up within this delay
+SEMANTIC_CACHE_SYNC_SECONDS = 5
+
+# Prompt context packing: adjacent chunks merged, duplicate sentences dropped, sentences unrelated to the question
+# trimmed, then passages added best-first up to CONTEXT_MAX_TOKENS (tiktoken cl100k if installed, else ~4 chars/token)
+CONTEXT_PACKING_ENABLED = os.getenv('CONTEXT_PACKING_ENABLED', 'True') == 'True'
+CONTEXT_MAX_TOKENS = int(os.getenv('CONTEXT_MAX_TOKENS', 2000))
+CONTEXT_GRAPH_MAX_TOKENS = 200
+CONTEXT_SENTENCE_WINDOW = 1
+CONTEXT_REDUNDANCY_THRESHOLD = 0.8
+CONTEXT_INCLUDE_CHUNK_SUMMARY = False
+
+# Build reranker / embeddings / LLM chain once per process in RagEngineConfig.ready()
+RAG_ENGINE_PRELOAD = os.getenv('RAG_ENGINE_PRELOAD', 'True') == 'True'
+RAG_ENGINE_WARMUP = os.getenv('RAG_ENGINE_WARMUP', 'True') == 'True'
+RAG_ENGINE_PRELOAD_COMMANDS = ("runserver",)
+# Load them in a thread so workers accept requests (and pass health checks) while the models load
+RAG_ENGINE_PRELOAD_IN_BACKGROUND = os.getenv('RAG_ENGINE_PRELOAD_IN_BACKGROUND', 'True') == 'True'
+# `manage.py check_startup`: importing the URLconf (every view) must stay under this budget and must not pull
+# in these packages, which belong behind the lazy connector / registry entry points
+STARTUP_IMPORT_BUDGET_SECONDS = float(os.getenv('STARTUP_IMPORT_BUDGET_SECONDS', 2.0))
+STARTUP_FORBIDDEN_IMPORTS = (
+    "torch", "transformers", "sentence_transformers", "chromadb", "langchain_core", "langchain_community",
+    "langchain_chroma", "langchain_groq", "langchain_ollama", "langchain_text_splitters", "pypdf", "pdfminer",
+    "tiktoken", "tqdm",
+)
+# Async ask endpoints (api/v1/rag/async/..., served by config/asgi.py): threads running embedding, BM25, Chroma
+# and reranking for the event loop. In-flight questions waiting on Neo4j / the LLM don't consume one.
+RAG_ASYNC_EXECUTOR_WORKERS = int(os.getenv('RAG_ASYNC_EXECUTOR_WORKERS', 8))
+# Batch ask endpoint (api/v1/rag/ask/batch/): questions are embedded, retrieved and reranked together WAVE_SIZE at a
+# time; at most LLM_CONCURRENCY answers are generated at once per batch (the provider's own limit still applies)
+BATCH_ASK_MAX_QUESTIONS = 500
+BATCH_ASK_WAVE_SIZE = int(os.getenv('BATCH_ASK_WAVE_SIZE', 64))
+BATCH_ASK_LLM_CONCURRENCY = int(os.getenv('BATCH_ASK_LLM_CONCURRENCY', 8))
 
 EMBEDDING_MODEL_NAME = os.path.join(AI_MODELS_DIR, "all-MiniLM-L6-v2")
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", 128))
+# "encode": embed enriched chunk texts once at indexing time; "mean_pool": reuse the chunker's sentence vectors
+CHUNK_EMBEDDING_STRATEGY = os.getenv("CHUNK_EMBEDDING_STRATEGY", "encode")
+# Persistent embedding cache keyed by (model, text hash): memory-mapped matrix + digest index, LRU for hot
+# queries. Chunking, indexing and query embedding skip the model for texts already seen. "" disables it.
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", os.path.join(BASE_DIR, "data", "embedding_cache"))
+EMBEDDING_CACHE_DTYPE = os.getenv("EMBEDDING_CACHE_DTYPE", "float16")
+EMBEDDING_CACHE_LRU_SIZE = 4096
+# Cap of the on-disk cache (rows; ~768 bytes each for a 384-dim model in float16). The chunker's sentence windows
+# are never persisted, only chunk and query embeddings.
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", 1000000))
+
+# HNSW parameters of the Chroma collection, applied when it is created (`manage.py rebuild_vector_index --hnsw`
+# recreates an existing one). Vectors are normalized: "l2" and "cosine" rank identically.
+CHROMA_HNSW = {
+    "space": "l2",
+    "M": int(os.getenv("CHROMA_HNSW_M", 16)),
+    "construction_ef": int(os.getenv("CHROMA_HNSW_CONSTRUCTION_EF", 100)),
+    "search_ef": int(os.getenv("CHROMA_HNSW_SEARCH_EF", 64)),
+}
+# "hnsw": vector retrieval through Chroma's float32 HNSW index. "quantized": through a compact in-RAM copy of the
+# vectors (VECTOR_QUANTIZATION float16/int8, optionally truncated to the first VECTOR_INDEX_DIMENSIONS, for
+# Matryoshka-trained models), scanned for k * VECTOR_RESCORE_FACTOR candidates re-scored with the float32 vectors.
+# Fill it for an existing collection with `manage.py rebuild_vector_index`; measure with vector_benchmark.py.
+VECTOR_STORAGE = os.getenv("VECTOR_STORAGE", "hnsw")
+VECTOR_QUANTIZATION = os.getenv("VECTOR_QUANTIZATION", "int8")
+VECTOR_INDEX_DIMENSIONS = int(os.getenv("VECTOR_INDEX_DIMENSIONS", 0)) or None
+VECTOR_RESCORE_FACTOR = 4
 LLM_MODEL_NAME = os.path.join(AI_MODELS_DIR, "flan-t5-base")
 
 
@@ -123,4 +295,45 @@ GENERATION_CONFIG = {
     "no_repeat_ngram_size": 3   
 }
 
-GROQ_API_KEY = ""
\ No newline at end of file
+GROQ_API_KEY = ""
+
+# LLM providers (apps/rag_engine/llm): each pipeline role uses one, all HTTP providers share pooled keep-alive
+# connections and at most `max_concurrency` calls are in flight per provider (callers queue beyond it).
+# "local" runs the flan-t5 fetched by download_models.py in-process; "stub" is deterministic and offline.
+LLM_PROVIDERS = {
+    "groq": {
+        "backend": "groq",
+        "model": os.getenv("GROQ_MODEL_NAME", "llama-3.3-70b-versatile"),
+        "max_concurrency": int(os.getenv("GROQ_MAX_CONCURRENCY", 8)),
+        "max_connections": 20,
+        "max_keepalive_connections": 10,
+        "keepalive_expiry": 60.0,
+        "timeout": 60.0,
+    },
+    "ollama": {
+        "backend": "ollama",
+        "model": ENRICHMENT_MODEL,
+        "base_url": OLLAMA_BASE_URL,
+        "max_concurrency": ENRICHMENT_MAX_CONCURRENCY,
+        "max_connections": ENRICHMENT_MAX_CONCURRENCY,
+        "max_keepalive_connections": ENRICHMENT_MAX_CONCURRENCY,
+        "keep_alive": "30m",
+        "timeout": ENRICHMENT_TIMEOUT_SECONDS,
+    },
+    "local": {
+        "backend": "local",
+        "model": LLM_MODEL_NAME,
+        "max_concurrency": 1,
+    },
+    "stub": {
+        "backend": "stub",
+        "max_concurrency": 64,
+        "latency_ms": float(os.getenv("LLM_STUB_LATENCY_MS", 0)),
+    },
+}
+LLM_ROLES = {
+    "answer": os.getenv("LLM_ANSWER_PROVIDER", "groq"),
+    "enrichment": os.getenv("LLM_ENRICHMENT_PROVIDER", "ollama"),
+}
+# Identical prompts already in flight wait for the running call instead of being sent again
+LLM_COALESCE_INFLIGHT = True
\ No newline at end of file
@@ -1,9 +1,29 @@
+import json
+import time
+import itertools
 import streamlit as st
 import requests
 
 API_BASE_URL = "http://localhost:8000/api/v1"
 INGEST_URL = f"{API_BASE_URL}/ingestion/documents/"
 RAG_URL = f"{API_BASE_URL}/rag/ask/"
+RAG_STREAM_URL = f"{API_BASE_URL}/rag/ask/stream/"
+POLL_INTERVAL_SECONDS = 2
+# Ingestion keeps running server-side past this: the dashboard only stops following it
+POLL_MAX_SECONDS = 30 * 60
+REQUEST_TIMEOUT = (5, 30)  # (connect, read) seconds
+# Read timeout between two SSE events: retrieval + reranking happen before the first one
+STREAM_TIMEOUT = (5, 120)
+
+def iter_sse_events(response):
+    response.encoding = "utf-8"
+    event = None
+    for line in response.iter_lines(decode_unicode=True):
+        if line.startswith("event: "):
+            event = line[len("event: "):]
+        elif line.startswith("data: ") and event:
+            yield event, json.loads(line[len("data: "):])
+            event = None
 
 st.set_page_config(page_title="LegalRAG AI", page_icon="⚖️", layout="wide")
 
@@ -16,21 +36,38 @@ with st.sidebar:
     
     if uploaded_file is not None:
         if st.button("Ingérer et Analyser"):
-            with st.spinner("Envoi et Traitement (RAG Pipeline)..."):
-                files = {"file": uploaded_file}
-                data = {"title": uploaded_file.name} 
-                response = requests.post(INGEST_URL, files=files, data=data)
-                if response.status_code == 201:
+            files = {"file": uploaded_file}
+            data = {"title": uploaded_file.name} 
+            response = requests.post(INGEST_URL, files=files, data=data, timeout=REQUEST_TIMEOUT)
+
+            if response.status_code == 202:
+                status_url = response.json().get("status_url")
+                progress_bar = st.progress(0, text="En file d'attente...")
+                job = {}
+                deadline = time.monotonic() + POLL_MAX_SECONDS
+                while time.monotonic() < deadline:
+                    try:
+                        job = requests.get(status_url, timeout=REQUEST_TIMEOUT).json()
+                    except requests.RequestException as e:
+                        st.warning(f"Statut indisponible, nouvel essai : {e}")
+                        time.sleep(POLL_INTERVAL_SECONDS)
+                        continue
+                    progress_bar.progress(int(job.get("progress", 0)), text=f"Étape : {job.get('status')}")
+                    if job.get("status") in ("completed", "failed"):
+                        break
+                    time.sleep(POLL_INTERVAL_SECONDS)
+
+                if job.get("status") not in ("completed", "failed"):
+                    st.warning(f"Indexation toujours en cours après {POLL_MAX_SECONDS // 60} min, suivez-la sur : {status_url}")
+                elif job.get("status") == "completed":
                     st.balloons()
-                    st.success("Document uploadé et indexé avec succès !")
-                    st.json(response.json().get("data")) # Show metadata
-                    
-                elif response.status_code == 202:
-                    st.warning("Fichier sauvegardé, mais erreur d'indexation.")
-                    st.error(f"Détails : {response.json().get('error')}")
-                    
+                    st.success(f"Document indexé avec succès ! ({job.get('chunk_count')} chunks)")
                 else:
-                    st.error(f"Erreur Serveur ({response.status_code}) : {response.text}")
+                    st.error(f"Erreur d'indexation : {job.get('processing_error')}")
+                st.json(job.get("stage_timings", {}))  # Per-stage timings (seconds)
+
+            else:
+                st.error(f"Erreur Serveur ({response.status_code}) : {response.text}")
 
     st.markdown("---")
     st.info("Ce système utilise une architecture Hybride : **Neo4j** (Graphe) + **ChromaDB** (Vecteurs).")
@@ -50,20 +87,44 @@ if prompt := st.chat_input("Posez votre question juridique..."):
         st.markdown(prompt)
 
     with st.chat_message("assistant"):
+        sources_placeholder = st.empty()
         message_placeholder = st.empty()
         full_response = ""
-        
-        with st.spinner("Analyse Hybride (Mots-clés + Sémantique)..."):
-            payload = {"question": prompt}
-            response = requests.post(RAG_URL, json=payload)
-            
-            if response.status_code == 200:
-                data = response.json()
-                answer = data.get('answer', "Je n'ai pas trouvé de réponse.")
-                full_response = answer
-                message_placeholder.markdown(full_response)
-            else:
-                full_response = f"Erreur API : {response.text}"
-                message_placeholder.markdown(full_response)
+
+        payload = {"question": prompt}
+        try:
+            with st.spinner("Analyse Hybride (Mots-clés + Sémantique)..."):
+                response = requests.post(RAG_STREAM_URL, json=payload, stream=True, timeout=STREAM_TIMEOUT)
+                events = iter_sse_events(response) if response.status_code == 200 else iter(())
+                # The spinner only covers retrieval + reranking: it stops at the first event (sources)
+                first_event = next(events, None)
+        except requests.RequestException as e:
+            response, first_event, events = None, None, iter(())
+            full_response = f"Erreur API : {e}"
+
+        if response is None:
+            message_placeholder.markdown(full_response)
+        elif response.status_code != 200:
+            full_response = f"Erreur API : {response.text}"
+            message_placeholder.markdown(full_response)
+        else:
+            try:
+                for event, data in itertools.chain([first_event] if first_event else [], events):
+                    if event == "sources":
+                        with sources_placeholder.container():
+                            if data.get("sources"):
+                                st.caption("📚 Sources : " + ", ".join(data["sources"]))
+                            if data.get("graph_context"):
+                                with st.expander("🕸️ Contexte du graphe (Neo4j)"):
+                                    st.markdown(data["graph_context"])
+                    elif event == "token":
+                        full_response += data.get("text", "")
+                        message_placeholder.markdown(full_response + "▌")
+                    elif event == "error":
+                        full_response = f"Erreur API : {data.get('error')}"
+            except requests.RequestException as e:
+                # Read timeout between two events: keep the partial answer
+                full_response += f"\n\nErreur API : {e}"
+            message_placeholder.markdown(full_response or "Je n'ai pas trouvé de réponse.")
 
         st.session_state.messages.append({"role": "assistant", "content": full_response})
\ No newline at end of file
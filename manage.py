@@ -5,6 +5,7 @@ from django.core.management import execute_from_command_line
 
 def main():
     os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    execute_from_command_line(sys.argv)
 
 if __name__ == '__main__':
     main()
\ No newline at end of file